@@ -0,0 +1,345 @@
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from ortools.sat.python import cp_model
+
+from Evaluate import RosterEvaluator
+from Instance import Instance, InstanceGenerator
+from Model import RosterModel
+from Report import JsonReport
+from Solution import GetGap, RosterSolutionCallback
+
+class RosterBenchmark:
+    # times every stage of run() on one instance: load, index, model build per constraint family, first feasible
+    # solution and reaching the target gap
+    def __init__(self, data_dir, year, month, num_days=None, max_time=60.0, target_gap=0.05, num_workers=8, implied_constraints=False):
+        self.data_dir = data_dir
+        self.year = year
+        self.month = month
+        self.num_days = num_days
+        self.max_time = max_time
+        self.target_gap = target_gap
+        self.num_workers = num_workers
+        self.implied_constraints = implied_constraints
+        self.result = {}
+        self._first_solution_time = None
+        self._target_gap_time = None
+
+    def run(self):
+        instance = Instance(self.data_dir, self.year, self.month, self.num_days)
+        index_time = self._TimeIndex(instance)
+
+        start_time = time.perf_counter()
+        roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints, implied_constraints=self.implied_constraints).build()
+        build_time = time.perf_counter() - start_time
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = self.max_time
+        solver.parameters.num_workers = self.num_workers
+        status = solver.Solve(roster_model.model, RosterSolutionCallback([self], verbose=False))
+
+        proto = roster_model.model.Proto()
+        self.result = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "revision": self._GetRevision(),
+            "instance": {"data_dir": self.data_dir, "year": self.year, "month": self.month, "num_days": self.num_days,
+                         "nurses": len(instance.nurses.nurses), "shifts": len(instance.shifts.shifts), "requests": len(instance.constraints.requests)},
+            "parameters": {"max_time": self.max_time, "target_gap": self.target_gap, "num_workers": self.num_workers, "implied_constraints": self.implied_constraints},
+            "model": {"variables": len(proto.variables), "constraints": len(proto.constraints)},
+            "times": {"load": instance.load_time,
+                      "index": index_time,
+                      "build": build_time,
+                      "build_families": roster_model.build_times,
+                      "first_solution": self._first_solution_time,
+                      "target_gap": self._target_gap_time,
+                      "solve": solver.WallTime()},
+            "status": solver.StatusName(status),
+            "objective": solver.ObjectiveValue() if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None,
+            "bound": solver.BestObjectiveBound(),
+        }
+        return self.result
+
+    def on_solution(self, callback):
+        if self._first_solution_time is None:
+            self._first_solution_time = callback.WallTime()
+        if self._target_gap_time is None and GetGap(callback.ObjectiveValue(), callback.BestObjectiveBound()) <= self.target_gap:
+            self._target_gap_time = callback.WallTime()
+            callback.StopSearch()
+        return
+
+    def append_to_history(self, fn):
+        history = []
+        if os.path.isfile(fn):
+            with open(fn) as f:
+                history = json.load(f)
+        history.append(self.result)
+        with open(fn, "w") as f:
+            json.dump(history, f, indent=1)
+        print(f"Wrote {fn} ({len(history)} runs)")
+        return
+
+    def print_summary(self):
+        times = self.result["times"]
+        print()
+        print('Benchmark')
+        print('  - instance        : %i nurses, %i shifts, %i requests' % (self.result["instance"]["nurses"], self.result["instance"]["shifts"], self.result["instance"]["requests"]))
+        print('  - model           : %i variables, %i constraints' % (self.result["model"]["variables"], self.result["model"]["constraints"]))
+        print('  - load            : %f s' % times["load"])
+        print('  - index           : %f s' % times["index"])
+        print('  - build           : %f s' % times["build"])
+        for family, family_time in sorted(times["build_families"].items(), key=lambda item: -item[1]):
+            print('      %-48s %f s' % (family, family_time))
+        print('  - first solution  : %s' % ("-" if times["first_solution"] is None else "%f s" % times["first_solution"]))
+        print('  - target gap      : %s' % ("-" if times["target_gap"] is None else "%f s" % times["target_gap"]))
+        print('  - status          : %s' % self.result["status"])
+        print('  - objective       : %s' % self.result["objective"])
+        print('  - bound           : %s' % self.result["bound"])
+        return
+
+    def _TimeIndex(self, instance):
+        # the shift bundles the constraint families are built from
+        start_time = time.perf_counter()
+        constraints, shifts = instance.constraints, instance.shifts
+        constraints._GetShiftDayBundles(shifts)
+        constraints._GetShiftWeekBundles(shifts)
+        constraints._GetShiftSequences(shifts)
+        return time.perf_counter() - start_time
+
+    def _GetRevision(self):
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except OSError:
+            return ""
+
+class ParallelBuildBenchmark:
+    # model build time of build() against build_parallel() for several process counts, on one instance
+    def __init__(self, data_dir, year, month, num_days=None, process_counts=(1, 2, 4, 8), repeats=3):
+        self.instance = Instance(data_dir, year, month, num_days)
+        self.process_counts = process_counts
+        self.repeats = repeats
+        self.result = {}
+
+    def run(self):
+        instance = self.instance
+        times = {"sequential": self._Time(lambda: RosterModel(instance.nurses, instance.shifts, instance.constraints).build())}
+        reference = RosterModel(instance.nurses, instance.shifts, instance.constraints).build().model.Proto()
+        identical = True
+        for num_processes in self.process_counts:
+            times[num_processes] = self._Time(lambda: RosterModel(instance.nurses, instance.shifts, instance.constraints).build_parallel(num_processes))
+            identical &= RosterModel(instance.nurses, instance.shifts, instance.constraints).build_parallel(num_processes).model.Proto() == reference
+        self.result = {"date": datetime.now().isoformat(timespec="seconds"),
+                       "instance": {"nurses": len(instance.nurses.nurses), "shifts": len(instance.shifts.shifts), "requests": len(instance.constraints.requests)},
+                       "model": {"variables": len(reference.variables), "constraints": len(reference.constraints)},
+                       "cpus": os.cpu_count(), "identical": identical, "times": {str(key): value for key, value in times.items()}}
+        return self.result
+
+    def print_summary(self):
+        print()
+        print('Model build (%i nurses, %i shifts, %i variables, %i constraints, %i cpus)' % (self.result["instance"]["nurses"], self.result["instance"]["shifts"],
+              self.result["model"]["variables"], self.result["model"]["constraints"], self.result["cpus"]))
+        sequential = self.result["times"]["sequential"]
+        for key, build_time in self.result["times"].items():
+            print('  - %-10s: %8.3f s (%.2fx)' % (key if key == "sequential" else key + " proc", build_time, sequential / build_time))
+        print('  - same model as build(): %s' % self.result["identical"])
+        return
+
+    def _Time(self, build):
+        # best of the repeats
+        times = []
+        for _ in range(self.repeats):
+            start_time = time.perf_counter()
+            build()
+            times.append(time.perf_counter() - start_time)
+        return min(times)
+
+class FairnessBenchmark(JsonReport):
+    # trade-off of the fairness objective against the other objective terms: the instance is solved without it
+    # (cost 0) and with every FAIRNESS_COST in costs, per solve the penalty of every objective family and the spread of
+    # the contract normalized night, weekend and evening counts (in shifts of a full time contract)
+    def __init__(self, data_dir, year, month, num_days, profile, costs=(0, 1, 5, 25)):
+        self.data_dir = data_dir
+        self.year = year
+        self.month = month
+        self.num_days = num_days
+        self.profile = profile
+        self.costs = costs
+        self.result = {}
+
+    def run(self):
+        runs = []
+        for cost in self.costs:
+            instance = Instance(self.data_dir, self.year, self.month, self.num_days)
+            if cost:
+                instance.constraints.set_weights({"FAIRNESS_COST": cost})
+            roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints, fairness=cost > 0).build()
+            solver = self.profile.apply(cp_model.CpSolver())
+            status = solver.Solve(roster_model.model)
+            run = {"cost": cost, "status": solver.StatusName(status), "wall_time": solver.WallTime(), "objective": None,
+                   "penalties": None, "other": None, "spreads": None}
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                evaluator = RosterEvaluator(instance.nurses, instance.shifts, instance.constraints)
+                spreads = evaluator.GetFairnessSpreads(evaluator.GetMatrixFromSolver(roster_model.work, solver))
+                run["objective"] = solver.ObjectiveValue()
+                run["penalties"] = roster_model.GetPenalties(solver)
+                run["other"] = sum(penalty for family, penalty in run["penalties"].items() if family != "fairness")
+                run["spreads"] = {category: spread / instance.constraints.FAIRNESS_SCALE for category, spread in spreads.items()}
+            print(f"fairness cost {cost}: {run['status']}, other objective terms {run['other']}, spreads {run['spreads']}")
+            runs.append(run)
+        self.result = {"date": datetime.now().isoformat(timespec="seconds"),
+                       "instance": {"data_dir": self.data_dir, "year": self.year, "month": self.month, "num_days": self.num_days},
+                       "profile": self.profile.to_dict(), "runs": runs}
+        return self.result
+
+    def print_summary(self):
+        runs = self.result["runs"]
+        families = sorted(set(family for run in runs if run["penalties"] for family in run["penalties"]) - {"fairness"})
+        categories = sorted(set(category for run in runs if run["spreads"] for category in run["spreads"]))
+        print()
+        print('Fairness trade-off (spreads in shifts of a full time contract, other = objective without fairness)')
+        print('  %-8s%-10s' % ("cost", "status") + "".join("%-16s" % family for family in families) + "%-10s" % "other" +
+              "".join("%-10s" % category for category in categories))
+        for run in runs:
+            if run["penalties"] is None:
+                print('  %-8s%-10s' % (run["cost"], run["status"]))
+                continue
+            print('  %-8s%-10s' % (run["cost"], run["status"]) + "".join("%-16s" % run["penalties"].get(family, 0) for family in families) +
+                  "%-10s" % run["other"] + "".join("%-10.1f" % run["spreads"][category] for category in categories))
+        return
+
+class StartupBenchmark(JsonReport):
+    # wall time from process start to exit of commands that do not solve (e.g. main.py --check_only), best of the
+    # repeats, against a budget in seconds. The slowest direct imports of every command are from python -X importtime
+    def __init__(self, commands, budget=0.15, repeats=5, num_imports=5):
+        self.commands = commands # python scripts with their arguments, run from the directory of this file
+        self.budget = budget
+        self.repeats = repeats
+        self.num_imports = num_imports
+        self.result = {}
+
+    def run(self):
+        self.result = {"date": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0], "budget": self.budget,
+                       "interpreter": self._Time([sys.executable, "-c", "pass"]), "commands": {}}
+        for command in self.commands:
+            args = [sys.executable] + shlex.split(command)
+            try:
+                startup_time = self._Time(args)
+            except subprocess.CalledProcessError as e:
+                # a failing command is over any budget, with the last line it wrote as the reason
+                lines = (e.stderr or e.stdout or b"").decode(errors="replace").strip().splitlines()
+                self.result["commands"][command] = {"time": None, "within_budget": False, "imports": [],
+                                                    "error": lines[-1] if lines else f"exit status {e.returncode}"}
+                continue
+            self.result["commands"][command] = {"time": startup_time, "within_budget": startup_time <= self.budget, "imports": self._GetSlowestImports(args)}
+        return self.result
+
+    def passed(self):
+        return all(command["within_budget"] for command in self.result["commands"].values())
+
+    def print_summary(self):
+        print()
+        print('Startup (budget %.0f ms, interpreter %.0f ms, python %s)' % (self.budget * 1000, self.result["interpreter"] * 1000, self.result["python"]))
+        for command, result in self.result["commands"].items():
+            if result["time"] is None:
+                print('  - %-40s FAILED: %s' % (command, result["error"]))
+                continue
+            print('  - %-40s %6.0f ms %s' % (command, result["time"] * 1000, "ok" if result["within_budget"] else "OVER BUDGET"))
+            for module, import_time in result["imports"]:
+                print('      %-38s %6.0f ms' % (module, import_time * 1000))
+        return
+
+    def _Time(self, args):
+        # best of the repeats, the command has to succeed
+        times = []
+        for _ in range(self.repeats):
+            start_time = time.perf_counter()
+            subprocess.run(args, capture_output=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            times.append(time.perf_counter() - start_time)
+        return min(times)
+
+    def _GetSlowestImports(self, args):
+        # (module, cumulative seconds) of the imports of the script itself, the least indented -X importtime lines
+        process = subprocess.run(args[:1] + ["-X", "importtime"] + args[1:], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        imports = []
+        for line in process.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            imports.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative) / 1e6))
+        if not imports:
+            return []
+        depth = min(depth for depth, _, _ in imports)
+        return sorted([(name, import_time) for d, name, import_time in imports if d == depth], key=lambda item: -item[1])[:self.num_imports]
+
+class LayoutBenchmark(JsonReport):
+    # the dense WorkLayout of the work[n, s] variables against the tuple keyed WorkDict, on synthetic instances of
+    # growing size: time and python heap (tracemalloc) of making the variables and of building the whole model, best
+    # time of the repeats. Both layouts have to give the same model
+    LAYOUTS = {"dict": False, "dense": True}
+
+    def __init__(self, nurse_counts=(20, 60, 120), horizons=(28, 91), year=2022, month=10, repeats=3, seed=0):
+        self.nurse_counts = nurse_counts
+        self.horizons = horizons
+        self.year = year
+        self.month = month
+        self.repeats = repeats
+        self.seed = seed
+        self.result = {}
+
+    def run(self):
+        work_dir = tempfile.mkdtemp(prefix="hrh_layout_")
+        points = []
+        for num_nurses in self.nurse_counts:
+            data_dir = InstanceGenerator(num_nurses, seed=self.seed).write(os.path.join(work_dir, str(num_nurses)))
+            for num_days in self.horizons:
+                instance = Instance(data_dir, self.year, self.month, num_days)
+                point = {"nurses": num_nurses, "days": num_days, "shifts": len(instance.shifts.shifts)}
+                protos = {}
+                for layout, dense in self.LAYOUTS.items():
+                    work_time, work_memory, _ = self._Measure(lambda: self._MakeWork(instance, dense))
+                    build_time, build_memory, roster_model = self._Measure(lambda: RosterModel(instance.nurses, instance.shifts, instance.constraints, dense=dense).build())
+                    point[layout] = {"work_time": work_time, "work_memory": work_memory, "build_time": build_time, "build_memory": build_memory}
+                    protos[layout] = roster_model.model.Proto()
+                point["variables"] = len(protos["dense"].variables)
+                point["identical"] = protos["dict"] == protos["dense"]
+                print(f"{num_nurses} nurses x {num_days} days: build {point['dict']['build_time']:.2f} s (dict), {point['dense']['build_time']:.2f} s (dense)")
+                points.append(point)
+        self.result = {"date": datetime.now().isoformat(timespec="seconds"), "repeats": self.repeats, "points": points}
+        return self.result
+
+    def print_summary(self):
+        print()
+        print('Work layout, dict against dense (memory: python heap retained after the step, tracemalloc)')
+        print('  %-8s%-7s%-10s%-22s%-22s%-22s%-22s%s' % ("nurses", "days", "vars", "work time (ms)", "work memory (MB)", "build time (s)", "build memory (MB)", "same model"))
+        for point in self.result["points"]:
+            dict_result, dense_result = point["dict"], point["dense"]
+            print('  %-8i%-7i%-10i%-22s%-22s%-22s%-22s%s' % (point["nurses"], point["days"], point["variables"],
+                  "%.0f / %.0f" % (dict_result["work_time"] * 1000, dense_result["work_time"] * 1000),
+                  "%.1f / %.1f" % (dict_result["work_memory"] / 2**20, dense_result["work_memory"] / 2**20),
+                  "%.2f / %.2f (%.2fx)" % (dict_result["build_time"], dense_result["build_time"], dict_result["build_time"] / dense_result["build_time"]),
+                  "%.1f / %.1f" % (dict_result["build_memory"] / 2**20, dense_result["build_memory"] / 2**20), point["identical"]))
+        return
+
+    def _MakeWork(self, instance, dense):
+        roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints, dense=dense)
+        roster_model._AddWorkVariables()
+        return roster_model
+
+    def _Measure(self, step):
+        # best time of the repeats, then the python heap the result of one more run holds on to
+        times = []
+        for _ in range(self.repeats):
+            start_time = time.perf_counter()
+            step()
+            times.append(time.perf_counter() - start_time)
+        tracemalloc.start()
+        result = step()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return min(times), memory, result
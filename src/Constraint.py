@@ -3,7 +3,7 @@ from datetime import datetime
 import os
 
 class Constraint:
-    def __init__(self, name=None, full_date=None, day=None, shift=None, do_assign=None, streakmin=None, streakmax=None, max_sum=None, percentage=None, is_hard=None):
+    def __init__(self, name=None, full_date=None, day=None, shift=None, do_assign=None, streakmin=None, streakmax=None, max_sum=None, percentage=None, is_hard=None, source=None):
         self.name = name
         self.full_date = full_date
         self.day = day
@@ -14,12 +14,60 @@ class Constraint:
         self.max_sum = max_sum
         self.percentage = percentage
         self.is_hard = is_hard
+        self.source = source # <file>:<line> the request was read from
 
     def __str__(self):
         return f"name:{self.name}, date:{self.full_date}, day:{self.day}, shift:{self.shift}, do_assign:{self.do_assign}, streakmin:{self.streakmin}, streakmax:{self.streakmax}, is_hard:{self.is_hard}"
 
 class Constraints:
     # https://ambtenarensalaris.nl/wp-content/uploads/2022/07/Cao-Gehandicaptenzorg-2021-2024.pdf
+    # objective weights, shared with the RosterEvaluator
+    CONTRACT_OVER_COST = 25 # per hour above the contract
+    CONTRACT_UNDER_COST = 20 # per hour below the contract
+    MAX_WEEK_HOURS = 60 # pp92 CAO Gehandicaptenzorg 2021-2024: max 60 urige werkweek
+    TRANSITION_COST = 30
+    SEQUENCE_MIN_LENGTH = 3
+    SEQUENCE_COST = 2 # per shift a sequence is shorter than SEQUENCE_MIN_LENGTH
+    SOFT_REQUEST_COST = 10
+    ZZP_COST = 1
+    FAIRNESS_COST = 5 # per unit of spread of the contract normalized night, weekend and evening counts
+    FAIRNESS_SCALE = 10 # counts are normalized to a FULLTIME_HOURS contract in units of 1 / FAIRNESS_SCALE shift
+    FULLTIME_HOURS = 36
+    # previous_day_shift, next_day_shift, penalty (0=hard)
+    PENALIZED_TRANSITIONS = [("dk0",  "a0", TRANSITION_COST), # ochtend -> avond / nacht
+                             ("dk0",  "a1", TRANSITION_COST),
+                             ("dm0",  "a0", TRANSITION_COST),
+                             ("dm0",  "a1", TRANSITION_COST),
+                             ("dl0",  "a0", TRANSITION_COST),
+                             ("dl0",  "a1", TRANSITION_COST),
+                             ("dl1",  "a0", TRANSITION_COST),
+                             ("dl1",  "a1", TRANSITION_COST),
+                             ("dk0",  "n0", TRANSITION_COST),
+                             ("dk0",  "n1", TRANSITION_COST),
+                             ("dm0",  "n0", TRANSITION_COST),
+                             ("dm0",  "n1", TRANSITION_COST),
+                             ("dl0",  "n0", TRANSITION_COST),
+                             ("dl0",  "n1", TRANSITION_COST),
+                             ("dl1",  "n0", TRANSITION_COST),
+                             ("dl1",  "n1", TRANSITION_COST),
+                             ("dl0", "dl1", 0),  # zelfde shift, zelfde rij
+                             ("dl1", "dl0", 0),
+                             ( "a0",  "a1", 0),
+                             ( "a1",  "a0", 0),
+                             ( "n0",  "n1", 0),
+                             ( "n1",  "n0", 0),
+                             ( "a0", "dk0", TRANSITION_COST), # avond -> ochtend
+                             ( "a0", "dm0", TRANSITION_COST),
+                             ( "a0", "dl0", TRANSITION_COST),
+                             ( "a0", "dl1", TRANSITION_COST),
+                             ( "a1", "dk0", TRANSITION_COST),
+                             ( "a1", "dm0", TRANSITION_COST),
+                             ( "a1", "dl0", TRANSITION_COST),
+                             ( "a1", "dl1", TRANSITION_COST)]
+
+    # the weights set_weights can change per instance
+    WEIGHTS = ["CONTRACT_OVER_COST", "CONTRACT_UNDER_COST", "TRANSITION_COST", "SEQUENCE_COST", "SOFT_REQUEST_COST", "ZZP_COST", "FAIRNESS_COST"]
+
     def __init__(self, general_request_fn=None, specific_request_fn=None):
         self.general_request_fn = general_request_fn
         self.specific_request_fn = specific_request_fn
@@ -31,10 +79,28 @@ class Constraints:
             print(request)
         return ""
 
+    def set_weights(self, weights):
+        # {name in WEIGHTS: cost} for this instance only, the penalized transitions follow TRANSITION_COST
+        for name, cost in weights.items():
+            assert name in self.WEIGHTS, f"unknown weight {name}"
+            assert(cost >= 0)
+            setattr(self, name, cost)
+        assert(self.TRANSITION_COST > 0) # 0 makes the penalized transitions hard
+        self.PENALIZED_TRANSITIONS = [(previous_shift, next_shift, self.TRANSITION_COST if cost else 0) for previous_shift, next_shift, cost in Constraints.PENALIZED_TRANSITIONS]
+        return self
+
+    def GetWeights(self):
+        return {name: getattr(self, name) for name in self.WEIGHTS}
+
+    def check_requests(self, nurses, shifts):
+        # hard requests that contradict each other or the hard constraints, see RequestChecker
+        from RequestCheck import RequestChecker
+        return RequestChecker(nurses, shifts).check(self.requests)
+
     def add_fill_every_shift_constraint(self, model, nurses, shifts, work):
         # every shift should be filled by one and only one nurse
         for s,_ in enumerate(shifts.shifts):
-            model.Add(sum(work[n, s] for n,_ in enumerate(nurses.nurses)) == 1)
+            model.Add(work.GetColumn(s) == 1)
         return
 
     def add_one_shift_per_day_constraint(self, model, nurses, shifts, work):
@@ -42,7 +108,7 @@ class Constraints:
         shift_day_bundles = self._GetShiftDayBundles(shifts)
         for bundle in shift_day_bundles:
             for n,_ in enumerate(nurses.nurses):
-                model.Add(sum(work[n, s] for s in bundle) <= 1)
+                model.Add(work.GetRow(n, bundle) <= 1)
         return
 
     def add_rest_after_night_shift_constraint(self, model, nurses, shifts, work):
@@ -52,7 +118,7 @@ class Constraints:
         for bundles in bundles_total:
             for n,_ in enumerate(nurses.nurses): # n0|n1 -> sum(dk0, dm0, dl0, dl1, a0, a1) == 0
                 for bundle in bundles:
-                    model.Add(sum(work[n,s] for s in bundle[1])==0).OnlyEnforceIf(work[n,bundle[0]])
+                    model.Add(work.GetRow(n, bundle[1])==0).OnlyEnforceIf(work[n,bundle[0]])
         return
 
     def add_weekly_contract_hours_constraint(self, model, nurses, shifts, work):
@@ -64,11 +130,11 @@ class Constraints:
         for n,nurse in enumerate(nurses.nurses):
             soft_min = nurse.contract
             soft_max = nurse.contract
-            max_cost = 25 # 2
-            min_cost = 20 # 3
+            max_cost = self.CONTRACT_OVER_COST
+            min_cost = self.CONTRACT_UNDER_COST
 
             for bundle in shift_week_bundles:
-                hard_max = 60 # pp92 CAO Gehandicaptenzorg 2021-2024: max 60 urige werkweek
+                hard_max = self.MAX_WEEK_HOURS
                 cv, cc = self._Add_soft_sum_constraint(n, bundle, shifts, model, work, hard_min, soft_min, min_cost, soft_max, hard_max, max_cost, "weekly_contract_hours")
                 cost_variables.extend(cv)
                 cost_coefficients.extend(cc)
@@ -83,13 +149,13 @@ class Constraints:
         nurses_with_resuscitate_skill = self._GetNursesThatCanResuscitate(nurses)
 
         for i in range(len(dl_shift_bundles[0])): # dl
-            model.Add(sum(work[n, dl_shift_bundles[0][i]] for n in nurses_with_resuscitate_skill) + sum(work[n, dl_shift_bundles[1][i]] for n in nurses_with_resuscitate_skill)>=1)
+            model.Add(work.GetColumn(dl_shift_bundles[0][i], nurses_with_resuscitate_skill) + work.GetColumn(dl_shift_bundles[1][i], nurses_with_resuscitate_skill)>=1)
 
         for i in range(len(a_shift_bundles[0])): # a
-            model.Add(sum(work[n, a_shift_bundles[0][i]] for n in nurses_with_resuscitate_skill) + sum(work[n, a_shift_bundles[1][i]] for n in nurses_with_resuscitate_skill)>=1)
+            model.Add(work.GetColumn(a_shift_bundles[0][i], nurses_with_resuscitate_skill) + work.GetColumn(a_shift_bundles[1][i], nurses_with_resuscitate_skill)>=1)
 
         for i in range(len(n_shift_bundles[0])): # n
-            model.Add(sum(work[n, n_shift_bundles[0][i]] for n in nurses_with_resuscitate_skill) + sum(work[n, n_shift_bundles[1][i]] for n in nurses_with_resuscitate_skill)>=1)
+            model.Add(work.GetColumn(n_shift_bundles[0][i], nurses_with_resuscitate_skill) + work.GetColumn(n_shift_bundles[1][i], nurses_with_resuscitate_skill)>=1)
         
         return
 
@@ -100,6 +166,8 @@ class Constraints:
             day_num = shifts.ConvertDayStrToDayNum(request.day)
             shift_day_bundles = self._GetShiftDayBundles(shifts, request.shift)
             for bundle in shift_day_bundles:
+                if not bundle: # no shift of request.shift, e.g. a slot
+                    continue
                 bundle_day = shifts.shifts[bundle[0]].start_date.weekday()
                 if not bundle_day == day_num:
                     continue
@@ -108,9 +176,9 @@ class Constraints:
                     if not nurse.name == request.name:
                         continue
                     if request.do_assign:
-                        model.Add(sum(work[n,s] for s in bundle)==1)
+                        model.Add(work.GetRow(n, bundle)==1)
                     else:
-                        model.Add(sum(work[n,s] for s in bundle)==0)
+                        model.Add(work.GetRow(n, bundle)==0)
         return
 
     def add_hard_requests_do_not_work_shift(self, model, nurses, shifts, work):
@@ -122,7 +190,7 @@ class Constraints:
                 for n,nurse in enumerate(nurses.nurses):
                     if not nurse.name == request.name:
                         continue
-                    model.Add(sum(work[n,s] for s in bundle)==0)
+                    model.Add(work.GetRow(n, bundle)==0)
         return
 
     def add_hard_requests_rest_after_n_shifts(self, model, nurses, shifts, work):
@@ -137,7 +205,7 @@ class Constraints:
                     conditional_shifts = []
                     for s in bundle[0]:
                         conditional_shifts.append(work[n,s]) 
-                    model.Add(sum(work[n,s] for s in bundle[1][0])==0).OnlyEnforceIf(conditional_shifts)
+                    model.Add(work.GetRow(n, bundle[1][0])==0).OnlyEnforceIf(conditional_shifts)
         return
 
     def add_hard_requests_work_specific_day_shift(self, model, nurses, shifts, work):
@@ -145,12 +213,18 @@ class Constraints:
             if not self._Request_type_is_hard_work_specific_day_shift(request):
                 continue
             specific_day = request.full_date
-            for s,shift in enumerate(shifts.shifts):
-                for n,nurse in enumerate(nurses.nurses):
-                    if not nurse.name == request.name:
-                        continue
-                    if self._ShiftAndDateAreSameDay(shift, specific_day) and specific_day.shift == shift.abbreviation:
-                        model.Add(work[n, s] == 1)
+            # the shift type (any slot) or the slot of the request, any shift of the day when it has none
+            day_shifts = [s for s,shift in enumerate(shifts.shifts) if self._ShiftAndDateAreSameDay(shift, specific_day) and
+                          (not request.shift or request.shift in (shift.abbreviation, shift.abbreviation[:-1]))]
+            if not day_shifts:
+                continue
+            for n,nurse in enumerate(nurses.nurses):
+                if not nurse.name == request.name:
+                    continue
+                if request.do_assign is False:
+                    model.Add(work.GetRow(n, day_shifts) == 0)
+                else:
+                    model.Add(work.GetRow(n, day_shifts) == 1)
         return
 
     def add_hard_requests_percentage_shift(self, model, nurses, shifts, work):
@@ -167,7 +241,7 @@ class Constraints:
             for n,nurse in enumerate(nurses.nurses):
                 if not nurse.name == request.name:
                     continue
-                model.Add(sum(work[n,s] for s in full_shift_list) <= int((num_weeks*nurse.contract)/shift_hours*request.percentage/100))
+                model.Add(work.GetRow(n, full_shift_list) <= int((num_weeks*nurse.contract)/shift_hours*request.percentage/100))
         return
 
     def _Request_type_is_hard_percentage_shift(self, request):
@@ -258,7 +332,7 @@ class Constraints:
         return days_day_seq_bundles
 
     def add_soft_requests_do_assign_shift(self, model, nurses, shifts, work):
-        cost = 10 #TODO: tune param
+        cost = self.SOFT_REQUEST_COST
         tmp_var, tmp_coeffs = [],[]
         for request in self.requests:
             if not self._Request_type_is_soft_do_assign_shift(request):
@@ -277,18 +351,34 @@ class Constraints:
         return tmp_var, tmp_coeffs
 
     def add_favor_whole_weekend(self, model, nurses, shifts, work):
-        shift_sequences_saturday = self._GetShiftSequences(shifts, shift_target=None, day_target="za")
-        shift_sequences_sunday = self._GetShiftSequences(shifts, shift_target=None, day_target="zo")
-        sunday_start_ind = len(shift_sequences_sunday[0]) - len(shift_sequences_saturday[0]) #TODO: to be tested for months starting at sundays
-
+        weekend_pairs = self._GetWeekendPairs(shifts)
         for n,nurse in enumerate(nurses.nurses):
-            for si in range(len(shift_sequences_saturday)):
-                for ind in range(len(shift_sequences_saturday[si])):
-                    model.Add(work[n, shift_sequences_sunday[si][ind+sunday_start_ind]]==1).OnlyEnforceIf(work[n, shift_sequences_saturday[si][ind]])
+            for saturday, sunday in weekend_pairs:
+                model.Add(work[n, sunday]==1).OnlyEnforceIf(work[n, saturday])
 
         return
 
     def add_limit_weekend_shifts(self, model, nurses, shifts, work):
+        weekend_shift_list, max_weekend_shifts = self._GetWeekendShifts(shifts)
+        for n,_ in enumerate(nurses.nurses):
+            model.Add(work.GetRow(n, weekend_shift_list) < max_weekend_shifts)
+
+        return
+
+    def _GetWeekendPairs(self, shifts):
+        # (saturday shift, sunday shift of the same slot), working the saturday means working the sunday
+        shift_sequences_saturday = self._GetShiftSequences(shifts, shift_target=None, day_target="za")
+        shift_sequences_sunday = self._GetShiftSequences(shifts, shift_target=None, day_target="zo")
+        sunday_start_ind = len(shift_sequences_sunday[0]) - len(shift_sequences_saturday[0]) #TODO: to be tested for months starting at sundays
+
+        weekend_pairs = []
+        for si in range(len(shift_sequences_saturday)):
+            for ind in range(len(shift_sequences_saturday[si])):
+                weekend_pairs.append((shift_sequences_saturday[si][ind], shift_sequences_sunday[si][ind+sunday_start_ind]))
+        return weekend_pairs
+
+    def _GetWeekendShifts(self, shifts):
+        # the weekend shifts and the (exclusive) limit on the weekend shifts per nurse
         shift_sequences_saturday = self._GetShiftSequences(shifts, shift_target=None, day_target="za")
         shift_sequences_sunday = self._GetShiftSequences(shifts, shift_target=None, day_target="zo")
         sunday_start_ind = len(shift_sequences_sunday[0]) - len(shift_sequences_saturday[0])
@@ -305,21 +395,101 @@ class Constraints:
 
         num_weekends = len(shift_sequences_saturday[0])
         max_weekend_shifts = (num_weekends-1) * 2
+        return weekend_shift_list, max_weekend_shifts
+
+    def add_fairness_objective(self, model, nurses, shifts, work):
+        # per category the spread (max - min) of the contract normalized shift counts: one aggregate count per nurse
+        # that bounds a max and a min variable, so the model grows linearly with the nurses (no pairwise differences)
+        obj_fairness_vars, obj_fairness_coeffs = [], []
+        for category, (category_shifts, factors) in self._GetFairnessGroups(nurses, shifts).items():
+            if len(factors) < 2:
+                continue
+            upper = max(factors.values()) * len(category_shifts)
+            high = model.NewIntVar(0, upper, f"fairness_{category}_max")
+            low = model.NewIntVar(0, upper, f"fairness_{category}_min")
+            for n, factor in factors.items():
+                count = model.NewIntVar(0, len(category_shifts), f"fairness_{category}_{n}")
+                model.Add(count == work.GetRow(n, category_shifts))
+                model.Add(high >= factor * count)
+                model.Add(low <= factor * count)
+            obj_fairness_vars.extend([high, low])
+            obj_fairness_coeffs.extend([self.FAIRNESS_COST, -self.FAIRNESS_COST])
+        return obj_fairness_vars, obj_fairness_coeffs
+
+    def _GetFairnessGroups(self, nurses, shifts):
+        # category -> (shifts, {n: normalization factor}), factor = FAIRNESS_SCALE * FULLTIME_HOURS / contract. Nurses
+        # with a zzp contract, without contract hours or that hard requests keep out of every shift of the category
+        # are left out, they would pin the minimum
+        weekend_shifts, _ = self._GetWeekendShifts(shifts)
+        categories = {"nights": [s for s, shift in enumerate(shifts.shifts) if shift.abbreviation[:-1] == "n"],
+                      "weekends": sorted(weekend_shifts),
+                      "evenings": [s for s, shift in enumerate(shifts.shifts) if shift.abbreviation[:-1] == "a"]}
+        groups = {}
+        for category, category_shifts in categories.items():
+            factors = {}
+            for n, nurse in enumerate(nurses.nurses):
+                if nurse.zzper or nurse.contract <= 0:
+                    continue
+                if all(self._IsHardExcluded(nurse, shifts, shifts.shifts[s]) for s in category_shifts):
+                    continue
+                factors[n] = int(round(self.FAIRNESS_SCALE * self.FULLTIME_HOURS / nurse.contract))
+            groups[category] = (category_shifts, factors)
+        return groups
 
-        for n,_ in enumerate(nurses.nurses):
-            model.Add(sum(work[n,s]for s in weekend_shift_list) < max_weekend_shifts)
-
-        return
+    def _IsHardExcluded(self, nurse, shifts, shift):
+        # a hard do_not_work_shift or do_not_work_day request of nurse rules out shift
+        for request in self.requests:
+            if not request.name == nurse.name:
+                continue
+            if self._Request_type_is_hard_do_not_work_shift(request) and request.shift == shift.abbreviation[:-1]:
+                return True
+            if (self._Request_type_is_hard_do_not_work_day(request) and not request.do_assign and
+                    shifts.ConvertDayStrToDayNum(request.day) == shift.start_date.weekday() and
+                    (not request.shift or request.shift == shift.abbreviation[:-1])):
+                return True
+        return False
 
     def add_max_5_shifts_per_week(self, model, nurses, shifts, work):
         shift_week_bundles = self._GetShiftWeekBundles(shifts)
         for n,_ in enumerate(nurses.nurses):
             for bundle in shift_week_bundles:
-                model.Add(sum(work[n, s] for s in bundle) <= 5)
+                model.Add(work.GetRow(n, bundle) <= 5)
+        return
+
+    def add_implied_constraints(self, model, nurses, shifts, work):
+        # redundant constraints that follow from the families above, they do not change the feasible rosters but
+        # give the solver the global counts directly
+        shift_day_bundles = self._GetShiftDayBundles(shifts)
+        shift_week_bundles = self._GetShiftWeekBundles(shifts)
+
+        # fill every shift: exactly one nurse per shift, so per day and in total
+        for bundle in shift_day_bundles:
+            model.Add(work.GetSum(slice(None), bundle) == len(bundle))
+        model.Add(work.GetSum(slice(None), slice(None)) == len(shifts.shifts))
+
+        # one shift per day, max 5 shifts per week and the 60 hour week (on the hours as counted by
+        # add_weekly_contract_hours_constraint) bound the shifts per nurse per week and so over the horizon
+        week_limits = []
+        for bundle in shift_week_bundles:
+            week_faction = len(bundle) / 56.0
+            min_hours = min(int(shifts.shifts[s].work_hours * week_faction) for s in bundle)
+            num_days = len(set(shifts.shifts[s].start_date.date() for s in bundle))
+            week_limits.append(min(5, num_days, self.MAX_WEEK_HOURS // min_hours if min_hours > 0 else num_days))
+        for n,_ in enumerate(nurses.nurses):
+            for bundle, week_limit in zip(shift_week_bundles, week_limits):
+                model.Add(work.GetRow(n, bundle) <= week_limit)
+            model.Add(work.GetRow(n) <= sum(week_limits))
+
+        # a nurse that can resuscitate on every dl, a and n shift type of the day
+        nurses_with_resuscitate_skill = self._GetNursesThatCanResuscitate(nurses)
+        for bundle in shift_day_bundles:
+            covered_types = set(shifts.shifts[s].abbreviation[:-1] for s in bundle) & {"dl", "a", "n"}
+            covered_shifts = [s for s in bundle if shifts.shifts[s].abbreviation[:-1] in covered_types]
+            model.Add(work.GetSum(nurses_with_resuscitate_skill, covered_shifts) >= len(covered_types))
         return
 
     def add_penalty_to_zzp_allocation(self, model, nurses, shifts, work):
-        cost = 1 #TODO: tune param
+        cost = self.ZZP_COST
         obj_zzp_vars, obj_zzp_coeffs = [],[]
         zzp_nurses =  self._GetAllNursesWithZZPContract(nurses)
         for s,_ in enumerate(shifts.shifts):
@@ -360,7 +530,7 @@ class Constraints:
         cost_coefficients = []
         week_faction = len(bundle) / 56.0
         sum_var = model.NewIntVar(hard_min, hard_max, '')
-        model.Add(sum_var == sum(work[n, s] * int((shifts.shifts[s].work_hours * week_faction)) for s in bundle)) # sum of hours worked for this week
+        model.Add(sum_var == work.GetWeightedSum(n, bundle, [int((shifts.shifts[s].work_hours * week_faction)) for s in bundle])) # sum of hours worked for this week
 
         # Penalize sums below the soft_min target.
         if soft_min > hard_min and min_cost > 0:
@@ -384,49 +554,17 @@ class Constraints:
         return cost_variables, cost_coefficients
 
     def add_penalized_day_evening_transition_constraint(self, model, nurses, shifts, work):
-        # Penalized transitions
-        # previous_day_shift, next_day_shift, penalty (0=hard)
-        cost = 30
-        penalized_transitions = [("dk0",  "a0", cost), # ochtend -> avond / nacht
-                                 ("dk0",  "a1", cost),
-                                 ("dm0",  "a0", cost),
-                                 ("dm0",  "a1", cost),
-                                 ("dl0",  "a0", cost),
-                                 ("dl0",  "a1", cost),
-                                 ("dl1",  "a0", cost),
-                                 ("dl1",  "a1", cost),
-                                 ("dk0",  "n0", cost),
-                                 ("dk0",  "n1", cost),
-                                 ("dm0",  "n0", cost),
-                                 ("dm0",  "n1", cost),
-                                 ("dl0",  "n0", cost),
-                                 ("dl0",  "n1", cost),
-                                 ("dl1",  "n0", cost),
-                                 ("dl1",  "n1", cost),
-                                 ("dl0", "dl1", 0),  # zelfde shift, zelfde rij
-                                 ("dl1", "dl0", 0),
-                                 ( "a0",  "a1", 0),
-                                 ( "a1",  "a0", 0),
-                                 ( "n0",  "n1", 0),
-                                 ( "n1",  "n0", 0),
-                                 ( "a0", "dk0", cost), # avond -> ochtend
-                                 ( "a0", "dm0", cost),
-                                 ( "a0", "dl0", cost),
-                                 ( "a0", "dl1", cost),
-                                 ( "a1", "dk0", cost),
-                                 ( "a1", "dm0", cost),
-                                 ( "a1", "dl0", cost),
-                                 ( "a1", "dl1", cost)]
-
         obj_bool_vars = []
         obj_bool_coeffs = []
-        for previous_shift, next_shift, cost in penalized_transitions:
+        for previous_shift, next_shift, cost in self.PENALIZED_TRANSITIONS:
             transitions = self._GetShiftDayToDayTransitions(shifts, previous_shift, next_shift)
             for n,nurse in enumerate(nurses.nurses):
-                for transition in transitions:
-                    t = [work[n,transition[0]].Not(), work[n,transition[1]].Not()]
+                firsts = work.GetVariables(n, [transition[0] for transition in transitions])
+                seconds = work.GetVariables(n, [transition[1] for transition in transitions])
+                for transition, first, second in zip(transitions, firsts, seconds):
+                    t = [first.Not(), second.Not()]
                     if cost == 0:
-                        model.Add(work[n,transition[1]]==0).OnlyEnforceIf(work[n,transition[0]])
+                        model.Add(second==0).OnlyEnforceIf(first)
                     else:
                         trans_var = model.NewBoolVar(f"transition ({nurse.name} {transition[0]} {transition[1]})")
                         t.append(trans_var)
@@ -436,17 +574,18 @@ class Constraints:
         return obj_bool_vars, obj_bool_coeffs
 
     def add_sequence_constraint(self, model, nurses, shifts, work):
-        min_seq_len = 3
-        min_cost = 2 # TODO: tune param
+        min_seq_len = self.SEQUENCE_MIN_LENGTH
+        min_cost = self.SEQUENCE_COST
         obj_seq_vars = [] 
         obj_seq_coeffs = []
         sequences_of_followup_shifts = self._GetShiftSequences(shifts)
 
         for n,_ in enumerate(nurses.nurses):
             for seq in sequences_of_followup_shifts:
+                seq_vars = work.GetVariables(n, seq)
                 for length in range(0, min_seq_len):
                     for start in range(len(seq) - length + 1):
-                        span = self._NegatedBoundedSpan(n, seq, work, start, length)
+                        span = self._NegatedBoundedSpan(seq_vars, start, length)
                         name = ': under_span(start=%i, length=%i)' % (start, length)
                         lit = model.NewBoolVar(f"under_span {n} {start} {length}")
                         span.append(lit)
@@ -462,16 +601,17 @@ class Constraints:
                 nurses_with_resuscitate_skill.append(n)
         return nurses_with_resuscitate_skill
 
-    def _NegatedBoundedSpan(self, n, seq, work, start, length):
+    def _NegatedBoundedSpan(self, seq_vars, start, length):
+        # seq_vars: the work variables of one nurse along a sequence
         span = []
         # Left border (start of works, or works[start - 1])
         if start > 0:
-            span.append(work[n, seq[start - 1]] )
+            span.append(seq_vars[start - 1])
         for i in range(length):
-            span.append(work[n, seq[start + i]].Not()) 
+            span.append(seq_vars[start + i].Not())
         # Right border (end of works or works[start + length])
-        if start + length < len(seq):
-            span.append(work[n, seq[start + length]])
+        if start + length < len(seq_vars):
+            span.append(seq_vars[start + length])
         return span
 
     def _GetShiftSequences(self, shifts, shift_target=None, day_target=None):
@@ -568,8 +708,10 @@ class Constraints:
         assert(fn)
         assert(os.path.isfile(fn))
         with open(fn) as f:
+            line_number = 0
             while(True):
                 line = f.readline()
+                line_number += 1
                 
                 if not line:
                     break
@@ -606,7 +748,7 @@ class Constraints:
                         percentage = int(clean_part)
                     elif i == 9:
                         is_hard   = int(clean_part) == 1
-                requests.append(Constraint(name, full_date, day, shift, do_assign, streakmin, streakmax, max_sum, percentage, is_hard))
+                requests.append(Constraint(name, full_date, day, shift, do_assign, streakmin, streakmax, max_sum, percentage, is_hard, f"{fn}:{line_number}"))
         return requests
 
         
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import threading
+
+from Roster import Roster
+from StaticVisualize import StaticRosterRenderer
+
+DASHBOARD_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>HoningsRooster live</title>
+<style>body{font:13px sans-serif} #penalties td{padding:1px 8px;text-align:right} button{margin:8px 0}</style>
+</head><body>
+<h1>HoningsRooster live</h1>
+<div id="status">waiting for the first solution</div>
+<button onclick="fetch('/stop', {method: 'POST'})">stop solving, keep this roster</button>
+<div id="chart"></div>
+<table id="penalties"></table>
+<div id="roster"></div>
+<script>
+let version = -1;
+async function poll() {
+  try {
+    const state = await (await fetch('/state')).json();
+    document.getElementById('status').textContent = state.status;
+    if (state.version != version) {
+      version = state.version;
+      document.getElementById('penalties').innerHTML = Object.entries(state.penalties).map(([family, penalty]) => `<tr><td>${family}</td><td>${penalty}</td></tr>`).join('');
+      document.getElementById('chart').innerHTML = await (await fetch('/chart')).text();
+      document.getElementById('roster').innerHTML = await (await fetch('/roster')).text();
+    }
+  } catch (e) {}
+  setTimeout(poll, 2000);
+}
+poll();
+</script>
+</body></html>
+"""
+
+class RosterDashboard:
+    # local web page that follows a running solve: objective/bound curve, penalties per objective family and the
+    # latest roster. The http server runs on its own asyncio loop in a background thread, on_solution is called
+    # from the solver through RosterSolutionCallback
+    def __init__(self, roster_model, host="127.0.0.1", port=8050):
+        self.roster_model = roster_model
+        self.host = host
+        self.port = port
+        self.renderer = StaticRosterRenderer()
+        self.lock = threading.Lock()
+        self.history = [] # (wall time, objective, best bound) per solution
+        self.penalties = {}
+        self.roster = None
+        self.roster_html = ""
+        self.roster_html_version = -1
+        self.version = 0
+        self.done = False
+        self.stop_requested = False
+        self._loop = None
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._Serve, args=(ready,), daemon=True)
+        self._thread.start()
+        ready.wait()
+        print(f"Dashboard at http://{self.host}:{self.port}/")
+        return
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+        return
+
+    def finish(self):
+        with self.lock:
+            self.done = True
+        return
+
+    def serve_until_interrupted(self):
+        # keeps serving the final state of the solve until Ctrl-C, then stops the server
+        print(f"Dashboard at http://{self.host}:{self.port}/ keeps the final roster, Ctrl-C to stop it")
+        try:
+            while self._thread and self._thread.is_alive():
+                self._thread.join(0.5)
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+        return
+
+    def on_solution(self, callback):
+        roster = Roster().InitFromSolver(self.roster_model.nurses, self.roster_model.shifts, self.roster_model.work, callback)
+        penalties = self.roster_model.GetPenalties(callback)
+        with self.lock:
+            self.history.append((callback.WallTime(), callback.ObjectiveValue(), callback.BestObjectiveBound()))
+            self.penalties = penalties
+            self.roster = roster
+            self.version += 1
+            stop_requested = self.stop_requested
+        if stop_requested:
+            callback.StopSearch()
+        return
+
+    def _Serve(self, ready):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._HandleClient, self.host, self.port))
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            self._loop.run_until_complete(server.wait_closed())
+            self._loop.close()
+        return
+
+    async def _HandleClient(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""): # skip the headers
+                pass
+            if len(request_line) < 2:
+                return
+            method, path = request_line[0], request_line[1].split("?")[0]
+            status, content_type, body = self._Route(method, path)
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nCache-Control: no-store\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        finally:
+            writer.close()
+        return
+
+    def _Route(self, method, path):
+        if path == "/":
+            return "200 OK", "text/html; charset=utf-8", DASHBOARD_PAGE.encode()
+        elif path == "/state":
+            return "200 OK", "application/json", json.dumps(self._GetState()).encode()
+        elif path == "/chart":
+            return "200 OK", "image/svg+xml", self._GetChartSvg().encode()
+        elif path == "/roster":
+            return "200 OK", "text/html; charset=utf-8", self._GetRosterHtml().encode()
+        elif path == "/stop" and method == "POST":
+            with self.lock:
+                self.stop_requested = True
+            return "200 OK", "application/json", b"{}"
+        return "404 Not Found", "text/plain", b"not found"
+
+    def _GetState(self):
+        with self.lock:
+            status = "waiting for the first solution"
+            if self.history:
+                wall_time, objective, bound = self.history[-1]
+                status = f"solution {len(self.history)} after {wall_time:.1f} s: objective {objective:.0f}, bound {bound:.0f}"
+            if self.done:
+                status = "finished, " + status
+            elif self.stop_requested:
+                status = "stopping, " + status
+            return {"version": self.version, "status": status, "penalties": self.penalties}
+
+    def _GetRosterHtml(self):
+        # render the latest roster at most once per solution, and only when someone looks at it
+        with self.lock:
+            roster, version = self.roster, self.version
+        if roster is None:
+            return ""
+        if self.roster_html_version != version:
+            self.roster_html = self.renderer.render_fragment(roster)
+            self.roster_html_version = version
+        return self.roster_html
+
+    def _GetChartSvg(self, width=800, height=240, margin=40):
+        with self.lock:
+            history = list(self.history)
+        if not history:
+            return ""
+        max_time = max(max(h[0] for h in history), 1e-6)
+        values = [h[1] for h in history] + [h[2] for h in history]
+        min_value, max_value = min(values), max(values)
+        value_range = max(max_value - min_value, 1e-6)
+
+        def point(wall_time, value):
+            return f"{margin + wall_time / max_time * (width - 2*margin):.1f},{height - margin - (value - min_value) / value_range * (height - 2*margin):.1f}"
+
+        objective_points = " ".join(point(h[0], h[1]) for h in history)
+        bound_points = " ".join(point(h[0], h[2]) for h in history)
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
+                f'<rect x="{margin}" y="{margin}" width="{width - 2*margin}" height="{height - 2*margin}" fill="none" stroke="#ccc"/>'
+                f'<polyline points="{objective_points}" fill="none" stroke="steelblue" stroke-width="2"/>'
+                f'<polyline points="{bound_points}" fill="none" stroke="indianred" stroke-width="2"/>'
+                f'<text x="{margin}" y="{margin - 8}" font-size="12">objective (blue) and bound (red), {max_value:.0f} .. {min_value:.0f}, 0 .. {max_time:.0f} s</text>'
+                '</svg>')
@@ -0,0 +1,423 @@
+import numpy as np
+
+class RosterEvaluator:
+    # scores assignments without a solver: a 0/1 matrix work[n, s] (N x S) or a batch of them (B x N x S) is checked
+    # against the families of Constraints, with the index bundles and the weights the model is built from. Hard
+    # violations are counted per family as the number of model constraints that do not hold, the soft penalties are
+    # the objective terms per objective family and nurse, so a solved roster scores its objective value
+    HARD_FAMILIES = ["add_fill_every_shift_constraint",
+                     "add_one_shift_per_day_constraint",
+                     "add_rest_after_night_shift_constraint",
+                     "add_skill_requirement_resuscitate",
+                     "add_weekly_contract_hours_constraint",
+                     "add_penalized_day_evening_transition_constraint",
+                     "add_favor_whole_weekend",
+                     "add_limit_weekend_shifts",
+                     "add_max_5_shifts_per_week",
+                     "add_hard_requests_do_not_work_day",
+                     "add_hard_requests_do_not_work_shift",
+                     "add_hard_requests_rest_after_n_shifts",
+                     "add_hard_requests_work_specific_day_shift",
+                     "add_hard_requests_percentage_shift"]
+    OBJECTIVE_FAMILIES = ["contract_hours", "transitions", "sequences", "zzp", "requests"]
+    HARD_COST = 10000 # per hard violation in score()
+
+    def __init__(self, nurses, shifts, constraints):
+        self.nurses = nurses
+        self.shifts = shifts
+        self.constraints = constraints
+        num_nurses = len(nurses.nurses)
+        num_shifts = len(shifts.shifts)
+        c = constraints
+
+        # shifts per day and per week as one-hot columns, day and week sums are then one matrix product
+        shift_day_bundles = c._GetShiftDayBundles(shifts)
+        self.days = np.zeros((num_shifts, len(shift_day_bundles)), dtype=np.float32)
+        for d, bundle in enumerate(shift_day_bundles):
+            self.days[bundle, d] = 1
+        shift_week_bundles = c._GetShiftWeekBundles(shifts)
+        self.weeks = np.zeros((num_shifts, len(shift_week_bundles)), dtype=np.float32)
+        self.week_hours = np.zeros((num_shifts, len(shift_week_bundles)), dtype=np.float32)
+        for w, bundle in enumerate(shift_week_bundles):
+            week_faction = len(bundle) / 56.0
+            self.weeks[bundle, w] = 1
+            self.week_hours[bundle, w] = [int(shifts.shifts[s].work_hours * week_faction) for s in bundle]
+
+        # rest after night: the night shift and its follow up shifts
+        night_bundles = [bundle for night in ["n0", "n1"] for bundle in c._GetFollowUpShiftsFromShiftType(night, ["dk0", "dm0", "dl0", "dl1", "a0", "a1"], shifts)]
+        self.nights = np.array([bundle[0] for bundle in night_bundles], dtype=np.int64)
+        self.night_follow_ups = np.zeros((num_shifts, len(night_bundles)), dtype=np.float32)
+        for i, bundle in enumerate(night_bundles):
+            self.night_follow_ups[bundle[1], i] = 1
+
+        # resuscitate: one of the two slots of every dl, a and n shift
+        self.resuscitate_nurses = np.array(c._GetNursesThatCanResuscitate(nurses), dtype=np.int64)
+        resuscitate_pairs = []
+        for shift_type in ["dl", "a", "n"]:
+            bundles = c._GetShiftSequences(shifts, shift_type)
+            resuscitate_pairs.extend(zip(bundles[0], bundles[1]))
+        self.resuscitate_pairs = np.array(resuscitate_pairs, dtype=np.int64).reshape(-1, 2)
+
+        # contract hours, an under penalty when there is a contract and an over penalty below the 60 hour week
+        contracts = [nurse.contract for nurse in nurses.nurses]
+        self.contracts = np.array([int(contract) for contract in contracts], dtype=np.float32)[:, None]
+        self.under_costs = np.array([c.CONTRACT_UNDER_COST if contract > 0 else 0 for contract in contracts], dtype=np.float32)[:, None]
+        self.over_costs = np.array([c.CONTRACT_OVER_COST if contract < c.MAX_WEEK_HOURS else 0 for contract in contracts], dtype=np.float32)[:, None]
+
+        # transitions as shift x shift matrices, work[n] @ matrix @ work[n] counts the transitions a nurse makes
+        self.transition_costs = np.zeros((num_shifts, num_shifts), dtype=np.float32)
+        self.hard_transitions = np.zeros((num_shifts, num_shifts), dtype=np.float32)
+        for previous_shift, next_shift, cost in c.PENALIZED_TRANSITIONS:
+            for first, second in c._GetShiftDayToDayTransitions(shifts, previous_shift, next_shift):
+                if cost == 0:
+                    self.hard_transitions[first, second] += 1
+                else:
+                    self.transition_costs[first, second] += cost
+
+        self.sequences = [np.array(seq, dtype=np.int64) for seq in c._GetShiftSequences(shifts)]
+
+        weekend_pairs = c._GetWeekendPairs(shifts)
+        self.saturdays = np.array([saturday for saturday, _ in weekend_pairs], dtype=np.int64)
+        self.sundays = np.array([sunday for _, sunday in weekend_pairs], dtype=np.int64)
+        weekend_shift_list, self.max_weekend_shifts = c._GetWeekendShifts(shifts)
+        self.weekend_shifts = np.array(weekend_shift_list, dtype=np.int64)
+
+        self.zzp_costs = np.zeros(num_nurses, dtype=np.float32)
+        self.zzp_costs[c._GetAllNursesWithZZPContract(nurses)] = c.ZZP_COST
+
+        # fairness: the shifts of every category with its nurses and their contract normalization factors
+        self.fairness_groups = {category: (np.array(category_shifts, dtype=np.int64), np.array(list(factors), dtype=np.int64),
+                                           np.array(list(factors.values()), dtype=np.float32))
+                                for category, (category_shifts, factors) in c._GetFairnessGroups(nurses, shifts).items()}
+
+        self._InitRequests()
+        return
+
+    def evaluate(self, work):
+        # work is N x S or B x N x S, returns {"violations": {hard family: count}, "penalties": {objective family:
+        # penalty per nurse}, "objective", "feasible"}, with a leading batch axis when work has one
+        work = np.asarray(work, dtype=np.float32)
+        single = work.ndim == 2
+        if single:
+            work = work[None]
+        assert(work.shape[1:] == (len(self.nurses.nurses), len(self.shifts.shifts)))
+        nurse_index = np.broadcast_to(np.arange(work.shape[1]), work.shape[:2])
+
+        violations = {}
+        violations["add_fill_every_shift_constraint"] = (work.sum(axis=1) != 1).sum(axis=1)
+        cover = work[:, self.resuscitate_nurses, :].sum(axis=1)
+        violations["add_skill_requirement_resuscitate"] = (cover[:, self.resuscitate_pairs].sum(axis=2) < 1).sum(axis=1)
+        nurse_violations, penalties = self._GetNurseTerms(work, nurse_index)
+        for family, count in nurse_violations.items():
+            violations[family] = count.sum(axis=1)
+
+        violations = {family: np.rint(violations[family]).astype(np.int64) for family in self.HARD_FAMILIES}
+        penalties = {family: np.rint(penalty).astype(np.int64) for family, penalty in penalties.items()}
+        result = {"violations": violations,
+                  "penalties": penalties,
+                  "objective": sum(penalty.sum(axis=1) for penalty in penalties.values()),
+                  "feasible": sum(violations.values()) == 0}
+        if single:
+            result = {"violations": {family: int(count[0]) for family, count in violations.items()},
+                      "penalties": {family: penalty[0] for family, penalty in penalties.items()},
+                      "objective": int(result["objective"][0]),
+                      "feasible": bool(result["feasible"][0])}
+        return result
+
+    def _GetNurseTerms(self, work, nurse_index):
+        # the families that only depend on the row of one nurse: work is B x M x S with the rows of the nurses in
+        # nurse_index (B x M), returns the violations and the penalties per family as B x M
+        day_counts = work @ self.days
+        hours = work @ self.week_hours
+        violations = {}
+        violations["add_one_shift_per_day_constraint"] = (day_counts > 1).sum(axis=2)
+        violations["add_rest_after_night_shift_constraint"] = ((work[:, :, self.nights] > 0) & (work @ self.night_follow_ups > 0)).sum(axis=2)
+        violations["add_weekly_contract_hours_constraint"] = (hours > self.constraints.MAX_WEEK_HOURS).sum(axis=2)
+        violations["add_penalized_day_evening_transition_constraint"] = ((work @ self.hard_transitions) * work).sum(axis=2)
+        violations["add_favor_whole_weekend"] = (work[:, :, self.saturdays] * (1 - work[:, :, self.sundays])).sum(axis=2)
+        violations["add_limit_weekend_shifts"] = (work[:, :, self.weekend_shifts].sum(axis=2) >= self.max_weekend_shifts).astype(np.int64)
+        violations["add_max_5_shifts_per_week"] = (work @ self.weeks > 5).sum(axis=2)
+        violations.update(self._GetRequestViolations(work, nurse_index, day_counts))
+
+        penalties = {}
+        contracts = self.contracts[nurse_index]
+        penalties["contract_hours"] = (self.under_costs[nurse_index] * np.maximum(contracts - hours, 0) +
+                                       self.over_costs[nurse_index] * np.maximum(hours - contracts, 0)).sum(axis=2)
+        penalties["transitions"] = ((work @ self.transition_costs) * work).sum(axis=2)
+        penalties["sequences"] = self._GetSequencePenalties(work)
+        penalties["zzp"] = work.sum(axis=2) * self.zzp_costs[nurse_index]
+        penalties["requests"] = (work * self.request_costs[nurse_index]).sum(axis=2) + self.request_offsets[nurse_index]
+        return violations, penalties
+
+    def GetFairnessSpreads(self, work):
+        # {category: max - min of the contract normalized counts} as add_fairness_objective counts them, in units of
+        # 1 / FAIRNESS_SCALE shift, with a leading batch axis when work has one. The optional fairness objective is
+        # not part of evaluate()
+        work = np.asarray(work, dtype=np.float32)
+        single = work.ndim == 2
+        if single:
+            work = work[None]
+        spreads = {}
+        for category, (category_shifts, category_nurses, factors) in self.fairness_groups.items():
+            if len(category_nurses) < 2:
+                spreads[category] = np.zeros(len(work), dtype=np.int64)
+                continue
+            counts = work[:, category_nurses][:, :, category_shifts].sum(axis=2) * factors
+            spreads[category] = np.rint(counts.max(axis=1) - counts.min(axis=1)).astype(np.int64)
+        if single:
+            spreads = {category: int(spread[0]) for category, spread in spreads.items()}
+        return spreads
+
+    def score(self, work):
+        # objective per roster with HARD_COST per hard violation, for heuristics that search through infeasible rosters
+        result = self.evaluate(work)
+        return result["objective"] + self.HARD_COST * sum(result["violations"].values())
+
+    def print_summary(self, result):
+        print()
+        print(f"Objective {result['objective']}, {'feasible' if result['feasible'] else 'infeasible'}")
+        for family, count in result["violations"].items():
+            if count:
+                print(f"  - {family}: {count} violated")
+        print("%-16s" % "nurse" + "".join("%16s" % family for family in self.OBJECTIVE_FAMILIES) + "%16s" % "total")
+        for n, nurse in enumerate(self.nurses.nurses):
+            row = [result["penalties"][family][n] for family in self.OBJECTIVE_FAMILIES]
+            print("%-16s" % nurse.name + "".join("%16d" % penalty for penalty in row) + "%16d" % sum(row))
+        totals = [result["penalties"][family].sum() for family in self.OBJECTIVE_FAMILIES]
+        print("%-16s" % "total" + "".join("%16d" % penalty for penalty in totals) + "%16d" % sum(totals))
+        return
+
+    def GetMatrix(self, roster):
+        # assignment matrix of a Roster (e.g. read back from an export), by nurse name and shift start and slot
+        nurse_index = {nurse.name: n for n, nurse in enumerate(self.nurses.nurses)}
+        shift_index = {(shift.start_date, shift.abbreviation): s for s, shift in enumerate(self.shifts.shifts)}
+        work = np.zeros((len(self.nurses.nurses), len(self.shifts.shifts)), dtype=np.int8)
+        for n, nurse_name in enumerate(roster.nurse_names):
+            assert nurse_name in nurse_index, f"unknown nurse {nurse_name}"
+            for s in roster.nurse_shifts[n]:
+                shift = roster.shifts[s]
+                assert (shift.start_date, shift.abbreviation) in shift_index, f"unknown shift {shift.abbreviation} at {shift.start_date}"
+                work[nurse_index[nurse_name], shift_index[shift.start_date, shift.abbreviation]] = 1
+        return work
+
+    def GetMatrixFromSolver(self, work, solver):
+        # one gather of the solution by the variable indices of a WorkLayout, value by value otherwise (and from a
+        # solution callback)
+        if hasattr(work, "indices") and hasattr(solver, "ResponseProto"):
+            return np.asarray(solver.ResponseProto().solution, dtype=np.int8)[work.indices]
+        return np.array([[solver.BooleanValue(work[n, s]) for s, _ in enumerate(self.shifts.shifts)] for n, _ in enumerate(self.nurses.nurses)], dtype=np.int8)
+
+    def _InitRequests(self):
+        # hard requests as lo <= sum(work[n, s] for s in shifts) <= hi rows, the rest after n shifts requests as
+        # (n, streakmax) and the soft requests as a linear penalty per nurse
+        c = self.constraints
+        nurse_index = {nurse.name: n for n, nurse in enumerate(self.nurses.nurses)}
+        num_shifts = len(self.shifts.shifts)
+        rows = [] # (family, n, shifts, lo, hi)
+        self.streaks = []
+        self.request_costs = np.zeros((len(self.nurses.nurses), num_shifts), dtype=np.float32)
+        self.request_offsets = np.zeros(len(self.nurses.nurses), dtype=np.float32)
+        self.soft_requests = [] # (n, s, do_assign), one per shift a soft request is about
+        for request in c.requests:
+            if request.name not in nurse_index:
+                continue
+            n = nurse_index[request.name]
+            if c._Request_type_is_hard_do_not_work_day(request):
+                day_num = self.shifts.ConvertDayStrToDayNum(request.day)
+                for bundle in c._GetShiftDayBundles(self.shifts, request.shift):
+                    if self.shifts.shifts[bundle[0]].start_date.weekday() == day_num:
+                        rows.append(("add_hard_requests_do_not_work_day", n, bundle, 1 if request.do_assign else 0, 1 if request.do_assign else 0))
+            if c._Request_type_is_hard_do_not_work_shift(request):
+                for bundle in c._GetShiftSequences(self.shifts, request.shift):
+                    rows.append(("add_hard_requests_do_not_work_shift", n, bundle, 0, 0))
+            if c._Request_type_is_hard_rest_after_n_shifts(request):
+                self.streaks.append((n, request.streakmax))
+            if c._Request_type_is_hard_work_specific_day_shift(request):
+                day_shifts = [s for s, shift in enumerate(self.shifts.shifts) if c._ShiftAndDateAreSameDay(shift, request.full_date) and
+                              (not request.shift or request.shift in (shift.abbreviation, shift.abbreviation[:-1]))]
+                if day_shifts:
+                    rows.append(("add_hard_requests_work_specific_day_shift", n, day_shifts, 0 if request.do_assign is False else 1, 0 if request.do_assign is False else 1))
+            if c._Request_type_is_hard_percentage_shift(request):
+                shift_day_bundles = c._GetShiftDayBundles(self.shifts, shift_type=request.shift)
+                num_weeks = len(shift_day_bundles) // 7
+                shift_hours = self.shifts.shifts[shift_day_bundles[0][0]].work_hours
+                cap = int((num_weeks*self.nurses.nurses[n].contract)/shift_hours*request.percentage/100)
+                rows.append(("add_hard_requests_percentage_shift", n, [s for bundle in shift_day_bundles for s in bundle], -num_shifts, cap))
+            if c._Request_type_is_soft_do_assign_shift(request):
+                for bundle in c._GetShiftSequences(self.shifts, request.shift, request.day):
+                    for s in bundle:
+                        self.soft_requests.append((n, s, bool(request.do_assign)))
+                        if request.do_assign: # penalize not assigning this shift
+                            self.request_offsets[n] += c.SOFT_REQUEST_COST
+                            self.request_costs[n, s] -= c.SOFT_REQUEST_COST
+                        else:
+                            self.request_costs[n, s] += c.SOFT_REQUEST_COST
+
+        self.request_families = [family for family in self.HARD_FAMILIES if "requests" in family]
+        self.request_rows = np.array([self.request_families.index(family) for family, _, _, _, _ in rows], dtype=np.int64)
+        self.request_nurses = np.array([n for _, n, _, _, _ in rows], dtype=np.int64)
+        self.request_shifts = np.zeros((len(rows), num_shifts), dtype=np.float32)
+        for i, (_, _, bundle, _, _) in enumerate(rows):
+            self.request_shifts[i, bundle] = 1
+        self.request_bounds = np.array([(lo, hi) for _, _, _, lo, hi in rows], dtype=np.float32).reshape(-1, 2)
+        return
+
+    def _GetRequestViolations(self, work, nurse_index, day_counts):
+        violations = {family: np.zeros(work.shape[:2]) for family in self.request_families}
+        if len(self.request_rows):
+            sums = work @ self.request_shifts.T
+            violated = ((sums < self.request_bounds[:, 0]) | (sums > self.request_bounds[:, 1])) & (nurse_index[:, :, None] == self.request_nurses)
+            for i, family in enumerate(self.request_families):
+                violations[family] = violated[:, :, self.request_rows == i].sum(axis=2)
+        # rest after n shifts: a shift on day d and on the streakmax-1 days after it needs a free day after them, one
+        # model constraint per choice of those shifts, up to the last day that has a day after the streak
+        for n, streakmax in self.streaks:
+            num_days = day_counts.shape[2]
+            if streakmax >= num_days:
+                continue
+            streak = day_counts[:, :, 0:num_days - streakmax]
+            for i in range(1, streakmax):
+                streak = streak * day_counts[:, :, i:num_days - streakmax + i]
+            violated = (streak * (day_counts[:, :, streakmax:] > 0)).sum(axis=2) * (nurse_index == n)
+            violations["add_hard_requests_rest_after_n_shifts"] = violations["add_hard_requests_rest_after_n_shifts"] + violated
+        return violations
+
+    def _GetSequencePenalties(self, work):
+        # under_span literals of add_sequence_constraint: for every length below the minimum a run of exactly that
+        # many shifts of a shift type on consecutive days (length 0: two free days in a row), the roster borders
+        # count as free days
+        c = self.constraints
+        penalties = np.zeros(work.shape[:2], dtype=np.float32)
+        for seq in self.sequences:
+            if not len(seq):
+                penalties += c.SEQUENCE_COST * c.SEQUENCE_MIN_LENGTH
+                continue
+            worked = np.pad(work[:, :, seq], ((0, 0), (0, 0), (1, 1)))
+            free = 1 - worked
+            num_starts = len(seq) + 1
+            for length in range(c.SEQUENCE_MIN_LENGTH):
+                span = free[:, :, 0:num_starts - length] * free[:, :, length + 1:length + 1 + num_starts - length]
+                for i in range(length):
+                    span = span * worked[:, :, i + 1:i + 1 + num_starts - length]
+                penalties += c.SEQUENCE_COST * (c.SEQUENCE_MIN_LENGTH - length) * span.sum(axis=2)
+        return penalties
+
+def Reassign(s, from_nurse, to_nurse):
+    # to_nurse takes shift s over from from_nurse
+    return [(from_nurse, s, 0), (to_nurse, s, 1)]
+
+def Swap(nurse1, s1, nurse2, s2):
+    # nurse1 and nurse2 exchange their shifts s1 and s2
+    return Reassign(s1, nurse1, nurse2) + Reassign(s2, nurse2, nurse1)
+
+class RosterChanges:
+    # scores candidate changes to a roster, e.g. the shift swaps nurses propose after it is published, as a delta
+    # against it. A change is a list of (n, s, value) assignments, only the rows of the nurses a change touches and
+    # the shifts it fills or empties are evaluated again
+    def __init__(self, evaluator, work):
+        self.evaluator = evaluator
+        self.resuscitate_nurses = set(evaluator.resuscitate_nurses.tolist())
+        self.shift_pairs = {} # s -> resuscitate pairs with s
+        for p, (first, second) in enumerate(evaluator.resuscitate_pairs.tolist()):
+            self.shift_pairs.setdefault(first, []).append(p)
+            self.shift_pairs.setdefault(second, []).append(p)
+        self.set_roster(work)
+
+    def set_roster(self, work):
+        self.work = np.array(work, dtype=np.int8)
+        result = self.evaluator.evaluate(self.work)
+        self.violations = result["violations"]
+        self.objective = result["objective"]
+        violations, penalties = self.evaluator._GetNurseTerms(self.work[None].astype(np.float32), np.arange(self.work.shape[0])[None])
+        self.nurse_violations = {family: count[0] for family, count in violations.items()}
+        self.nurse_penalties = sum(penalty[0] for penalty in penalties.values())
+        self.filled = self.work.sum(axis=0).tolist()
+        self.cover = self.work[self.evaluator.resuscitate_nurses].sum(axis=0).tolist()
+        return self
+
+    def evaluate(self, changes):
+        # per change: "feasible" (the changed roster violates no hard constraint), "delta" (objective change) and
+        # "violations" ({hard family: count in the changed roster})
+        edits = [self._GetEdits(change) for change in changes]
+        change_nurses = [sorted(set(n for n, _ in change_edits)) for change_edits in edits]
+        num_rows = max([len(nurses) for nurses in change_nurses] + [1])
+        rows = np.zeros((len(changes), num_rows, self.work.shape[1]), dtype=np.float32)
+        nurse_index = np.zeros((len(changes), num_rows), dtype=np.int64)
+        touched = np.zeros((len(changes), num_rows), dtype=np.float32) # 0 for padding rows
+        for c, (change_edits, nurses) in enumerate(zip(edits, change_nurses)):
+            for m, n in enumerate(nurses):
+                rows[c, m] = self.work[n]
+                nurse_index[c, m] = n
+                touched[c, m] = 1
+            for (n, s), value in change_edits.items():
+                rows[c, nurses.index(n), s] = value
+
+        violations, penalties = self.evaluator._GetNurseTerms(rows, nurse_index)
+        delta = ((sum(penalties.values()) - self.nurse_penalties[nurse_index]) * touched).sum(axis=1)
+        changed_violations = {}
+        for family, count in violations.items():
+            changed_violations[family] = self.violations[family] + ((count - self.nurse_violations[family][nurse_index]) * touched).sum(axis=1)
+        shift_deltas = np.array([self._GetShiftViolationDeltas(change_edits) for change_edits in edits], dtype=np.float32).reshape(-1, 2)
+        changed_violations["add_fill_every_shift_constraint"] = self.violations["add_fill_every_shift_constraint"] + shift_deltas[:, 0]
+        changed_violations["add_skill_requirement_resuscitate"] = self.violations["add_skill_requirement_resuscitate"] + shift_deltas[:, 1]
+
+        changed_violations = {family: np.rint(changed_violations[family]).astype(np.int64) for family in self.evaluator.HARD_FAMILIES}
+        return {"feasible": sum(changed_violations.values()) == 0,
+                "delta": np.rint(delta).astype(np.int64),
+                "violations": changed_violations}
+
+    def rank(self, changes, top=None):
+        # indices of the feasible changes, best (lowest objective delta) first
+        result = self.evaluate(changes)
+        ranked = sorted(np.flatnonzero(result["feasible"]).tolist(), key=lambda c: result["delta"][c])
+        return (ranked[:top] if top else ranked), result
+
+    def apply(self, change):
+        work = self.work.copy()
+        for (n, s), value in self._GetEdits(change).items():
+            work[n, s] = value
+        return self.set_roster(work)
+
+    def GetSwapCandidates(self, n):
+        # every shift of nurse n given to another nurse, and exchanged for a shift on the same day of another nurse
+        shifts = self.evaluator.shifts.shifts
+        changes = []
+        for s in np.flatnonzero(self.work[n]).tolist():
+            day = shifts[s].start_date.date()
+            same_day = [s2 for s2, shift in enumerate(shifts) if shift.start_date.date() == day and s2 != s]
+            for other in range(self.work.shape[0]):
+                if other == n:
+                    continue
+                changes.append(Reassign(s, n, other))
+                changes.extend(Swap(n, s, other, s2) for s2 in same_day if self.work[other, s2])
+        return changes
+
+    def GetDescription(self, change):
+        nurses = self.evaluator.nurses.nurses
+        shifts = self.evaluator.shifts.shifts
+        return ", ".join(f"{nurses[n].name} {'+' if value else '-'}{shifts[s].abbreviation} {shifts[s].start_date.date()}" for (n, s), value in self._GetEdits(change).items())
+
+    def _GetEdits(self, change):
+        # (n, s) -> value of the assignments that change the roster, the last one wins
+        edits = {}
+        for n, s, value in change:
+            edits[n, s] = int(value)
+        return {key: value for key, value in edits.items() if value != self.work[key]}
+
+    def _GetShiftViolationDeltas(self, edits):
+        # change in the violated fill every shift and resuscitate constraints, from the shifts the edits touch
+        filled = {}
+        cover = {}
+        for (n, s), value in edits.items():
+            change = value - int(self.work[n, s])
+            filled[s] = filled.get(s, 0) + change
+            if n in self.resuscitate_nurses:
+                cover[s] = cover.get(s, 0) + change
+        fill_delta = sum(int(self.filled[s] + change != 1) - int(self.filled[s] != 1) for s, change in filled.items())
+        resuscitate_delta = 0
+        for p in set(p for s in cover for p in self.shift_pairs.get(s, [])):
+            first, second = self.evaluator.resuscitate_pairs[p]
+            old_cover = self.cover[first] + self.cover[second]
+            new_cover = old_cover + cover.get(first, 0) + cover.get(second, 0)
+            resuscitate_delta += int(new_cover < 1) - int(old_cover < 1)
+        return fill_delta, resuscitate_delta
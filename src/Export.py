@@ -0,0 +1,182 @@
+import csv
+import json
+import os
+
+def GetRosterFormat(fn):
+    extension = os.path.splitext(fn)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    elif extension in (".jsonl", ".json"):
+        return "jsonl"
+    elif extension in (".parquet", ".pq"):
+        return "parquet"
+    assert False, f"unknown roster export format for {fn}"
+
+class RosterWriter:
+    # streams rows to csv, json lines or parquet in chunks of chunk_size rows
+    def __init__(self, fn, columns, fmt=None, chunk_size=4096):
+        assert(fn)
+        assert(chunk_size > 0)
+        self.fn = fn
+        self.columns = columns
+        self.fmt = fmt if fmt else GetRosterFormat(fn)
+        self.chunk_size = chunk_size
+        self.num_rows = 0
+        self._file = None
+        self._csv_writer = None
+        self._parquet_writer = None
+        self._parquet_schema = None
+        self._Open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def write(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._WriteChunk(chunk)
+                chunk = []
+        if chunk:
+            self._WriteChunk(chunk)
+        return
+
+    def close(self):
+        if self._parquet_writer:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if self._file:
+            self._file.close()
+            self._file = None
+        return
+
+    def _Open(self):
+        if self.fmt == "csv":
+            self._file = open(self.fn, "w", newline="")
+            self._csv_writer = csv.writer(self._file, delimiter=";")
+            self._csv_writer.writerow(self.columns)
+        elif self.fmt == "jsonl":
+            self._file = open(self.fn, "w")
+        elif self.fmt == "parquet":
+            # parquet support is optional, only import pyarrow when it is asked for
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError as e:
+                raise RuntimeError("parquet export requires pyarrow to be installed") from e
+            parquet_types = {"slot": pyarrow.int64(), "hours": pyarrow.float64()} # everything else is a string
+            self._parquet_schema = pyarrow.schema([(column, parquet_types.get(column, pyarrow.string())) for column in self.columns])
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(self.fn, self._parquet_schema)
+        else:
+            assert False, f"unknown roster export format {self.fmt}"
+        return
+
+    def _WriteChunk(self, chunk):
+        if self.fmt == "csv":
+            self._csv_writer.writerows(chunk)
+        elif self.fmt == "jsonl":
+            self._file.writelines(json.dumps(dict(zip(self.columns, row))) + "\n" for row in chunk)
+        elif self.fmt == "parquet":
+            import pyarrow
+            table = pyarrow.Table.from_pylist([dict(zip(self.columns, row)) for row in chunk], schema=self._parquet_schema)
+            self._parquet_writer.write_table(table)
+        self.num_rows += len(chunk)
+        return
+
+class RosterReader:
+    # reads back rows written by RosterWriter as dicts, chunk by chunk
+    def __init__(self, fn, fmt=None, chunk_size=4096):
+        assert(fn)
+        assert(os.path.isfile(fn))
+        self.fn = fn
+        self.fmt = fmt if fmt else GetRosterFormat(fn)
+        self.chunk_size = chunk_size
+
+    def rows(self):
+        if self.fmt == "csv":
+            with open(self.fn, newline="") as f:
+                for row in csv.DictReader(f, delimiter=";"):
+                    yield row
+        elif self.fmt == "jsonl":
+            with open(self.fn) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        elif self.fmt == "parquet":
+            try:
+                import pyarrow.parquet
+            except ImportError as e:
+                raise RuntimeError("parquet import requires pyarrow to be installed") from e
+            for batch in pyarrow.parquet.ParquetFile(self.fn).iter_batches(batch_size=self.chunk_size):
+                for row in batch.to_pylist():
+                    yield row
+        else:
+            assert False, f"unknown roster export format {self.fmt}"
+
+class RosterExporter:
+    LONG_COLUMNS = ["nurse", "date", "shift_type", "slot", "start", "end", "hours"]
+
+    def __init__(self, chunk_size=4096):
+        self.chunk_size = chunk_size
+
+    def export(self, nurses, shifts, work, solver, fn, layout="long", fmt=None):
+        columns = self.GetColumns(shifts, layout)
+        with RosterWriter(fn, columns, fmt, self.chunk_size) as writer:
+            writer.write(self.IterRows(nurses, shifts, work, solver, layout))
+        print(f"Wrote {fn} ({writer.num_rows} rows)")
+        return writer.num_rows
+
+    def GetColumns(self, shifts, layout="long"):
+        if layout == "long":
+            return self.LONG_COLUMNS
+        elif layout == "wide":
+            return ["nurse"] + [day.isoformat() for day in self._GetDays(shifts)]
+        assert False, f"unknown roster export layout {layout}"
+
+    def IterRows(self, nurses, shifts, work, solver, layout="long"):
+        if layout == "long":
+            return self.IterLongRows(nurses, shifts, work, solver)
+        elif layout == "wide":
+            return self.IterWideRows(nurses, shifts, work, solver)
+        assert False, f"unknown roster export layout {layout}"
+
+    def IterLongRows(self, nurses, shifts, work, solver):
+        # one row per assigned shift, ordered by nurse and shift
+        for n,nurse in enumerate(nurses.nurses):
+            for s,shift in enumerate(shifts.shifts):
+                if not solver.Value(work[n,s]):
+                    continue
+                yield self._GetLongRow(nurse, shift)
+
+    def IterWideRows(self, nurses, shifts, work, solver):
+        # one row per nurse with the shift abbreviation (or empty) for every day of the roster
+        days = self._GetDays(shifts)
+        day_index = {day: d for d,day in enumerate(days)}
+        for n,nurse in enumerate(nurses.nurses):
+            row = [nurse.name] + [""] * len(days)
+            for s,shift in enumerate(shifts.shifts):
+                if solver.Value(work[n,s]):
+                    row[1 + day_index[shift.start_date.date()]] = shift.abbreviation
+            yield row
+
+    def _GetLongRow(self, nurse, shift):
+        return [nurse.name,
+                shift.start_date.date().isoformat(),
+                shift.abbreviation[:-1],
+                int(shift.abbreviation[-1]),
+                shift.start_date.isoformat(timespec="minutes"),
+                shift.end_date.isoformat(timespec="minutes"),
+                shift.work_hours]
+
+    def _GetDays(self, shifts):
+        days = []
+        for shift in shifts.shifts:
+            day = shift.start_date.date()
+            if not days or days[-1] != day:
+                days.append(day)
+        return days
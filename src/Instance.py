@@ -0,0 +1,126 @@
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from Nurse import Nurses
+from Shift import Shifts
+from Constraint import Constraints
+
+class Instance:
+    # nurses, shifts and requests of one ward read from <data_dir>/{nurses,shifts,requests}.csv, for a whole month
+    # or for num_days days starting at the first of the month
+    def __init__(self, data_dir, year, month, num_days=None):
+        self.data_dir = data_dir
+        self.year = year
+        self.month = month
+        self.num_days = num_days
+        start_time = time.perf_counter()
+        self.nurses = Nurses(os.path.join(data_dir, "nurses.csv"))
+        if num_days:
+            start_date = datetime(year, month, 1)
+            self.shifts = Shifts(os.path.join(data_dir, "shifts.csv"), start_date=start_date, end_date=start_date + timedelta(days=num_days))
+        else:
+            self.shifts = Shifts(os.path.join(data_dir, "shifts.csv"), year, month)
+        requests_fn = os.path.join(data_dir, "requests.csv")
+        self.constraints = Constraints(general_request_fn=requests_fn if os.path.isfile(requests_fn) else None, specific_request_fn=None)
+        self.conflicts = self.constraints.check_requests(self.nurses, self.shifts)
+        self.load_time = time.perf_counter() - start_time
+
+    def GetFilenames(self):
+        return GetInstanceFilenames(self.data_dir)
+
+def GetInstanceFilenames(data_dir):
+    # the input files of the instance in data_dir, requests.csv is optional
+    return [os.path.join(data_dir, fn) for fn in ("nurses.csv", "shifts.csv", "requests.csv") if os.path.isfile(os.path.join(data_dir, fn))]
+
+class InstanceGenerator:
+    # writes synthetic nurses.csv, shifts.csv and requests.csv in the formats read by Nurses, Shifts and Constraints
+    SHIFT_TYPES = [("Dienst kort",   "dk", "07.00", "13.00", 1),
+                   ("Dienst midden", "dm", "08.00", "16.30", 1),
+                   ("Dienst lang",   "dl", "07.30", "17.00", 2),
+                   ("Avond",         "a",  "15.00", "23.00", 2),
+                   ("Nacht",         "n",  "22.45", "07.15", 2)]
+    CONTRACTS = [24, 28, 32, 36]
+    DAYS = ["ma", "di", "wo", "do", "vr", "za", "zo"]
+
+    def __init__(self, num_nurses=20, zzp_share=0.1, resuscitate_share=0.6, request_density=0.2, seed=0, name_prefix="nurse",
+                 cover_request_kinds=False, start_date=None):
+        # request_density: expected number of requests per nurse, name_prefix: keeps the nurses of different wards apart,
+        # cover_request_kinds: also one request of every kind (on the first nurses), so every request family has
+        # constraints whatever the density. The date requests need start_date, the first day of the roster
+        self.num_nurses = num_nurses
+        self.zzp_share = zzp_share
+        self.resuscitate_share = resuscitate_share
+        self.request_density = request_density
+        self.seed = seed
+        self.name_prefix = name_prefix
+        self.cover_request_kinds = cover_request_kinds
+        self.start_date = start_date
+
+    def write(self, data_dir):
+        rng = random.Random(self.seed)
+        os.makedirs(data_dir, exist_ok=True)
+        names = [f"{self.name_prefix}{n:03d}" for n in range(self.num_nurses)]
+        self._WriteShifts(os.path.join(data_dir, "shifts.csv"))
+        self._WriteNurses(os.path.join(data_dir, "nurses.csv"), names, rng)
+        self._WriteRequests(os.path.join(data_dir, "requests.csv"), names, rng)
+        return data_dir
+
+    def _WriteShifts(self, fn):
+        with open(fn, "w") as f:
+            f.write("# name;abbreviation;start;end;count\n")
+            for name, abbreviation, start, end, count in self.SHIFT_TYPES:
+                f.write(f"{name};{abbreviation};{start};{end};{count}\n")
+        return
+
+    def _WriteNurses(self, fn, names, rng):
+        num_zzp = int(round(self.zzp_share * len(names)))
+        # at least three nurses that can resuscitate, one for each of dl, a and n on the same day
+        num_resuscitate = max(3, int(round(self.resuscitate_share * len(names))))
+        resuscitate = set(rng.sample(range(len(names)), min(num_resuscitate, len(names))))
+        with open(fn, "w") as f:
+            f.write("# name;contract;level;zzp;headnurse;resuscitate\n")
+            for n, name in enumerate(names):
+                zzper = n >= len(names) - num_zzp
+                f.write(f"{name};{rng.choice(self.CONTRACTS)};{rng.randint(1, 3)};{int(zzper)};{int(n == 0)};{int(n in resuscitate)}\n")
+        return
+
+    def _WriteRequests(self, fn, names, rng):
+        with open(fn, "w") as f:
+            f.write("# name;full_date;day;shift;do_assign;streakmin;streakmax;max_sum;percentage;is_hard\n")
+            if self.cover_request_kinds:
+                # from a generator of their own, the same requests for any number of nurses
+                kinds_rng = random.Random(self.seed)
+                kinds = ["soft_shift", "day", "shift", "percentage", "rest_after_n"] + (["date"] if self.start_date else [])
+                for k, kind in enumerate(kinds):
+                    f.write(self._GetRequestLine(names[k % len(names)], kind, kinds_rng))
+            for name in names:
+                num_requests = int(self.request_density) + (1 if rng.random() < self.request_density % 1 else 0)
+                for _ in range(num_requests):
+                    kind = rng.random()
+                    if kind < 0.35:
+                        f.write(self._GetRequestLine(name, "soft_shift", rng))
+                    elif kind < 0.7:
+                        f.write(self._GetRequestLine(name, "day", rng))
+                    elif kind < 0.8:
+                        f.write(self._GetRequestLine(name, "shift", rng))
+                    elif kind < 0.9:
+                        f.write(self._GetRequestLine(name, "percentage", rng))
+                    else:
+                        f.write(self._GetRequestLine(name, "rest_after_n", rng))
+        return
+
+    def _GetRequestLine(self, name, kind, rng):
+        if kind == "soft_shift": # soft: (do not) assign a shift type
+            return f"{name};;;{rng.choice([abbreviation for _, abbreviation, _, _, _ in self.SHIFT_TYPES])};{rng.randint(0, 1)};;;;;0\n"
+        elif kind == "day": # hard: do not work on a day of the week
+            return f"{name};;{rng.choice(self.DAYS)};;0;;;;;1\n"
+        elif kind == "shift": # hard: never this shift type
+            return f"{name};;;{rng.choice(['a', 'n'])};0;;;;;1\n"
+        elif kind == "percentage": # hard: at most a percentage of the contract in this shift type
+            return f"{name};;;{rng.choice(['a', 'n'])};;;;;{rng.choice([25, 50])};1\n"
+        elif kind == "rest_after_n": # hard: rest after at most 3 to 5 shifts in a row, the longest streak the family supports
+            return f"{name};;;;;;{rng.randint(3, 5)};;;1\n"
+        # hard: work a shift on a date in the first week
+        return f"{name};{(self.start_date + timedelta(days=rng.randrange(7))).strftime('%m-%d-%Y')};;;1;;;;;1\n"
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from ortools.sat.python import cp_model
+
+from Export import RosterExporter
+from Instance import Instance
+from Model import RosterModel
+from Profile import HashFiles, HashSources, SolveProfile
+
+def RunJob(job):
+    # solves one queued job in a worker process and returns the roster rows and statistics, with the hashes of the
+    # input files as they were read
+    instance = Instance(job["data_dir"], job["year"], job["month"], job["num_days"])
+    inputs = {os.path.basename(fn): digest for fn, digest in HashFiles(instance.GetFilenames()).items()}
+    roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints).build()
+    solver = SolveProfile(**job["profile"]).apply(cp_model.CpSolver())
+    status = solver.Solve(roster_model.model)
+    result = {"solver_status": solver.StatusName(status), "wall_time": solver.WallTime(), "conflicts": solver.NumConflicts(),
+              "branches": solver.NumBranches(), "bound": solver.BestObjectiveBound(), "objective": None, "penalties": {},
+              "columns": RosterExporter.LONG_COLUMNS, "rows": [], "inputs": inputs}
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result["objective"] = solver.ObjectiveValue()
+        result["penalties"] = roster_model.GetPenalties(solver)
+        result["rows"] = list(RosterExporter().IterLongRows(instance.nurses, instance.shifts, roster_model.work, solver))
+    return result
+
+class RosterJobQueue:
+    # solve jobs in a SQLite file, shared by every planner on the machine. A job is keyed by a hash of its input
+    # files, horizon, solve profile and the solver sources, so submitting a job that is queued, running or done
+    # returns the existing one. Workers claim queued jobs, solve them on a process pool and store the compressed
+    # roster and statistics. Finished jobs are evicted when older than max_age or, least recently used first, when
+    # the stored results exceed max_bytes. A running job whose worker died (it is still running max_time plus
+    # STALE_MARGIN after it started) is queued again, every claim is a new attempt and only the worker of the latest
+    # attempt stores its result. A result from input files that changed after the submit is not stored
+    STALE_MARGIN = 600.0 # seconds for loading, building and storing on top of the solver time limit
+
+    def __init__(self, fn="roster_jobs.sqlite", max_processes=2, max_bytes=256*1024*1024, max_age=7*24*3600):
+        self.fn = fn
+        self.max_processes = max_processes
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.db = sqlite3.connect(fn, timeout=60)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                               key TEXT PRIMARY KEY, status TEXT, job TEXT, result BLOB, size INTEGER DEFAULT 0,
+                               submitted REAL, started REAL, finished REAL, accessed REAL, error TEXT, attempt INTEGER DEFAULT 0)""")
+        if "attempt" not in [column[1] for column in self.db.execute("PRAGMA table_info(jobs)")]: # a queue file of before the attempts
+            self.db.execute("ALTER TABLE jobs ADD COLUMN attempt INTEGER DEFAULT 0")
+        self.db.commit()
+
+    def submit(self, data_dir, year, month, num_days=None, profile=None):
+        profile = profile if profile else SolveProfile()
+        instance = Instance(data_dir, year, month, num_days)
+        inputs = {os.path.basename(fn): digest for fn, digest in HashFiles(instance.GetFilenames()).items()}
+        job = {"data_dir": data_dir, "year": year, "month": month, "num_days": num_days, "profile": profile.to_dict(), "inputs": inputs}
+        key = hashlib.sha256(json.dumps({"inputs": inputs, "year": year, "month": month, "num_days": num_days,
+                                         "profile": profile.to_dict(), "code": HashSources()}, sort_keys=True).encode()).hexdigest()[:16]
+        now = time.time()
+        self._RequeueStale()
+        with self.db:
+            row = self.db.execute("SELECT status FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] == "failed":
+                self.db.execute("INSERT OR REPLACE INTO jobs (key, status, job, submitted, accessed) VALUES (?, 'queued', ?, ?, ?)",
+                                (key, json.dumps(job), now, now))
+            else:
+                self.db.execute("UPDATE jobs SET accessed = ? WHERE key = ?", (now, key))
+        return key
+
+    def work(self, max_jobs=None):
+        # solves queued jobs until there are none left, returns the keys of the jobs it finished
+        finished = []
+        with ProcessPoolExecutor(max_workers=self.max_processes) as executor:
+            running = {}
+            while True:
+                while len(running) < self.max_processes and (max_jobs is None or len(finished) + len(running) < max_jobs):
+                    claimed = self._Claim()
+                    if claimed is None:
+                        break
+                    key, job, attempt = claimed
+                    running[executor.submit(RunJob, job)] = (key, job, attempt)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, job, attempt = running.pop(future)
+                    self._Finish(key, job, attempt, future)
+                    finished.append(key)
+        self.evict()
+        return finished
+
+    def get(self, key):
+        # status and, when done, the result of a job
+        with self.db:
+            row = self.db.execute("SELECT status, result, error FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE jobs SET accessed = ? WHERE key = ?", (time.time(), key))
+        status, result, error = row
+        job = {"key": key, "status": status, "error": error}
+        if result is not None:
+            job.update(json.loads(zlib.decompress(result)))
+        return job
+
+    def list(self):
+        return self.db.execute("SELECT key, status, job, size, submitted, started, finished FROM jobs ORDER BY submitted").fetchall()
+
+    def evict(self):
+        now = time.time()
+        with self.db:
+            evicted = self.db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished < ?", (now - self.max_age,)).rowcount
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM jobs").fetchone()[0]
+            for key, size in self.db.execute("SELECT key, size FROM jobs WHERE status = 'done' ORDER BY accessed").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.db.execute("DELETE FROM jobs WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+        return evicted
+
+    def _Claim(self):
+        # the oldest queued job, the status check keeps two workers from claiming the same job
+        self._RequeueStale()
+        with self.db:
+            for key, job, attempt in self.db.execute("SELECT key, job, attempt FROM jobs WHERE status = 'queued' ORDER BY submitted").fetchall():
+                if self.db.execute("UPDATE jobs SET status = 'running', started = ?, attempt = ? WHERE key = ? AND status = 'queued'",
+                                   (time.time(), attempt + 1, key)).rowcount:
+                    return key, json.loads(job), attempt + 1
+        return None
+
+    def _RequeueStale(self):
+        now = time.time()
+        with self.db:
+            for key, job, started in self.db.execute("SELECT key, job, started FROM jobs WHERE status = 'running'").fetchall():
+                if started < now - json.loads(job)["profile"]["max_time"] - self.STALE_MARGIN:
+                    self.db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE key = ? AND status = 'running' AND started = ?", (key, started))
+        return
+
+    def _Finish(self, key, job, attempt, future):
+        # only while the job is still running this attempt, a stale attempt that was queued again does not overwrite
+        now = time.time()
+        claimed = "WHERE key = ? AND status = 'running' AND attempt = ?"
+        with self.db:
+            if future.exception() is not None:
+                self.db.execute(f"UPDATE jobs SET status = 'failed', finished = ?, error = ? {claimed}", (now, repr(future.exception()), key, attempt))
+            elif future.result()["inputs"] != job.get("inputs", future.result()["inputs"]): # jobs queued before the inputs were stored are not checked
+                # the input files changed after the submit, a new submit has a new key
+                self.db.execute(f"UPDATE jobs SET status = 'failed', finished = ?, error = ? {claimed}", (now, "input files changed after the submit", key, attempt))
+            elif not future.result()["rows"]:
+                # no roster within the time limit, a new submit tries again
+                self.db.execute(f"UPDATE jobs SET status = 'failed', finished = ?, error = ? {claimed}", (now, future.result()["solver_status"], key, attempt))
+            else:
+                result = zlib.compress(json.dumps(future.result()).encode())
+                self.db.execute(f"UPDATE jobs SET status = 'done', finished = ?, accessed = ?, result = ?, size = ? {claimed}",
+                                (now, now, result, len(result), key, attempt))
+        return
@@ -0,0 +1,326 @@
+import numbers
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from ortools.sat.python import cp_model
+from ortools.sat import cp_model_pb2
+
+class RosterModel:
+    # constraint families in build order, with the objective family of the penalties they return (None: hard only)
+    FAMILIES = [("add_fill_every_shift_constraint", None),
+                ("add_one_shift_per_day_constraint", None),
+                ("add_rest_after_night_shift_constraint", None),
+                ("add_skill_requirement_resuscitate", None),
+                ("add_weekly_contract_hours_constraint", "contract_hours"),
+                ("add_penalized_day_evening_transition_constraint", "transitions"),
+                ("add_sequence_constraint", "sequences"),
+                ("add_favor_whole_weekend", None),
+                ("add_limit_weekend_shifts", None),
+                ("add_max_5_shifts_per_week", None),
+                ("add_penalty_to_zzp_allocation", "zzp"),
+                # requests
+                ("add_hard_requests_do_not_work_day", None),
+                ("add_hard_requests_do_not_work_shift", None),
+                ("add_hard_requests_rest_after_n_shifts", None),
+                ("add_hard_requests_work_specific_day_shift", None),
+                ("add_hard_requests_percentage_shift", None),
+                ("add_soft_requests_do_assign_shift", "requests")]
+    REQUEST_FAMILIES = [family for family, _ in FAMILIES if "requests" in family]
+
+    def __init__(self, nurses, shifts, constraints, measure_sizes=False, implied_constraints=False, fairness=False, dense=True):
+        self.nurses = nurses
+        self.shifts = shifts
+        self.constraints = constraints
+        self.model = cp_model.CpModel()
+        self.work = None # WorkLayout (dense) or WorkDict of the work[n, s] variables, made by build()
+        self.objective_terms = {} # objective family -> (variables, coefficients)
+        self.build_times = {} # constraint family -> seconds
+        self.measure_sizes = measure_sizes
+        self.family_sizes = {} # constraint family -> {"variables", "constraints", "literals", "objective_terms"}, when measure_sizes
+        self.implied_constraints = implied_constraints # add the redundant add_implied_constraints family
+        self.fairness = fairness # add the add_fairness_objective family
+        self.dense = dense # work is a WorkLayout, a WorkDict otherwise
+        self.last_penalties = None # what the last added family returned
+
+    def build(self, families=None):
+        self._AddWorkVariables()
+        for family, objective_family in self._GetFamilies(families):
+            self.add_family(family, objective_family)
+        self.minimize()
+        return self
+
+    def build_parallel(self, num_processes, families=None):
+        # builds every family in a process pool as a fragment over the same work[n, s] variables and merges the
+        # fragments in build order, the result is the model build() makes
+        self._AddWorkVariables()
+        proto = self.model.Proto()
+        num_work = len(proto.variables)
+        build_families = self._GetFamilies(families)
+        with ProcessPoolExecutor(max_workers=num_processes, initializer=InitFragmentWorker,
+                                 initargs=(self.nurses, self.shifts, self.constraints, self.measure_sizes)) as executor:
+            fragments = executor.map(BuildFragment, [family for family, _ in build_families])
+            for (family, objective_family), (data, penalties, build_time, sizes) in zip(build_families, fragments):
+                fragment = cp_model_pb2.CpModelProto.FromString(data)
+                offset = len(proto.variables) - num_work
+                proto.variables.extend(fragment.variables[num_work:])
+                if offset:
+                    for constraint in fragment.constraints:
+                        RemapReferences(constraint, num_work, offset)
+                proto.constraints.extend(fragment.constraints)
+                self.build_times[family] = build_time
+                if self.measure_sizes:
+                    self.family_sizes[family] = sizes
+                if objective_family:
+                    variables = [self._GetVar(_IndexVar(RemapReference(index, num_work, offset))) for index in penalties[0]]
+                    self.add_objective_terms(objective_family, variables, penalties[1])
+        self.minimize()
+        return self
+
+    def copy(self, constraints=None):
+        # independent copy of the model built so far, optionally with other requests for the families still to add
+        roster_model = RosterModel(self.nurses, self.shifts, constraints if constraints else self.constraints, self.measure_sizes, self.implied_constraints, self.fairness, self.dense)
+        roster_model.model.CopyFrom(self.model)
+        roster_model.work = self.work.CopyTo(roster_model.model)
+        for objective_family, (variables, coefficients) in self.objective_terms.items():
+            roster_model.objective_terms[objective_family] = ([roster_model._GetVar(var) for var in variables], list(coefficients))
+        roster_model.build_times = dict(self.build_times)
+        roster_model.family_sizes = dict(self.family_sizes)
+        return roster_model
+
+    def add_family(self, family, objective_family=None):
+        proto = self.model.Proto()
+        num_variables, num_constraints = len(proto.variables), len(proto.constraints)
+        start_time = time.perf_counter()
+        penalties = getattr(self.constraints, family)(self.model, self.nurses, self.shifts, self.work)
+        self.last_penalties = penalties
+        self.build_times[family] = time.perf_counter() - start_time
+        if self.measure_sizes:
+            self.family_sizes[family] = {"variables": len(proto.variables) - num_variables,
+                                         "constraints": len(proto.constraints) - num_constraints,
+                                         "literals": sum(CountReferences(proto.constraints[c]) for c in range(num_constraints, len(proto.constraints))),
+                                         "objective_terms": len(penalties[0]) if penalties else 0}
+        if objective_family:
+            self.add_objective_terms(objective_family, penalties[0], penalties[1])
+        return
+
+    def add_objective_terms(self, objective_family, variables, coefficients):
+        assert(len(variables) == len(coefficients))
+        family_variables, family_coefficients = self.objective_terms.setdefault(objective_family, ([], []))
+        family_variables.extend(variables)
+        family_coefficients.extend(coefficients)
+        return
+
+    def minimize(self):
+        variables, coefficients = [], []
+        for family_variables, family_coefficients in self.objective_terms.values():
+            variables.extend(family_variables)
+            coefficients.extend(family_coefficients)
+        self.model.Minimize(cp_model.LinearExpr.WeightedSum(variables, coefficients))
+        return
+
+    def GetPenalties(self, solver):
+        # objective value per objective family, solver can be a CpSolver or a solution callback
+        penalties = {}
+        for objective_family, (variables, coefficients) in self.objective_terms.items():
+            penalties[objective_family] = sum(solver.Value(variables[i]) * coefficients[i] for i in range(len(variables)))
+        return penalties
+
+    def _AddWorkVariables(self):
+        # work[n, s] are the first len(nurses) * len(shifts) variables of the model, row by row
+        layout = WorkLayout if self.dense else WorkDict
+        self.work = layout(self.model, len(self.nurses.nurses), len(self.shifts.shifts))
+        return
+
+    def _GetFamilies(self, families=None):
+        build_families = [(family, objective_family) for family, objective_family in self.FAMILIES if families is None or family in families]
+        if self.implied_constraints:
+            build_families.append(("add_implied_constraints", None))
+        if self.fairness:
+            build_families.append(("add_fairness_objective", "fairness"))
+        return build_families
+
+    def _GetVar(self, var):
+        # the variable of this model with the index of var, negative indices are negated literals
+        if var.Index() < 0:
+            return self.model.GetBoolVarFromProtoIndex(-var.Index() - 1).Not()
+        return self.model.GetIntVarFromProtoIndex(var.Index())
+
+def GetLayoutIndices(key, size):
+    # an index, a list of indices or a slice of range(size) as a sequence of indices
+    if isinstance(key, numbers.Integral):
+        return [key]
+    if isinstance(key, slice):
+        return range(size)[key]
+    return key
+
+class WorkLayout:
+    # the work[n, s] variables as an N x S array of model variable indices, row by row, and one variable object per
+    # index in a flat list. work[n, s], keys(), values() and items() read like a dict, GetSum and the other helpers
+    # build the linear expressions over a nurse's row, a shift's column or a bundle without hashing (n, s) per
+    # variable. The variables are added to the proto directly, the model is the one NewBoolVar would make
+    def __init__(self, model, num_nurses, num_shifts, indices=None):
+        self.num_nurses = num_nurses
+        self.num_shifts = num_shifts
+        proto = model.Proto()
+        if indices is None:
+            first = len(proto.variables)
+            for n in range(num_nurses):
+                for s in range(num_shifts):
+                    var = proto.variables.add()
+                    var.domain.extend([0, 1])
+                    var.name = f"{n}_{s}"
+            indices = np.arange(first, first + num_nurses * num_shifts, dtype=np.int32).reshape(num_nurses, num_shifts)
+        self.indices = indices
+        self.variables = [cp_model.IntVar(proto, index, None) for index in indices.ravel().tolist()]
+
+    def __getitem__(self, key):
+        n, s = key
+        return self.variables[n * self.num_shifts + s]
+
+    def __len__(self):
+        return len(self.variables)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return [(n, s) for n in range(self.num_nurses) for s in range(self.num_shifts)]
+
+    def values(self):
+        return list(self.variables)
+
+    def items(self):
+        return list(zip(self.keys(), self.variables))
+
+    def CopyTo(self, model):
+        # the same layout over a copy of the model
+        return WorkLayout(model, self.num_nurses, self.num_shifts, self.indices)
+
+    def GetVariables(self, nurses, shifts):
+        # work[n, s] for nurses x shifts row by row, both an index, a list of indices or a slice
+        variables, num_shifts = self.variables, self.num_shifts
+        columns = GetLayoutIndices(shifts, num_shifts)
+        return [variables[n * num_shifts + s] for n in GetLayoutIndices(nurses, self.num_nurses) for s in columns]
+
+    def GetSum(self, nurses, shifts):
+        variables = self.GetVariables(nurses, shifts)
+        return cp_model.LinearExpr.Sum(variables) if variables else 0
+
+    def GetWeightedSum(self, nurses, shifts, coefficients):
+        # coefficients per shift, the same for every nurse
+        rows = GetLayoutIndices(nurses, self.num_nurses)
+        variables = self.GetVariables(rows, shifts)
+        return cp_model.LinearExpr.WeightedSum(variables, list(coefficients) * len(rows)) if variables else 0
+
+    def GetRow(self, n, shifts=slice(None)):
+        return self.GetSum(n, shifts)
+
+    def GetColumn(self, s, nurses=slice(None)):
+        return self.GetSum(nurses, s)
+
+class WorkDict(dict):
+    # the (n, s) keyed dict of work variables with the helpers of WorkLayout, every expression summed variable by
+    # variable through the dict. The layout RosterModel had before WorkLayout, the baseline of LayoutBenchmark
+    def __init__(self, model, num_nurses, num_shifts):
+        super().__init__()
+        self.num_nurses = num_nurses
+        self.num_shifts = num_shifts
+        for n in range(num_nurses):
+            for s in range(num_shifts):
+                self[n, s] = model.NewBoolVar(f"{n}_{s}")
+
+    def CopyTo(self, model):
+        work = WorkDict(model, 0, 0)
+        work.num_nurses, work.num_shifts = self.num_nurses, self.num_shifts
+        work.update({key: model.GetIntVarFromProtoIndex(var.Index()) for key, var in self.items()})
+        return work
+
+    def GetVariables(self, nurses, shifts):
+        columns = GetLayoutIndices(shifts, self.num_shifts)
+        return [self[n, s] for n in GetLayoutIndices(nurses, self.num_nurses) for s in columns]
+
+    def GetSum(self, nurses, shifts):
+        columns = GetLayoutIndices(shifts, self.num_shifts)
+        return sum(self[n, s] for n in GetLayoutIndices(nurses, self.num_nurses) for s in columns)
+
+    def GetWeightedSum(self, nurses, shifts, coefficients):
+        return sum(self[n, s] * coefficient for n in GetLayoutIndices(nurses, self.num_nurses) for s, coefficient in zip(GetLayoutIndices(shifts, self.num_shifts), coefficients))
+
+    def GetRow(self, n, shifts=slice(None)):
+        return self.GetSum(n, shifts)
+
+    def GetColumn(self, s, nurses=slice(None)):
+        return self.GetSum(nurses, s)
+
+class _IndexVar:
+    # stands in for a variable of another model in RosterModel._GetVar
+    def __init__(self, index):
+        self.index = index
+
+    def Index(self):
+        return self.index
+
+_fragment_model = None
+
+def InitFragmentWorker(nurses, shifts, constraints, measure_sizes):
+    # the instance is sent and the work variables are made once per worker process, not once per family
+    global _fragment_model
+    _fragment_model = RosterModel(nurses, shifts, constraints, measure_sizes)
+    _fragment_model._AddWorkVariables()
+    return
+
+def BuildFragment(family):
+    # one constraint family on a model with only the work variables, returns the serialized proto, the variable
+    # indices and coefficients of its penalties, its build time and its size
+    global _fragment_model
+    roster_model = _fragment_model
+    proto = roster_model.model.Proto()
+    num_work = len(roster_model.work)
+    roster_model.add_family(family)
+    data = proto.SerializeToString()
+    penalties = ([], [])
+    if roster_model.last_penalties:
+        penalties = ([var.Index() for var in roster_model.last_penalties[0]], list(roster_model.last_penalties[1]))
+    result = (data, penalties, roster_model.build_times[family], roster_model.family_sizes.get(family))
+
+    # back to only the work variables for the next family, unless the family made a constant: CpModel caches those
+    if any(len(var.domain) == 2 and var.domain[0] == var.domain[1] for var in proto.variables[num_work:]):
+        InitFragmentWorker(roster_model.nurses, roster_model.shifts, roster_model.constraints, roster_model.measure_sizes)
+    else:
+        del proto.variables[num_work:]
+        del proto.constraints[:]
+    return result
+
+def RemapReference(ref, num_work, offset):
+    # variables after the work variables move by offset, negative references are negated literals
+    if ref < 0:
+        return -RemapReference(-ref - 1, num_work, offset) - 1
+    return ref if ref < num_work else ref + offset
+
+def RemapReferences(message, num_work, offset):
+    for field, value in message.ListFields():
+        if field.name in ("vars", "literals", "enforcement_literal"):
+            value[:] = [RemapReference(ref, num_work, offset) for ref in value]
+        elif field.name == "intervals":
+            assert False, "interval constraints refer to constraint indices, fragments cannot have them"
+        elif field.message_type is not None:
+            if hasattr(value, "ListFields"):
+                RemapReferences(value, num_work, offset)
+            else: # repeated messages
+                for item in value:
+                    RemapReferences(item, num_work, offset)
+    return
+
+def CountReferences(message):
+    # number of variable and literal references in a constraint proto (enforcement literals, linear terms, ...)
+    count = 0
+    for field, value in message.ListFields():
+        if field.name in ("vars", "literals", "enforcement_literal"):
+            count += len(value)
+        elif field.message_type is not None:
+            if hasattr(value, "ListFields"):
+                count += CountReferences(value)
+            else: # repeated messages
+                count += sum(CountReferences(item) for item in value)
+    return count
@@ -0,0 +1,194 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from ortools.sat.python import cp_model
+
+from Export import RosterExporter, RosterWriter
+from Instance import Instance
+from Model import RosterModel
+from Profile import SolveProfile
+
+DAY_SHIFT_TYPES = ["dk", "dm", "dl", "a"] # not allowed the day after a night shift
+
+def SolveWard(task):
+    # solves one ward in a worker process. task["prices"] maps (nurse name, iso date) to an objective penalty per
+    # shift on that date, task["blocked"] lists (nurse name, iso date, shift types or None for all) that are forbidden
+    # and task["hint"] the (n, s) assignments of the previous round
+    instance = Instance(task["data_dir"], task["year"], task["month"], task["num_days"])
+    roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints).build()
+    model, work = roster_model.model, roster_model.work
+
+    nurse_indices = {nurse.name: n for n, nurse in enumerate(instance.nurses.nurses)}
+    day_shifts = {}
+    for s, shift in enumerate(instance.shifts.shifts):
+        day_shifts.setdefault(shift.start_date.date().isoformat(), []).append(s)
+
+    price_variables, price_coefficients = [], []
+    for (name, day), price in task["prices"].items():
+        for s in day_shifts.get(day, []):
+            price_variables.append(work[nurse_indices[name], s])
+            price_coefficients.append(price)
+    roster_model.add_objective_terms("float_pool", price_variables, price_coefficients)
+    roster_model.minimize()
+
+    for name, day, shift_types in task["blocked"]:
+        for s in day_shifts.get(day, []):
+            if shift_types is None or instance.shifts.shifts[s].abbreviation[:-1] in shift_types:
+                model.Add(work[nurse_indices[name], s] == 0)
+
+    hint = set(map(tuple, task["hint"]))
+    if hint:
+        for key, var in work.items():
+            model.AddHint(var, int(key in hint))
+
+    solver = SolveProfile(**task["profile"]).apply(cp_model.CpSolver())
+    status = solver.Solve(model)
+    result = {"data_dir": task["data_dir"], "status": solver.StatusName(status), "wall_time": solver.WallTime(),
+              "objective": None, "penalties": {}, "assigned": [], "rows": []}
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result["objective"] = solver.ObjectiveValue()
+        result["penalties"] = roster_model.GetPenalties(solver)
+        result["assigned"] = [key for key, var in work.items() if solver.BooleanValue(var)]
+        result["rows"] = list(RosterExporter().IterLongRows(instance.nurses, instance.shifts, work, solver))
+    return result
+
+class MultiWardRoster:
+    # rosters several wards that share float nurses, a float nurse is listed in the nurses.csv of every ward they can
+    # work in (with the contract hours that ward expects of them). Every ward is solved in its own process. The wards
+    # first exchange prices: a float nurse double booked on a date gets more expensive on that date in all but the
+    # first ward that booked them. Conflicts left after max_rounds are repaired by fix-and-solve, ward by ward with
+    # the dates taken by the other wards forbidden
+    def __init__(self, ward_dirs, year, month, num_days=None, profile=None, max_rounds=5, price_step=50, max_processes=None):
+        self.ward_dirs = ward_dirs
+        self.year = year
+        self.month = month
+        self.num_days = num_days
+        self.profile = profile if profile else SolveProfile(max_time=60.0, num_workers=2)
+        self.max_rounds = max_rounds
+        self.price_step = price_step
+        self.max_processes = max_processes if max_processes else len(ward_dirs)
+        self.float_nurses = {} # name -> the wards (indices) that list the float nurse
+        self.prices = [{} for _ in ward_dirs]
+        self.results = [None for _ in ward_dirs]
+        self.history = [] # per round: number of conflicts and total objective
+
+    def run(self):
+        assert(self.max_rounds >= 1)
+        self.float_nurses = self._GetFloatNurses()
+        print(f"{len(self.ward_dirs)} wards, {len(self.float_nurses)} float nurses")
+        with ProcessPoolExecutor(max_workers=self.max_processes) as executor:
+            # price exchange, all wards in parallel
+            for i in range(self.max_rounds):
+                wards = list(range(len(self.ward_dirs))) if i == 0 else self._GetConflictingWards(conflicts)
+                tasks = [self._GetTask(w, blocked=[]) for w in wards]
+                for w, result in zip(wards, executor.map(SolveWard, tasks)):
+                    self.results[w] = result
+                for w in wards:
+                    assert self.results[w]["objective"] is not None, f"ward {self.ward_dirs[w]}: {self.results[w]['status']}"
+                conflicts = self.GetConflicts()
+                self._Log(f"price round {i}", conflicts)
+                if not conflicts:
+                    break
+                for (name, day), wards_of_day in conflicts.items():
+                    for w in wards_of_day[1:]:
+                        # a ward that is only involved through the night shift before pays for that night
+                        priced_day = day if any(row[0] == name and row[1] == day for row in self.results[w]["rows"]) else self._PreviousDay(day)
+                        self.prices[w][name, priced_day] = self.prices[w].get((name, priced_day), 0) + self.price_step
+
+            # fix-and-solve, one ward at a time so a repaired ward cannot clash with another repaired ward
+            for w in self._GetConflictingWards(conflicts):
+                if not self.GetConflicts():
+                    break
+                self.results[w] = executor.submit(SolveWard, self._GetTask(w, self._GetBlocked(w))).result()
+                assert self.results[w]["objective"] is not None, f"ward {self.ward_dirs[w]}: {self.results[w]['status']} without the float nurse dates of the other wards"
+                self._Log(f"repair {self.ward_dirs[w]}", self.GetConflicts())
+        return self.results
+
+    def GetConflicts(self):
+        # (float nurse, iso date) -> wards involved in a double booking of the nurse on that date, in ward order: two
+        # wards with a shift on the date, or a day shift on the date in one ward after a night shift in another
+        bookings = {}
+        for w, result in enumerate(self.results):
+            for name, day, shift_type, _, _, _, _ in result["rows"]:
+                if name not in self.float_nurses:
+                    continue
+                bookings.setdefault((name, day), []).append((w, shift_type))
+                if shift_type == "n":
+                    bookings.setdefault((name, self._NextDay(day)), []).append((w, "rest"))
+        conflicts = {}
+        for key, booked in bookings.items():
+            working = [(w, shift_type) for w, shift_type in booked if shift_type != "rest"]
+            resting = [w for w, shift_type in booked if shift_type == "rest"]
+            if len(set(w for w, _ in working)) > 1 or any(shift_type in DAY_SHIFT_TYPES and v != w for w, shift_type in working for v in resting):
+                conflicts[key] = sorted(set(w for w, _ in booked))
+        return conflicts
+
+    def write(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        fns = []
+        for w, result in enumerate(self.results):
+            fn = os.path.join(output_dir, os.path.basename(os.path.normpath(self.ward_dirs[w])) + ".csv")
+            with RosterWriter(fn, RosterExporter.LONG_COLUMNS) as writer:
+                writer.write(result["rows"])
+            print(f"Wrote {fn} ({writer.num_rows} rows)")
+            fns.append(fn)
+        return fns
+
+    def print_summary(self):
+        print()
+        print('Multi-ward roster')
+        for w, result in enumerate(self.results):
+            print('  - %-24s: %-8s objective %10.0f, float pool %6i, %6.2f s' % (self.ward_dirs[w][-24:], result["status"], result["objective"],
+                                                                                  result["penalties"].get("float_pool", 0), result["wall_time"]))
+        for step, num_conflicts, objective in self.history:
+            print('  - %-24s: %4i conflicts, total objective %10.0f' % (step, num_conflicts, objective))
+        return
+
+    def _GetFloatNurses(self):
+        wards_of_nurse = {}
+        for w, data_dir in enumerate(self.ward_dirs):
+            instance = Instance(data_dir, self.year, self.month, self.num_days)
+            for nurse in instance.nurses.nurses:
+                wards_of_nurse.setdefault(nurse.name, set()).add(w)
+        return {name: wards for name, wards in wards_of_nurse.items() if len(wards) > 1}
+
+    def _GetTask(self, w, blocked):
+        previous = self.results[w]
+        return {"data_dir": self.ward_dirs[w], "year": self.year, "month": self.month, "num_days": self.num_days,
+                "profile": self.profile.to_dict(), "prices": self.prices[w], "blocked": blocked,
+                "hint": previous["assigned"] if previous else []}
+
+    def _GetBlocked(self, w):
+        # everything the other wards book for the float nurses of ward w
+        blocked = []
+        for v, result in enumerate(self.results):
+            if v == w:
+                continue
+            for name, day, shift_type, _, _, _, _ in result["rows"]:
+                if w not in self.float_nurses.get(name, ()):
+                    continue
+                blocked.append((name, day, None))
+                if shift_type == "n":
+                    blocked.append((name, self._NextDay(day), DAY_SHIFT_TYPES))
+                else:
+                    blocked.append((name, self._PreviousDay(day), ["n"]))
+        return blocked
+
+    def _GetConflictingWards(self, conflicts):
+        wards = set()
+        for wards_of_day in conflicts.values():
+            wards.update(wards_of_day[1:])
+        return sorted(wards)
+
+    def _NextDay(self, day):
+        return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+    def _PreviousDay(self, day):
+        return (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+
+    def _Log(self, step, conflicts):
+        objective = sum(result["objective"] for result in self.results)
+        self.history.append([step, len(conflicts), objective])
+        print(f"{step}: {len(conflicts)} conflicts, total objective {objective:.0f}")
+        return
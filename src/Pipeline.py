@@ -0,0 +1,194 @@
+import json
+import os
+import pickle
+import time
+
+from Instance import GetInstanceFilenames, Instance
+from Profile import HashFiles, HashSources, SolveProfile
+
+class SolutionValues:
+    # the values of a saved solution, stands in for the solver where the exporter and the visualizer read work[n, s]
+    def __init__(self, assigned):
+        self.assigned = set(map(tuple, assigned))
+
+    def Value(self, key):
+        return int(key in self.assigned)
+
+    def BooleanValue(self, key):
+        return key in self.assigned
+
+def GetReferenceValue(values, ref):
+    # value of a variable index in a solution, negative indices are negated literals as in the proto
+    return values[ref] if ref >= 0 else 1 - values[-ref - 1]
+
+class RosterPipeline:
+    # run() as stages that read and write artifacts in work_dir, make style: a stage runs only when the hash of its
+    # input files, its parameters, the sources or ARTIFACT_VERSION differ from its <stage>.json manifest or when one
+    # of its outputs is missing
+    #   parse : the data files                  -> instance.pickle (nurses, shifts, requests and their conflicts)
+    #   build : instance.pickle                 -> model.pb (CpModelProto) and variables.json (work[n, s] and objective term indices)
+    #   solve : model.pb, variables.json        -> solution.json (status, objective, bound, penalties, assigned shifts)
+    #   export: instance.pickle, solution.json  -> the roster files
+    #   render: instance.pickle, solution.json  -> the roster html
+    # relative roster and html file names are in work_dir, like the artifacts
+    STAGES = ["parse", "build", "solve", "export", "render"]
+    ARTIFACT_VERSION = 1
+
+    def __init__(self, work_dir, data_dir, year, month, num_days=None, check_requests=True, implied_constraints=False, fairness_cost=0,
+                 profile=None, roster_export=("HoningsRooster.csv",), roster_export_layout="long", output_html="HoningsRooster.html",
+                 html_resources="inline", open_browser=False, force=False):
+        self.work_dir = work_dir
+        self.params = {"parse": {"data_dir": data_dir, "year": year, "month": month, "num_days": num_days},
+                       "build": {"check_requests": check_requests, "implied_constraints": implied_constraints, "fairness_cost": fairness_cost},
+                       "solve": (profile if profile else SolveProfile()).to_dict(),
+                       "export": {"roster_export": list(roster_export), "layout": roster_export_layout},
+                       "render": {"output_html": output_html, "html_resources": html_resources}}
+        self.open_browser = open_browser
+        self.force = force # run every stage up to the target
+        self.stages = {} # stage -> "ran", "up to date" or why it stopped the pipeline
+        self._instance = None
+
+    def run(self, target="render"):
+        # the stages up to target, returns True when target is up to date
+        assert target in self.STAGES, f"unknown stage {target}"
+        os.makedirs(self.work_dir, exist_ok=True)
+        sources = HashSources()
+        for stage in self.STAGES[:self.STAGES.index(target) + 1]:
+            inputs = self._GetInputs(stage)
+            key = {"version": self.ARTIFACT_VERSION, "sources": sources, "params": self.params[stage], "inputs": HashFiles(inputs)}
+            manifest = self._ReadManifest(stage)
+            if not self.force and manifest and manifest["key"] == key and all(os.path.isfile(fn) for fn in manifest["outputs"]):
+                self.stages[stage] = "up to date"
+                print(f"{stage}: up to date")
+                continue
+            print(f"{stage}: running")
+            start_time = time.perf_counter()
+            outputs, stopped = getattr(self, f"_{stage.capitalize()}")()
+            if stopped:
+                self.stages[stage] = stopped
+                print(f"{stage}: {stopped}")
+                return False
+            self._WriteManifest(stage, {"key": key, "outputs": outputs, "time": time.perf_counter() - start_time})
+            self.stages[stage] = "ran"
+        return True
+
+    def print_summary(self):
+        print()
+        print(f"Pipeline in {self.work_dir}")
+        for stage in self.STAGES:
+            print('  - %-7s: %s' % (stage, self.stages.get(stage, "-")))
+        return
+
+    def GetFilename(self, name):
+        return os.path.join(self.work_dir, name)
+
+    def _GetInputs(self, stage):
+        if stage == "parse":
+            return GetInstanceFilenames(self.params["parse"]["data_dir"])
+        elif stage == "build":
+            return [self.GetFilename("instance.pickle")]
+        elif stage == "solve":
+            return [self.GetFilename("model.pb"), self.GetFilename("variables.json")]
+        return [self.GetFilename("instance.pickle"), self.GetFilename("solution.json")]
+
+    def _ReadManifest(self, stage):
+        fn = self.GetFilename(f"{stage}.json")
+        if not os.path.isfile(fn):
+            return None
+        with open(fn) as f:
+            return json.load(f)
+
+    def _WriteManifest(self, stage, manifest):
+        with open(self.GetFilename(f"{stage}.json"), "w") as f:
+            json.dump(manifest, f, indent=1)
+        return
+
+    def _GetInstance(self):
+        if self._instance is None:
+            with open(self.GetFilename("instance.pickle"), "rb") as f:
+                self._instance = pickle.load(f)
+        return self._instance
+
+    def _GetSolution(self):
+        with open(self.GetFilename("solution.json")) as f:
+            return json.load(f)
+
+    def _Parse(self):
+        params = self.params["parse"]
+        self._instance = Instance(params["data_dir"], params["year"], params["month"], params["num_days"])
+        print(f"nurses #:\t{len(self._instance.nurses.nurses)}")
+        print(f"shifts #:\t{len(self._instance.shifts.shifts)}")
+        print(f"constraints #:\t{len(self._instance.constraints.requests)}")
+        for conflict in self._instance.conflicts:
+            print(f"{'conflict' if conflict.blocking else 'warning'}:\t{conflict}")
+        self._instance.load_time = 0.0 # timings would make the artifact, and so the later stages, differ on every run
+        with open(self.GetFilename("instance.pickle"), "wb") as f:
+            pickle.dump(self._instance, f)
+        return [self.GetFilename("instance.pickle")], None
+
+    def _Build(self):
+        from Model import RosterModel
+        params = self.params["build"]
+        instance = self._GetInstance()
+        blocking = [conflict for conflict in instance.conflicts if conflict.blocking]
+        if blocking and params["check_requests"]:
+            return [], f"stopped, {len(blocking)} conflicting requests"
+        if params["fairness_cost"]:
+            instance.constraints.set_weights({"FAIRNESS_COST": params["fairness_cost"]})
+        roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints, implied_constraints=params["implied_constraints"],
+                                   fairness=params["fairness_cost"] > 0).build()
+        with open(self.GetFilename("model.pb"), "wb") as f:
+            f.write(roster_model.model.Proto().SerializeToString())
+        variables = {"work": [[n, s, var.Index()] for (n, s), var in roster_model.work.items()],
+                     "objective_terms": {objective_family: [[var.Index() for var in family_variables], list(coefficients)]
+                                         for objective_family, (family_variables, coefficients) in roster_model.objective_terms.items()}}
+        with open(self.GetFilename("variables.json"), "w") as f:
+            json.dump(variables, f)
+        return [self.GetFilename("model.pb"), self.GetFilename("variables.json")], None
+
+    def _Solve(self):
+        from ortools.sat.python import cp_model
+        from Solution import RosterSolutionCallback
+        model = cp_model.CpModel()
+        with open(self.GetFilename("model.pb"), "rb") as f:
+            model.Proto().ParseFromString(f.read())
+        with open(self.GetFilename("variables.json")) as f:
+            variables = json.load(f)
+        solver = SolveProfile(**self.params["solve"]).apply(cp_model.CpSolver())
+        status = solver.Solve(model, RosterSolutionCallback())
+        solution = {"status": solver.StatusName(status), "wall_time": solver.WallTime(), "objective": None,
+                    "bound": solver.BestObjectiveBound(), "penalties": None, "assigned": None}
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            values = solver.ResponseProto().solution
+            solution["objective"] = solver.ObjectiveValue()
+            solution["penalties"] = {objective_family: sum(GetReferenceValue(values, index) * coefficient for index, coefficient in zip(indices, coefficients))
+                                     for objective_family, (indices, coefficients) in variables["objective_terms"].items()}
+            solution["assigned"] = [[n, s] for n, s, index in variables["work"] if values[index]]
+        print(f"status:\t{solution['status']}, objective {solution['objective']}, bound {solution['bound']}, {solution['wall_time']:.2f} s")
+        with open(self.GetFilename("solution.json"), "w") as f:
+            json.dump(solution, f, indent=1)
+        return [self.GetFilename("solution.json")], None
+
+    def _Export(self):
+        from Export import RosterExporter
+        params = self.params["export"]
+        instance, solution = self._GetInstance(), self._GetSolution()
+        if solution["assigned"] is None:
+            return [], f"stopped, no roster ({solution['status']})"
+        work = {(n, s): (n, s) for n, _ in enumerate(instance.nurses.nurses) for s, _ in enumerate(instance.shifts.shifts)}
+        roster_exporter = RosterExporter()
+        filenames = [self.GetFilename(fn) for fn in params["roster_export"]]
+        for fn in filenames:
+            roster_exporter.export(instance.nurses, instance.shifts, work, SolutionValues(solution["assigned"]), fn, layout=params["layout"])
+        return filenames, None
+
+    def _Render(self):
+        from Visualize import RosterVisualizer
+        params = self.params["render"]
+        instance, solution = self._GetInstance(), self._GetSolution()
+        if solution["assigned"] is None:
+            return [], f"stopped, no roster ({solution['status']})"
+        work = {(n, s): (n, s) for n, _ in enumerate(instance.nurses.nurses) for s, _ in enumerate(instance.shifts.shifts)}
+        filenames = RosterVisualizer().visualize(instance.nurses, instance.shifts, work, SolutionValues(solution["assigned"]), self.GetFilename(params["output_html"]),
+                                                 resources=params["html_resources"], open_browser=self.open_browser)
+        return filenames, None
@@ -0,0 +1,170 @@
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ortools.sat.python import cp_model
+
+from Model import RosterModel
+from Profile import SolveProfile
+from Solution import GetGap, RosterSolutionCallback
+
+# (extra sat parameters, implied constraints) the portfolio members cycle through, with a new seed per member
+PORTFOLIO_MEMBERS = [("", False),
+                     ("", True),
+                     ("linearization_level:2", False),
+                     ("search_branching:PORTFOLIO_WITH_QUICK_RESTART_SEARCH", False),
+                     ("symmetry_level:2", True),
+                     ("linearization_level:0", False),
+                     ("search_branching:PSEUDO_COST_SEARCH", False),
+                     ("search_branching:LP_SEARCH", True)]
+
+def GetPortfolioConfigs(profile, num_members):
+    configs = []
+    for i in range(num_members):
+        params, implied_constraints = PORTFOLIO_MEMBERS[i % len(PORTFOLIO_MEMBERS)]
+        name = " ".join(part for part in [f"seed {(profile.random_seed or 0) + i}", params, "implied" if implied_constraints else ""] if part)
+        member_profile = profile.Copy(random_seed=(profile.random_seed or 0) + i, params=" ".join(part for part in [profile.params, params] if part))
+        configs.append({"name": name, "profile": member_profile.to_dict(), "implied_constraints": implied_constraints})
+    return configs
+
+class PortfolioListener:
+    # shares the improving objectives and bounds of one member with the whole portfolio and sets stop when the
+    # global gap reaches target_gap
+    def __init__(self, best_objective, best_bound, stop, target_gap):
+        self.best_objective = best_objective
+        self.best_bound = best_bound
+        self.stop = stop
+        self.target_gap = target_gap
+
+    def on_solution(self, callback):
+        self.update(callback.ObjectiveValue(), callback.BestObjectiveBound())
+        return
+
+    def update(self, objective, bound):
+        with self.best_objective.get_lock():
+            self.best_objective.value = min(self.best_objective.value, objective)
+        with self.best_bound.get_lock():
+            self.best_bound.value = max(self.best_bound.value, bound)
+        if self.target_gap and self.best_objective.value < math.inf and GetGap(self.best_objective.value, self.best_bound.value) <= self.target_gap:
+            self.stop.set()
+        return
+
+_portfolio_state = None
+_portfolio_models = {} # implied_constraints -> built RosterModel, per worker process
+
+def InitPortfolioWorker(nurses, shifts, constraints, fairness, best_objective, best_bound, stop, target_gap):
+    global _portfolio_state
+    _portfolio_state = (nurses, shifts, constraints, fairness, PortfolioListener(best_objective, best_bound, stop, target_gap))
+    return
+
+def SolvePortfolioMember(task):
+    # one member for one round, from a copy of the model this process built before (with or without the implied
+    # constraints) with task["hint"] as hint. A watcher thread stops the solve as soon as the portfolio is stopped
+    nurses, shifts, constraints, fairness, listener = _portfolio_state
+    config = task["config"]
+    if config["implied_constraints"] not in _portfolio_models:
+        _portfolio_models[config["implied_constraints"]] = RosterModel(nurses, shifts, constraints, implied_constraints=config["implied_constraints"],
+                                                                       fairness=fairness).build()
+    roster_model = _portfolio_models[config["implied_constraints"]].copy()
+    hint = set(map(tuple, task["hint"]))
+    if hint:
+        for key, var in roster_model.work.items():
+            roster_model.model.AddHint(var, int(key in hint))
+
+    solver = SolveProfile(**config["profile"]).Copy(max_time=task["max_time"]).apply(cp_model.CpSolver())
+    callback = RosterSolutionCallback([listener], verbose=False)
+    done = threading.Event()
+    def Watch():
+        # through the callback: CpSolver.StopSearch does not reach a running solve in OR-Tools 9.5
+        while not done.wait(0.05):
+            if listener.stop.is_set():
+                callback.StopSearch()
+                return
+    watcher = threading.Thread(target=Watch, daemon=True)
+    watcher.start()
+    status = solver.Solve(roster_model.model, callback)
+    done.set()
+    watcher.join()
+
+    result = {"name": config["name"], "status": solver.StatusName(status), "wall_time": solver.WallTime(), "objective": None,
+              "bound": solver.BestObjectiveBound(), "assigned": []}
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result["objective"] = solver.ObjectiveValue()
+        result["assigned"] = [key for key, var in roster_model.work.items() if solver.BooleanValue(var)]
+        listener.update(result["objective"], result["bound"])
+    if status in (cp_model.OPTIMAL, cp_model.INFEASIBLE, cp_model.MODEL_INVALID):
+        listener.stop.set()
+    return result
+
+class SolverPortfolio:
+    # diversified solves (seeds, search branching, linearization and symmetry levels, implied constraints) in separate
+    # processes, in rounds of round_time: every round each member starts from the best roster so far as hint. While
+    # solving the members share their objectives and bounds, all of them stop when the global gap reaches target_gap
+    # (0: no gap target) and the portfolio stops at profile.max_time, or as soon as a member proves the model
+    # infeasible or invalid. The best roster is kept, fairness adds the fairness objective to every member
+    def __init__(self, nurses, shifts, constraints, profile, num_members=4, round_time=60.0, target_gap=0.0, configs=None, fairness=False):
+        self.nurses = nurses
+        self.shifts = shifts
+        self.constraints = constraints
+        self.profile = profile
+        self.round_time = round_time
+        self.target_gap = target_gap
+        self.configs = configs if configs else GetPortfolioConfigs(profile, num_members)
+        self.fairness = fairness
+        self.best = None # result of the member with the best roster
+        self.bound = -math.inf
+        self.status = "UNKNOWN" # OPTIMAL, FEASIBLE, INFEASIBLE, MODEL_INVALID or UNKNOWN, as the solver statuses
+        self.rounds = [] # per round the results of every member
+        self.wall_time = 0.0
+
+    def run(self):
+        start_time = time.perf_counter()
+        context = multiprocessing.get_context()
+        best_objective = context.Value("d", math.inf)
+        best_bound = context.Value("d", -math.inf)
+        stop = context.Event()
+        with ProcessPoolExecutor(max_workers=len(self.configs), initializer=InitPortfolioWorker,
+                                 initargs=(self.nurses, self.shifts, self.constraints, self.fairness, best_objective, best_bound, stop, self.target_gap)) as executor:
+            while not stop.is_set():
+                remaining = self.profile.max_time - (time.perf_counter() - start_time)
+                if remaining < 1.0:
+                    break
+                hint = self.best["assigned"] if self.best else []
+                tasks = [{"config": config, "hint": hint, "max_time": min(self.round_time, remaining)} for config in self.configs]
+                results = list(executor.map(SolvePortfolioMember, tasks))
+                for result in results:
+                    if result["objective"] is not None and (self.best is None or result["objective"] < self.best["objective"]):
+                        self.best = result
+                self.bound = max([self.bound, best_bound.value] + [result["bound"] for result in results])
+                self.rounds.append([{key: value for key, value in result.items() if key != "assigned"} for result in results])
+                print(f"round {len(self.rounds)}: " + ", ".join(f"{result['name']}: {result['objective']}" for result in results) +
+                      f", best {self.best['objective'] if self.best else None}, bound {self.bound}")
+                statuses = set(result["status"] for result in results)
+                for status in ("INFEASIBLE", "MODEL_INVALID", "OPTIMAL"):
+                    if status in statuses:
+                        self.status = status
+                        break
+                else:
+                    self.status = "FEASIBLE" if self.best else "UNKNOWN" # INFEASIBLE and MODEL_INVALID members set stop, like OPTIMAL
+        self.wall_time = time.perf_counter() - start_time
+        return self
+
+    def apply(self, roster_model):
+        # fixes the best roster in a model of the full roster, solving it then only recovers the objective
+        assigned = set(map(tuple, self.best["assigned"]))
+        for key, var in roster_model.work.items():
+            roster_model.model.Add(var == int(key in assigned))
+        return
+
+    def print_summary(self):
+        print()
+        if not self.best:
+            print(f"Portfolio of {len(self.configs)}: {self.status}, no roster in {self.wall_time:.2f} s")
+            return
+        print(f"Portfolio of {len(self.configs)}: objective {self.best['objective']} by {self.best['name']}, bound {self.bound}, "
+              f"gap {GetGap(self.best['objective'], self.bound):.4f}, {len(self.rounds)} rounds in {self.wall_time:.2f} s")
+        for c, config in enumerate(self.configs):
+            print(f"  - {config['name']}: " + ", ".join(f"{results[c]['status']} {results[c]['objective']}" for results in self.rounds))
+        return
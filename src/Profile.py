@@ -0,0 +1,64 @@
+import glob
+import hashlib
+import json
+import os
+
+class SolveProfile:
+    # the solver parameters of a solve. With a random seed, a fixed number of workers, interleaved search and a
+    # deterministic time limit CP-SAT returns the same roster for the same inputs on every run
+    def __init__(self, max_time=3600*5, num_workers=None, random_seed=None, interleave_search=False, max_deterministic_time=None, params=""):
+        self.max_time = max_time
+        self.num_workers = num_workers
+        self.random_seed = random_seed
+        self.interleave_search = interleave_search
+        self.max_deterministic_time = max_deterministic_time
+        self.params = params # extra sat parameters in text format
+
+    def __str__(self):
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    def is_reproducible(self):
+        return self.random_seed is not None and self.num_workers is not None and (self.num_workers == 1 or self.interleave_search) and self.max_deterministic_time is not None
+
+    def apply(self, solver):
+        solver.parameters.max_time_in_seconds = self.max_time
+        if self.num_workers is not None:
+            solver.parameters.num_workers = self.num_workers
+        if self.random_seed is not None:
+            solver.parameters.random_seed = self.random_seed
+        if self.interleave_search:
+            solver.parameters.interleave_search = True
+        if self.max_deterministic_time is not None:
+            solver.parameters.max_deterministic_time = self.max_deterministic_time
+        if self.params:
+            from google.protobuf import text_format
+            text_format.Merge(self.params, solver.parameters)
+        return solver
+
+    def to_dict(self):
+        return {"max_time": self.max_time, "num_workers": self.num_workers, "random_seed": self.random_seed,
+                "interleave_search": self.interleave_search, "max_deterministic_time": self.max_deterministic_time, "params": self.params}
+
+    def Copy(self, **changes):
+        profile = SolveProfile(**self.to_dict())
+        for key, value in changes.items():
+            assert(hasattr(profile, key))
+            setattr(profile, key, value)
+        return profile
+
+def HashFiles(fns):
+    # sha256 of every input file, keyed by file name
+    hashes = {}
+    for fn in fns:
+        with open(fn, "rb") as f:
+            hashes[fn] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+def HashSources():
+    # one sha256 over the python sources of the solver, changes whenever the model code changes
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for fn in sorted(glob.glob(os.path.join(src_dir, "*.py"))):
+        with open(fn, "rb") as f:
+            digest.update(os.path.basename(fn).encode() + b"\0" + f.read())
+    return digest.hexdigest()
@@ -0,0 +1,13 @@
+import json
+
+def SaveJson(data, fn):
+    with open(fn, "w") as f:
+        json.dump(data, f, indent=1)
+    print(f"Wrote {fn}")
+    return
+
+class JsonReport:
+    # base of the benchmarks and reports that keep their outcome in self.result, save writes it as json
+    def save(self, fn):
+        SaveJson(self.result, fn)
+        return
@@ -0,0 +1,93 @@
+import json
+import statistics
+
+from ortools.sat.python import cp_model
+
+from Instance import Instance
+from Model import RosterModel
+from Profile import HashFiles
+from Report import JsonReport
+from Solution import RosterSolutionCallback
+from Telemetry import GetTimeToQuality, SolverTelemetry
+
+class SeedSweep(JsonReport):
+    # solves the same instance with the same profile for several random seeds and reports the median and spread of
+    # the time to reach a quality target, together with the exact parameters and input hashes
+    def __init__(self, data_dir, year, month, num_days, profile, seeds, quality=0.01, target_objective=None, verify=True):
+        self.data_dir = data_dir
+        self.year = year
+        self.month = month
+        self.num_days = num_days
+        self.profile = profile
+        self.seeds = seeds
+        self.quality = quality # relative distance to the target objective that counts as reached
+        self.target_objective = target_objective # best objective over all seeds when None
+        self.verify = verify # solve the first seed twice and compare the rosters
+        self.result = {}
+
+    def run(self):
+        instance = Instance(self.data_dir, self.year, self.month, self.num_days)
+        roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints).build()
+
+        runs = []
+        rosters = []
+        for seed in self.seeds:
+            telemetry, roster = self._Solve(roster_model, seed)
+            runs.append({"seed": seed, "status": telemetry.response["status"], "objective": telemetry.response["objective"],
+                         "bound": telemetry.response["bound"], "wall_time": telemetry.response["wall_time"], "solutions": telemetry.solutions})
+            rosters.append(roster)
+            print(f"seed {seed}: {telemetry.response['status']} objective {telemetry.response['objective']} after {telemetry.response['wall_time']:.2f} s")
+
+        reproduced = None
+        if self.verify and self.seeds:
+            _, roster = self._Solve(roster_model, self.seeds[0])
+            reproduced = roster == rosters[0]
+
+        objectives = [run["objective"] for run in runs if run["objective"] is not None]
+        target = self.target_objective if self.target_objective is not None else (min(objectives) if objectives else None)
+        for run in runs:
+            run["time_to_quality"] = GetTimeToQuality(run["solutions"], target, self.quality)
+        times_to_quality = [run["time_to_quality"] for run in runs if run["time_to_quality"] is not None]
+
+        self.result = {"profile": self.profile.to_dict(),
+                       "reproducible_profile": self.profile.is_reproducible(),
+                       "reproduced": reproduced,
+                       "inputs": HashFiles(instance.GetFilenames()),
+                       "instance": {"year": self.year, "month": self.month, "num_days": self.num_days},
+                       "quality": self.quality,
+                       "target_objective": target,
+                       "runs": runs,
+                       "summary": {"reached": len(times_to_quality),
+                                   "time_to_quality": self._GetSpread(times_to_quality),
+                                   "objective": self._GetSpread(objectives)}}
+        return self.result
+
+    def print_summary(self):
+        summary = self.result["summary"]
+        print()
+        print('Seed sweep')
+        print('  - profile         : %s' % json.dumps(self.result["profile"], sort_keys=True))
+        print('  - reproducible    : %s (same roster on re-run: %s)' % (self.result["reproducible_profile"], self.result["reproduced"]))
+        print('  - target          : %s (quality %.3f)' % (self.result["target_objective"], self.quality))
+        print('  - reached         : %i / %i seeds' % (summary["reached"], len(self.seeds)))
+        for key in ("time_to_quality", "objective"):
+            spread = summary[key]
+            if spread:
+                print('  - %-16s: median %.2f, min %.2f, max %.2f, iqr %.2f' % (key.replace("_", " "), spread["median"], spread["min"], spread["max"], spread["iqr"]))
+        return
+
+    def _Solve(self, roster_model, seed):
+        solver = self.profile.Copy(random_seed=seed).apply(cp_model.CpSolver())
+        telemetry = SolverTelemetry(f"seed {seed}", self.profile.to_dict())
+        status = solver.Solve(roster_model.model, RosterSolutionCallback([telemetry], verbose=False))
+        telemetry.finish(solver, status)
+        roster = None
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            roster = [key for key, var in roster_model.work.items() if solver.BooleanValue(var)]
+        return telemetry, roster
+
+    def _GetSpread(self, values):
+        if not values:
+            return {}
+        quartiles = statistics.quantiles(values, n=4) if len(values) > 1 else [values[0]] * 3
+        return {"median": statistics.median(values), "min": min(values), "max": max(values), "iqr": quartiles[2] - quartiles[0]}
@@ -0,0 +1,159 @@
+from datetime import timedelta
+
+NIGHT_TYPES = {"n"}
+DAY_TYPES = {"dk", "dm", "dl", "a"} # not allowed the day after a night shift
+
+class RequestConflict:
+    # blocking: the requests cannot all hold, a conflict that does not block is only a warning about requests that
+    # are ignored
+    def __init__(self, message, requests, blocking=True):
+        self.message = message
+        self.requests = requests
+        self.blocking = blocking
+
+    def __str__(self):
+        sources = ", ".join(sorted(set(request.source if request.source else str(request) for request in self.requests)))
+        return f"{self.message} ({sources})"
+
+class RequestChecker:
+    # finds hard requests that cannot all hold before the model is built: per nurse and date the shift types the
+    # requests exclude and the days they require a shift, checked against each other, one shift per day, rest after
+    # night, max 5 shifts per week, the percentage caps, rest after n shifts and filling every shift
+    def __init__(self, nurses, shifts):
+        self.nurses = nurses
+        self.shifts = shifts
+        self.dates = sorted(set(shift.start_date.date() for shift in shifts.shifts))
+        self.date_types = {} # date -> {shift type: number of slots}
+        for shift in shifts.shifts:
+            types = self.date_types.setdefault(shift.start_date.date(), {})
+            types[shift.abbreviation[:-1]] = types.get(shift.abbreviation[:-1], 0) + 1
+        self.weekday_dates = {}
+        for date in self.dates:
+            self.weekday_dates.setdefault(date.weekday(), []).append(date)
+        self.types = set(shift_type for types in self.date_types.values() for shift_type in types)
+
+    def check(self, requests):
+        conflicts = []
+        names = set(nurse.name for nurse in self.nurses.nurses)
+        excluded = {} # (name, date, shift type) -> requests that exclude it
+        required = {} # (name, date) -> [(request, shift types that satisfy it)]
+        percentages = []
+        streaks = []
+        for request in requests:
+            if request.name not in names:
+                conflicts.append(RequestConflict(f"request for unknown nurse {request.name} is ignored", [request], blocking=False))
+                continue
+            if request.full_date:
+                date = request.full_date.date()
+                if date not in self.date_types:
+                    continue
+                types = self._GetTypes(date, request.shift)
+                if request.do_assign is False:
+                    if self._IsSlot(request.shift):
+                        continue # excludes one slot, the other slots of the type stay open
+                    for shift_type in types:
+                        excluded.setdefault((request.name, date, shift_type), []).append(request)
+                else:
+                    required.setdefault((request.name, date), []).append((request, types))
+            elif not request.is_hard:
+                continue
+            elif self._IsSlot(request.shift) and not request.streakmax:
+                # as in Constraints: only the date requests take a slot, the other hard requests match shift types
+                conflicts.append(RequestConflict(f"request for shift slot {request.shift} is ignored, only date requests take a slot", [request], blocking=False))
+                continue
+            elif request.day:
+                for date in self.weekday_dates.get(self.shifts.ConvertDayStrToDayNum(request.day), []):
+                    types = self._GetTypes(date, request.shift)
+                    if request.do_assign:
+                        required.setdefault((request.name, date), []).append((request, types))
+                    else:
+                        for shift_type in types:
+                            excluded.setdefault((request.name, date, shift_type), []).append(request)
+            elif request.streakmax:
+                streaks.append(request)
+            elif request.shift and request.percentage:
+                percentages.append(request)
+            elif request.shift and not request.do_assign:
+                for date in self.dates:
+                    if request.shift in self.date_types[date]:
+                        excluded.setdefault((request.name, date, request.shift), []).append(request)
+
+        # per nurse and date: a required shift has to be of a type that is not excluded, and required shifts of
+        # different requests on the same day have to agree on a type
+        worked = {} # (name, date) -> (shift types the day can have, requests)
+        for (name, date), day_requests in required.items():
+            types = set(self.date_types[date])
+            involved = []
+            for request, request_types in day_requests:
+                types &= request_types
+                involved.append(request)
+            if not types:
+                conflicts.append(RequestConflict(f"{name} {date}: required shifts of different types on one day", involved))
+                continue
+            excluding = [request for shift_type in types for request in excluded.get((name, date, shift_type), [])]
+            types = set(shift_type for shift_type in types if (name, date, shift_type) not in excluded)
+            if not types:
+                conflicts.append(RequestConflict(f"{name} {date}: required shift excluded by other requests", involved + excluding))
+                continue
+            worked[name, date] = (types, involved)
+
+        for (name, date), (types, involved) in worked.items():
+            # rest after night
+            next_day = worked.get((name, date + timedelta(days=1)))
+            if types <= NIGHT_TYPES and next_day and next_day[0] <= DAY_TYPES:
+                conflicts.append(RequestConflict(f"{name} {date}: required night shift followed by a required day shift", involved + next_day[1]))
+
+        # max 5 shifts per week
+        weeks = {}
+        for (name, date), (_, involved) in worked.items():
+            weeks.setdefault((name, date.isocalendar().week), []).append(involved)
+        for (name, week), week_requests in weeks.items():
+            if len(week_requests) > 5:
+                conflicts.append(RequestConflict(f"{name} week {week}: {len(week_requests)} required shifts, at most 5", [request for involved in week_requests for request in involved]))
+
+        # rest after n shifts: no run of more than streakmax required days
+        for request in streaks:
+            streak = []
+            for date in self.dates + [None]:
+                if date is not None and (request.name, date) in worked:
+                    streak.append(date)
+                    continue
+                if len(streak) > request.streakmax:
+                    conflicts.append(RequestConflict(f"{request.name} {streak[0]} .. {streak[-1]}: {len(streak)} required days in a row, rest after {request.streakmax}",
+                                                     [request] + [r for d in streak for r in worked[request.name, d][1]]))
+                streak = []
+
+        # percentage caps, as in add_hard_requests_percentage_shift
+        contracts = {nurse.name: nurse.contract for nurse in self.nurses.nurses}
+        for request in percentages:
+            shift_hours = [shift.work_hours for shift in self.shifts.shifts if shift.abbreviation[:-1] == request.shift]
+            if not shift_hours:
+                continue
+            num_weeks = len([date for date in self.dates if request.shift in self.date_types[date]]) // 7
+            cap = int((num_weeks*contracts[request.name])/shift_hours[0]*request.percentage/100)
+            forced = [(date, involved) for (name, date), (types, involved) in worked.items() if name == request.name and types == {request.shift}]
+            if len(forced) > cap:
+                conflicts.append(RequestConflict(f"{request.name}: {len(forced)} required {request.shift} shifts, at most {cap}", [request] + [r for _, involved in forced for r in involved]))
+
+        # fill every shift: per date and shift type, no more nurses required than slots and at least one nurse left
+        for date in self.dates:
+            for shift_type, slots in self.date_types[date].items():
+                forced = [(name, involved) for (name, day), (types, involved) in worked.items() if day == date and types == {shift_type}]
+                if len(forced) > slots:
+                    conflicts.append(RequestConflict(f"{date} {shift_type}: {len(forced)} nurses required for {slots} shifts", [r for _, involved in forced for r in involved]))
+                available = [name for name in names if (name, date, shift_type) not in excluded]
+                if len(available) < slots:
+                    conflicts.append(RequestConflict(f"{date} {shift_type}: {len(available)} nurses left for {slots} shifts",
+                                                     [r for name in names for r in excluded.get((name, date, shift_type), [])]))
+        return conflicts
+
+    def _IsSlot(self, shift):
+        # a slot like n1 of shift type n, not a shift type itself
+        return bool(shift) and shift not in self.types and shift[:-1] in self.types
+
+    def _GetTypes(self, date, shift):
+        # the shift types of date a request about shift (a type, a slot like n1 or None for any) applies to
+        types = set(self.date_types[date])
+        if not shift:
+            return types
+        return types & {shift, shift[:-1]}
@@ -0,0 +1,174 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Evaluate import RosterChanges, RosterEvaluator
+from Report import JsonReport
+
+class AbsenceSampler:
+    # samples absence scenarios as nurse x day matrices: sick periods per nurse, starting on a day with
+    # sick_rate / sick_days so that about sick_rate of the days are sick days, and outbreaks (about outbreak_rate per
+    # week) in which every nurse falls ill with probability outbreak_share within two days of the start
+    MAX_SICK_DAYS = 14
+
+    def __init__(self, nurses, shifts, sick_rate=0.03, sick_days=3.0, outbreak_rate=0.05, outbreak_share=0.3, outbreak_days=5, sick_rates=None):
+        self.nurses = nurses
+        self.dates = sorted(set(shift.start_date.date() for shift in shifts.shifts))
+        sick_rates = sick_rates if sick_rates else {} # nurse name -> sick_rate
+        self.sick_rates = np.array([sick_rates.get(nurse.name, sick_rate) for nurse in nurses.nurses])
+        self.sick_days = sick_days
+        self.outbreak_rate = outbreak_rate
+        self.outbreak_share = outbreak_share
+        self.outbreak_days = outbreak_days
+
+    def sample(self, num_scenarios, seed=0):
+        rng = np.random.default_rng(seed)
+        num_nurses, num_days = len(self.nurses.nurses), len(self.dates)
+        absent = np.zeros((num_scenarios, num_nurses, num_days), dtype=bool)
+
+        starts = rng.random((num_scenarios, num_nurses, num_days)) < self.sick_rates[:, None] / self.sick_days
+        durations = np.minimum(rng.geometric(1.0 / self.sick_days, size=starts.shape), self.MAX_SICK_DAYS)
+        for k in range(min(self.MAX_SICK_DAYS, num_days)): # a sick period ends at the horizon
+            absent[:, :, k:] |= (starts & (durations > k))[:, :, :num_days - k]
+
+        num_outbreaks = rng.poisson(self.outbreak_rate * num_days / 7.0, size=num_scenarios)
+        for b in np.flatnonzero(num_outbreaks):
+            for _ in range(num_outbreaks[b]):
+                start = rng.integers(num_days)
+                for n in np.flatnonzero(rng.random(num_nurses) < self.outbreak_share):
+                    first = start + rng.integers(3)
+                    absent[b, n, first:first + self.outbreak_days] = True
+        return absent
+
+_scenario_evaluator = None
+_scenario_works = None
+
+def InitScenarioWorker(nurses, shifts, constraints, works):
+    # the instance and the rosters are sent and the evaluator is made once per worker process
+    global _scenario_evaluator, _scenario_works
+    _scenario_evaluator = RosterEvaluator(nurses, shifts, constraints)
+    _scenario_works = works
+    return
+
+def RunScenarios(task):
+    # one chunk of absence scenarios on roster r: the shortfall of every scenario, vectorized over the chunk, and
+    # when repair is set the greedy repair of every scenario
+    r, absent_days, repair = task
+    evaluator = _scenario_evaluator
+    work = np.asarray(_scenario_works[r], dtype=bool)
+    day_of_shift = np.argmax(evaluator.days, axis=1)
+    absent = absent_days[:, :, day_of_shift] # scenario x nurse x shift
+    lost = work & absent
+    remaining = work & ~absent
+    cover = remaining[:, evaluator.resuscitate_nurses, :].sum(axis=1)
+    base_cover = work[evaluator.resuscitate_nurses].sum(axis=0)
+    base_broken = (base_cover[evaluator.resuscitate_pairs].sum(axis=1) < 1).sum()
+    results = {"absent_days": absent_days.sum(axis=(1, 2)).tolist(),
+               "uncovered": lost.sum(axis=(1, 2)).tolist(),
+               "resuscitate_broken": ((cover[:, evaluator.resuscitate_pairs].sum(axis=2) < 1).sum(axis=1) - base_broken).tolist()}
+    if repair:
+        objective = evaluator.evaluate(work)["objective"]
+        repairs = [RepairRoster(evaluator, remaining[b], absent[b]) for b in range(len(absent_days))]
+        results["repair_changes"] = [changes for changes, _, _ in repairs]
+        results["unrepaired"] = [unrepaired for _, unrepaired, _ in repairs]
+        results["resuscitate_unrepaired"] = [roster_changes.violations["add_skill_requirement_resuscitate"] - base_broken for _, _, roster_changes in repairs]
+        results["repair_delta"] = [roster_changes.objective - objective for _, _, roster_changes in repairs]
+    return r, results
+
+def RepairRoster(evaluator, work, absent):
+    # greedy repair of a roster with the shifts of absent nurses emptied: every empty shift, in order, goes to the
+    # best present nurse that can take it without new hard violations, or else to a present nurse that hands their
+    # shift of that day to another present nurse. Returns the reassigned shifts, the shifts left empty and the
+    # RosterChanges of the repaired roster
+    roster_changes = RosterChanges(evaluator, work)
+    num_nurses, num_shifts = work.shape
+    day_of_shift = np.argmax(evaluator.days, axis=1)
+    num_changes, unrepaired = 0, 0
+    for s in np.flatnonzero(work.sum(axis=0) == 0).tolist():
+        present = [m for m in range(num_nurses) if not absent[m, s]]
+        candidates = [[(m, s, 1)] for m in present]
+        best = _GetBestRepair(roster_changes, candidates)
+        if best is None:
+            candidates = []
+            for m in present:
+                for s2 in np.flatnonzero(roster_changes.work[m] & (day_of_shift == day_of_shift[s])).tolist():
+                    candidates.extend([(m, s, 1), (m, s2, 0), (k, s2, 1)] for k in range(num_nurses) if k != m and not absent[k, s2])
+            best = _GetBestRepair(roster_changes, candidates)
+        if best is None:
+            unrepaired += 1
+            continue
+        roster_changes.apply(best)
+        num_changes += 1 if len(best) == 1 else 2
+    return num_changes, unrepaired, roster_changes
+
+def _GetBestRepair(roster_changes, candidates):
+    # the candidate that fills a shift without adding a hard violation, fewest violations and then lowest delta
+    if not candidates:
+        return None
+    result = roster_changes.evaluate(candidates)
+    violations = result["violations"]
+    fills = violations["add_fill_every_shift_constraint"] < roster_changes.violations["add_fill_every_shift_constraint"]
+    no_new = np.all([violations[family] <= roster_changes.violations[family] for family in violations], axis=0)
+    accepted = np.flatnonzero(fills & no_new)
+    if not len(accepted):
+        return None
+    total = sum(violations.values())
+    return candidates[min(accepted.tolist(), key=lambda c: (total[c], result["delta"][c]))]
+
+class RobustnessSimulation(JsonReport):
+    # Monte Carlo robustness of candidate rosters under absences: the same scenarios for every roster, run in chunks
+    # in a process pool. The score is the expected number of slots and resuscitate requirements still uncovered
+    # after the greedy repair (after the absences when repair is off), lower is more robust
+    def __init__(self, nurses, shifts, constraints, works, sampler, num_scenarios=1000, seed=0, repair=True, max_processes=None, chunk_size=50):
+        self.nurses = nurses
+        self.shifts = shifts
+        self.constraints = constraints
+        self.works = [np.asarray(work, dtype=np.int8) for work in works]
+        self.sampler = sampler
+        self.num_scenarios = num_scenarios
+        self.seed = seed
+        self.repair = repair
+        self.max_processes = max_processes
+        self.chunk_size = chunk_size
+        self.result = {}
+
+    def run(self, names=None):
+        start_time = time.perf_counter()
+        names = names if names else [f"roster {r}" for r in range(len(self.works))]
+        absent_days = self.sampler.sample(self.num_scenarios, self.seed)
+        chunks = [absent_days[i:i + self.chunk_size] for i in range(0, self.num_scenarios, self.chunk_size)]
+        tasks = [(r, chunk, self.repair) for r in range(len(self.works)) for chunk in chunks]
+        scenarios = [{} for _ in self.works]
+        with ProcessPoolExecutor(max_workers=self.max_processes, initializer=InitScenarioWorker,
+                                 initargs=(self.nurses, self.shifts, self.constraints, self.works)) as executor:
+            for r, results in executor.map(RunScenarios, tasks):
+                for metric, values in results.items():
+                    scenarios[r].setdefault(metric, []).extend(values)
+
+        self.result = {"num_scenarios": self.num_scenarios, "seed": self.seed, "repair": self.repair,
+                       "sick_rate": float(self.sampler.sick_rates.mean()), "sick_days": self.sampler.sick_days,
+                       "outbreak_rate": self.sampler.outbreak_rate, "outbreak_share": self.sampler.outbreak_share,
+                       "outbreak_days": self.sampler.outbreak_days, "rosters": {}}
+        for name, metrics in zip(names, scenarios):
+            if self.repair:
+                shortfall = np.array(metrics["unrepaired"]) + np.maximum(np.array(metrics["resuscitate_unrepaired"]), 0)
+            else:
+                shortfall = np.array(metrics["uncovered"]) + np.maximum(np.array(metrics["resuscitate_broken"]), 0)
+            self.result["rosters"][name] = {"score": float(shortfall.mean()),
+                                            "summary": {metric: {"mean": float(np.mean(values)), "p50": float(np.percentile(values, 50)),
+                                                                 "p90": float(np.percentile(values, 90)), "max": float(np.max(values))}
+                                                        for metric, values in metrics.items()},
+                                            "scenarios": {metric: [int(value) for value in values] for metric, values in metrics.items()}}
+        self.result["time"] = time.perf_counter() - start_time
+        return self.result
+
+    def print_summary(self):
+        print()
+        print('Robustness over %d absence scenarios (seed %d, %.1f s), score = expected uncovered after %s' %
+              (self.num_scenarios, self.seed, self.result["time"], "repair" if self.repair else "absences"))
+        for name, roster in sorted(self.result["rosters"].items(), key=lambda item: item[1]["score"]):
+            print(f"  - {name}: score {roster['score']:.3f}")
+            for metric, summary in roster["summary"].items():
+                print('      %-22s mean %8.2f  p50 %8.1f  p90 %8.1f  max %8.1f' % (metric, summary["mean"], summary["p50"], summary["p90"], summary["max"]))
+        return
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from Export import RosterReader
+from Shift import Shift
+
+class Roster:
+    # solver independent roster: nurse names, shifts and the shifts assigned to every nurse
+    def __init__(self, fn=None):
+        self.fn = fn
+        self.nurse_names = []
+        self.shifts = []
+        self.nurse_shifts = [] # per nurse, sorted list of assigned shift indices
+        if fn:
+            self._InitFromFile(fn)
+
+    def __str__(self):
+        for n, nurse_name in enumerate(self.nurse_names):
+            print(f"{nurse_name}\t{' '.join(self.shifts[s].abbreviation for s in self.nurse_shifts[n])}")
+        return ""
+
+    def InitFromSolver(self, nurses, shifts, work, solver):
+        self.nurse_names = [nurse.name for nurse in nurses.nurses]
+        self.shifts = shifts.shifts
+        self.nurse_shifts = []
+        for n,_ in enumerate(nurses.nurses):
+            self.nurse_shifts.append([s for s,_ in enumerate(shifts.shifts) if solver.BooleanValue(work[n,s])])
+        return self
+
+    def IsAssigned(self, n, s):
+        return s in self.nurse_shifts[n]
+
+    def _InitFromFile(self, fn):
+        # long format roster as written by RosterExporter, every row is one assigned shift
+        nurse_index = {} # name -> n
+        shift_index = {} # (start, abbreviation) -> s
+        assignments = []
+        for row in RosterReader(fn).rows():
+            nurse_name = row["nurse"]
+            abbreviation = f"{row['shift_type']}{int(row['slot'])}"
+            start_date = datetime.fromisoformat(row["start"])
+            end_date = datetime.fromisoformat(row["end"])
+            if nurse_name not in nurse_index:
+                nurse_index[nurse_name] = len(self.nurse_names)
+                self.nurse_names.append(nurse_name)
+            key = (start_date, abbreviation)
+            if key not in shift_index:
+                shift_index[key] = len(self.shifts)
+                self.shifts.append(Shift(abbreviation, abbreviation, start_date, end_date))
+            assignments.append((nurse_index[nurse_name], shift_index[key]))
+
+        # order the shifts per day like Shifts does: dk0, dm0, dl0, dl1, a0, a1, n0, n1
+        type_order = {st: i for i, st in enumerate(["dk0", "dm0", "dl0", "dl1", "a0", "a1", "n0", "n1"])}
+        order = sorted(range(len(self.shifts)), key=lambda s: (self.shifts[s].start_date.date(), type_order.get(self.shifts[s].abbreviation, len(type_order)), self.shifts[s].start_date))
+        new_index = {old_s: new_s for new_s, old_s in enumerate(order)}
+        self.shifts = [self.shifts[s] for s in order]
+        self.nurse_shifts = [[] for _ in self.nurse_names]
+        for n, s in assignments:
+            self.nurse_shifts[n].append(new_index[s])
+        for nurse_shifts in self.nurse_shifts:
+            nurse_shifts.sort()
+        return
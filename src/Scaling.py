@@ -0,0 +1,113 @@
+import math
+import os
+import tempfile
+from datetime import datetime
+
+from Instance import Instance, InstanceGenerator
+from Model import RosterModel
+from Report import SaveJson
+
+class ModelScalingReport:
+    # builds (without solving) the run() model on a grid of nurse counts and horizons and records the model size per
+    # constraint family, then fits how every family grows with the number of nurses and the number of days. The
+    # instances have a request of every kind, so that the request families have constraints on every grid point.
+    # Families that only add objective terms (soft requests, zzp) are measured by their number of terms
+    METRICS = ["variables", "constraints", "literals", "objective_terms"]
+
+    def __init__(self, nurse_counts, horizons, year=2022, month=10, request_density=0.2, seed=0):
+        assert(len(nurse_counts) > 1 and len(horizons) > 1)
+        self.nurse_counts = sorted(nurse_counts)
+        self.horizons = sorted(horizons)
+        self.year = year
+        self.month = month
+        self.request_density = request_density
+        self.seed = seed
+        self.sizes = {} # family -> metric -> "nurses,days" -> size
+        self.exponents = {} # family -> metric -> {"nurses": exponent, "days": exponent}
+        self.unfitted = {} # family -> metric -> the grid points where it is empty
+
+    def run(self):
+        work_dir = tempfile.mkdtemp(prefix="hrh_scaling_")
+        for num_nurses in self.nurse_counts:
+            data_dir = InstanceGenerator(num_nurses, request_density=self.request_density, seed=self.seed, cover_request_kinds=True,
+                                         start_date=datetime(self.year, self.month, 1)).write(os.path.join(work_dir, str(num_nurses)))
+            for num_days in self.horizons:
+                instance = Instance(data_dir, self.year, self.month, num_days)
+                roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints, measure_sizes=True).build()
+                for family, family_size in roster_model.family_sizes.items():
+                    for metric in self.METRICS:
+                        self.sizes.setdefault(family, {}).setdefault(metric, {})[f"{num_nurses},{num_days}"] = family_size[metric]
+                print(f"built {num_nurses} nurses x {num_days} days: {len(roster_model.model.Proto().variables)} variables, {len(roster_model.model.Proto().constraints)} constraints")
+        self._FitExponents()
+        return self
+
+    def check(self, max_exponent=1.1, baseline=None, max_growth=0.1):
+        # a family fails when it grows faster than linearly in nurses or days, or when it is more than max_growth
+        # (fraction) bigger than the baseline at the same grid point. A metric that is empty on part of the grid
+        # cannot be fitted and fails as well, one that is empty on the whole grid is not measured for that family
+        failures = []
+        for family, metric_points in self.unfitted.items():
+            for metric, points in metric_points.items():
+                if len(points) < len(self.nurse_counts) * len(self.horizons):
+                    failures.append(f"{family}: {metric} is empty at {' '.join(points)} (nurses,days), its growth cannot be fitted")
+        for family, metric_exponents in self.exponents.items():
+            for metric, exponents in metric_exponents.items():
+                for axis, exponent in exponents.items():
+                    if exponent > max_exponent:
+                        failures.append(f"{family}: {metric} grows with exponent {exponent:.2f} in {axis}")
+        if baseline:
+            for family, metric_sizes in self.sizes.items():
+                for metric, sizes in metric_sizes.items():
+                    for point, size in sizes.items():
+                        baseline_size = baseline.get(family, {}).get(metric, {}).get(point)
+                        if baseline_size is not None and size > baseline_size * (1 + max_growth):
+                            failures.append(f"{family}: {metric} at {point} (nurses,days) grew from {baseline_size} to {size}")
+        return failures
+
+    def print_summary(self):
+        largest = f"{self.nurse_counts[-1]},{self.horizons[-1]}"
+        print()
+        print(f"Model size per family at {self.nurse_counts[-1]} nurses x {self.horizons[-1]} days and growth exponents (nurses/days)")
+        for family, metric_sizes in sorted(self.sizes.items(), key=lambda item: (-item[1]["literals"][largest], -item[1]["objective_terms"][largest])):
+            line = "  %-48s" % family
+            for metric in self.METRICS:
+                exponents = self.exponents.get(family, {}).get(metric)
+                exponent_text = "%.2f/%.2f" % (exponents["nurses"], exponents["days"]) if exponents else "-"
+                line += " %s %8i (%s)" % (metric[:4], metric_sizes[metric][largest], exponent_text)
+            print(line)
+        objective_only = [family for family, metric_sizes in self.sizes.items() if max(metric_sizes["objective_terms"].values()) > 0 and
+                          all(max(metric_sizes[metric].values()) <= 0 for metric in ["constraints", "literals"])]
+        if objective_only:
+            print(f"  objective terms only: {', '.join(objective_only)}")
+        not_measured = [family for family, metric_sizes in self.sizes.items() if all(max(sizes.values()) <= 0 for sizes in metric_sizes.values())]
+        if not_measured:
+            print(f"  empty on the whole grid: {', '.join(not_measured)}")
+        return
+
+    def save(self, fn):
+        SaveJson({"nurse_counts": self.nurse_counts, "horizons": self.horizons, "sizes": self.sizes, "exponents": self.exponents,
+                  "unfitted": self.unfitted}, fn)
+        return
+
+    def _FitExponents(self):
+        # slope of log(size) against log(nurses) within every horizon, and against log(days) within every nurse
+        # count, pooled over the grid. Metrics that are empty somewhere on the grid are not fitted but kept in unfitted
+        for family, metric_sizes in self.sizes.items():
+            for metric, sizes in metric_sizes.items():
+                if min(sizes.values()) <= 0:
+                    self.unfitted.setdefault(family, {})[metric] = [point for point, size in sizes.items() if size <= 0]
+                    continue
+                self.exponents.setdefault(family, {})[metric] = {
+                    "nurses": self._FitSlope([[(num_nurses, sizes[f"{num_nurses},{num_days}"]) for num_nurses in self.nurse_counts] for num_days in self.horizons]),
+                    "days": self._FitSlope([[(num_days, sizes[f"{num_nurses},{num_days}"]) for num_days in self.horizons] for num_nurses in self.nurse_counts])}
+        return
+
+    def _FitSlope(self, groups):
+        numerator, denominator = 0.0, 0.0
+        for group in groups:
+            xs = [math.log(x) for x, _ in group]
+            ys = [math.log(y) for _, y in group]
+            x_mean, y_mean = sum(xs) / len(xs), sum(ys) / len(ys)
+            numerator += sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys))
+            denominator += sum((x - x_mean) ** 2 for x in xs)
+        return numerator / denominator
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from ortools.sat.python import cp_model
+
+from Constraint import Constraint, Constraints
+from Export import RosterExporter
+from Instance import Instance
+from Model import RosterModel
+from Profile import SolveProfile
+from Solution import RosterSolutionCallback
+
+REQUEST_FIELDS = ["name", "full_date", "day", "shift", "do_assign", "streakmin", "streakmax", "max_sum", "percentage", "is_hard"]
+
+def RequestToDict(request):
+    values = {field: getattr(request, field) for field in REQUEST_FIELDS}
+    if values["full_date"]:
+        values["full_date"] = values["full_date"].strftime("%m-%d-%Y") # the requests.csv format
+    return values
+
+def RequestFromDict(values):
+    assert set(values) <= set(REQUEST_FIELDS), f"unknown request fields {sorted(set(values) - set(REQUEST_FIELDS))}"
+    values = dict(values)
+    if values.get("full_date"):
+        values["full_date"] = datetime.strptime(values["full_date"], "%m-%d-%Y")
+    return Constraint(**values)
+
+class WarmInstance:
+    # an instance kept in memory with its model built up to the request families, solves copy that base model and
+    # only add the (edited) requests
+    def __init__(self, instance_id, data_dir, year, month, num_days=None):
+        self.instance_id = instance_id
+        self.instance = Instance(data_dir, year, month, num_days)
+        start_time = time.perf_counter()
+        base_families = [family for family, _ in RosterModel.FAMILIES if family not in RosterModel.REQUEST_FAMILIES]
+        self.base_model = RosterModel(self.instance.nurses, self.instance.shifts, self.instance.constraints).build(base_families)
+        self.build_time = time.perf_counter() - start_time
+        self.requests = list(self.instance.constraints.requests)
+        self.conflicts = self.instance.conflicts
+        self.version = 0
+        self.hint = [] # (n, s) assignments of the latest roster, to start the next solve from
+
+    def to_dict(self):
+        return {"instance": self.instance_id, "data_dir": self.instance.data_dir, "year": self.instance.year, "month": self.instance.month,
+                "num_days": self.instance.num_days, "nurses": len(self.instance.nurses.nurses), "shifts": len(self.instance.shifts.shifts),
+                "requests": len(self.requests), "conflicts": [str(conflict) for conflict in self.conflicts if conflict.blocking],
+                "warnings": [str(conflict) for conflict in self.conflicts if not conflict.blocking], "version": self.version, "load_time": self.instance.load_time, "build_time": self.build_time}
+
+    def set_requests(self, requests):
+        self.requests = requests
+        self.conflicts = self.GetConstraints().check_requests(self.instance.nurses, self.instance.shifts)
+        self.version += 1
+        return
+
+    def GetConstraints(self, requests=None):
+        # with the current requests or with the given ones, e.g. those of a queued job
+        constraints = Constraints()
+        constraints.requests = list(self.requests if requests is None else requests)
+        return constraints
+
+    def GetModel(self, requests=None):
+        constraints = self.GetConstraints(requests)
+        roster_model = self.base_model.copy(constraints)
+        for family, objective_family in RosterModel.FAMILIES:
+            if family in RosterModel.REQUEST_FAMILIES:
+                roster_model.add_family(family, objective_family)
+        roster_model.minimize()
+        return roster_model
+
+    def GetRequestsHash(self, requests=None):
+        return hashlib.sha256(json.dumps([RequestToDict(request) for request in (self.requests if requests is None else requests)]).encode()).hexdigest()
+
+class SolveJob:
+    # one solve of a warm instance with its requests as they were when the job was submitted, runs in the worker
+    # pool and can be followed and stopped while it runs
+    def __init__(self, job_id, warm_instance, profile, requests):
+        self.job_id = job_id
+        self.warm_instance = warm_instance
+        self.profile = profile
+        self.requests = list(requests)
+        self.lock = threading.Lock()
+        self.status = "queued"
+        self.objective = None
+        self.bound = None
+        self.solutions = 0
+        self.stop_requested = False
+        self.result = {}
+        self.error = None
+        self.future = None
+
+    def to_dict(self, rows=True):
+        with self.lock:
+            job = {"job": self.job_id, "instance": self.warm_instance.instance_id, "status": self.status, "objective": self.objective,
+                   "bound": self.bound, "solutions": self.solutions, "profile": self.profile.to_dict()}
+            if self.error:
+                job["error"] = self.error
+            job.update({key: value for key, value in self.result.items() if rows or key != "rows"})
+        return job
+
+    def run(self):
+        # a failing edit, build or solve ends the job as "failed" with the error, not in the step it failed in
+        try:
+            with self.lock:
+                self.status = "building"
+            start_time = time.perf_counter()
+            roster_model = self.warm_instance.GetModel(self.requests)
+            model_time = time.perf_counter() - start_time
+            hint = set(self.warm_instance.hint)
+            if hint:
+                for key, var in roster_model.work.items():
+                    roster_model.model.AddHint(var, int(key in hint))
+
+            with self.lock:
+                self.status = "solving"
+            solver = self.profile.apply(cp_model.CpSolver())
+            solver.parameters.repair_hint = bool(hint) # an edited request can make the previous roster infeasible
+            status = solver.Solve(roster_model.model, RosterSolutionCallback([self], verbose=False))
+            result = {"model_time": model_time, "solve_time": solver.WallTime(), "penalties": {}, "rows": []}
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                result["penalties"] = roster_model.GetPenalties(solver)
+                result["rows"] = list(RosterExporter().IterLongRows(roster_model.nurses, roster_model.shifts, roster_model.work, solver))
+                self.warm_instance.hint = [key for key, var in roster_model.work.items() if solver.BooleanValue(var)]
+            with self.lock:
+                self.status = solver.StatusName(status)
+                self.objective = solver.ObjectiveValue() if result["rows"] else None
+                self.bound = solver.BestObjectiveBound()
+                self.result = result
+        except Exception as e:
+            with self.lock:
+                self.status = "failed"
+                self.error = f"{type(e).__name__}: {e}"
+        return self
+
+    def on_solution(self, callback):
+        with self.lock:
+            self.objective = callback.ObjectiveValue()
+            self.bound = callback.BestObjectiveBound()
+            self.solutions += 1
+            stop_requested = self.stop_requested
+        if stop_requested:
+            callback.StopSearch()
+        return
+
+    def stop(self):
+        with self.lock:
+            self.stop_requested = True
+        return
+
+class RosterService:
+    # local HTTP/JSON service that keeps instances and their base models warm between planner actions. Solves run
+    # in a bounded thread pool (CP-SAT releases the GIL), finished rosters are cached per instance, requests and
+    # solve profile so repeating a solve is immediate
+    #   POST /instances                 {"data_dir", "year", "month", "num_days"} -> load (or reuse) a warm instance
+    #   GET  /instances                 warm instances
+    #   GET  /instances/<id>/requests   the current requests
+    #   PUT  /instances/<id>/requests   replace the requests, POST appends to them
+    #   POST /instances/<id>/solve      {solve profile fields, "wait"} -> job
+    #   GET  /jobs/<id>                 job status and roster rows when done
+    #   POST /jobs/<id>/stop            stop the solve and keep its best roster
+    def __init__(self, host="127.0.0.1", port=8060, max_solves=2, default_profile=None):
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=max_solves)
+        self.default_profile = default_profile if default_profile else SolveProfile(max_time=10.0)
+        self.instances = {}
+        self.instance_keys = {} # (data_dir, year, month, num_days) -> instance id
+        self.jobs = {}
+        self.cache = {} # (instance id, requests hash, profile) -> finished job
+
+    async def serve(self):
+        server = await asyncio.start_server(self._HandleClient, self.host, self.port)
+        print(f"Roster service at http://{self.host}:{self.port}/")
+        async with server:
+            await server.serve_forever()
+
+    async def load(self, data_dir, year, month, num_days=None):
+        key = (data_dir, year, month, num_days)
+        if key not in self.instance_keys:
+            instance_id = str(len(self.instances))
+            # loading and building take a while, keep the event loop responsive
+            self.instances[instance_id] = await asyncio.get_running_loop().run_in_executor(None, WarmInstance, instance_id, data_dir, year, month, num_days)
+            self.instance_keys[key] = instance_id
+        return self.instances[self.instance_keys[key]]
+
+    async def solve(self, warm_instance, profile, wait=False):
+        # the requests of the job are fixed here, an edit while it is queued does not change what it solves or caches
+        requests = list(warm_instance.requests)
+        key = (warm_instance.instance_id, warm_instance.GetRequestsHash(requests), str(profile))
+        if key in self.cache:
+            return self.cache[key]
+        job = SolveJob(str(len(self.jobs)), warm_instance, profile, requests)
+        self.jobs[job.job_id] = job
+        job.future = asyncio.get_running_loop().run_in_executor(self.executor, job.run)
+        job.future.add_done_callback(lambda future: self._CacheJob(key, job, future))
+        if wait:
+            await job.future
+        return job
+
+    def _CacheJob(self, key, job, future):
+        # stopped or failed solves are not worth repeating
+        if future.exception() is None and job.status in ("OPTIMAL", "FEASIBLE") and not job.stop_requested:
+            self.cache[key] = job
+        return
+
+    async def _HandleClient(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            content_length = 0
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    content_length = int(value)
+            if len(request_line) < 2:
+                return
+            body = json.loads(await reader.readexactly(content_length)) if content_length else {}
+            method, path = request_line[0], request_line[1].split("?")[0].strip("/").split("/")
+            try:
+                status, response = await self._Route(method, path, body)
+            except (AssertionError, KeyError, TypeError, ValueError) as e:
+                status, response = "400 Bad Request", {"error": f"{type(e).__name__}: {e}"}
+            data = json.dumps(response).encode()
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+            await writer.drain()
+        finally:
+            writer.close()
+        return
+
+    async def _Route(self, method, path, body):
+        if path == ["instances"] and method == "GET":
+            return "200 OK", [warm_instance.to_dict() for warm_instance in self.instances.values()]
+        elif path == ["instances"] and method == "POST":
+            warm_instance = await self.load(body["data_dir"], int(body.get("year", 2022)), int(body.get("month", 10)), body.get("num_days") or None)
+            return "200 OK", warm_instance.to_dict()
+        elif len(path) == 3 and path[0] == "instances" and path[1] in self.instances:
+            warm_instance = self.instances[path[1]]
+            if path[2] == "requests" and method == "GET":
+                return "200 OK", [RequestToDict(request) for request in warm_instance.requests]
+            elif path[2] == "requests" and method in ("PUT", "POST"):
+                requests = [RequestFromDict(values) for values in (body if isinstance(body, list) else [body])]
+                warm_instance.set_requests(requests if method == "PUT" else warm_instance.requests + requests)
+                return "200 OK", warm_instance.to_dict()
+            elif path[2] == "solve" and method == "POST":
+                wait = body.pop("wait", False)
+                profile = self.default_profile.Copy(**body)
+                job = await self.solve(warm_instance, profile, wait)
+                return "200 OK", job.to_dict(rows=wait)
+        elif len(path) >= 2 and path[0] == "jobs" and path[1] in self.jobs:
+            job = self.jobs[path[1]]
+            if len(path) == 2 and method == "GET":
+                return "200 OK", job.to_dict()
+            elif path[2:] == ["stop"] and method == "POST":
+                job.stop()
+                return "200 OK", job.to_dict(rows=False)
+        return "404 Not Found", {"error": f"no route for {method} /{'/'.join(path)}"}
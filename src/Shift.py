@@ -1,3 +1,4 @@
+import copy
 import os
 from datetime import datetime, timedelta
 from unicodedata import name
@@ -65,6 +66,15 @@ class Shifts:
             print(t)
         return ""
 
+    def GetSubset(self, shift_types):
+        # copy with only the shifts of the given types (abbreviation without the slot number), indices[i] is the
+        # index in self.shifts of shift i of the copy
+        subset = copy.copy(self)
+        subset.indices = [s for s, shift in enumerate(self.shifts) if shift.abbreviation[:-1] in shift_types]
+        subset.shifts = [self.shifts[s] for s in subset.indices]
+        assert(subset.shifts)
+        return subset
+
     def GetTypes(self):
         return ["dk0", "dm0", "dl0", "dl1", "a0", "a1", "n0", "n1"]
 
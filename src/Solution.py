@@ -0,0 +1,25 @@
+import time
+
+from ortools.sat.python import cp_model
+
+class RosterSolutionCallback(cp_model.CpSolverSolutionCallback):
+    # prints every improving solution like cp_model.ObjectiveSolutionPrinter and hands it to the listeners,
+    # a listener has an on_solution(callback) method and can read values through the callback
+    def __init__(self, listeners=None, verbose=True):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.listeners = listeners if listeners else []
+        self.verbose = verbose
+        self.solution_count = 0
+        self.start_time = time.time()
+
+    def on_solution_callback(self):
+        self.solution_count += 1
+        if self.verbose:
+            print('Solution %i, time = %0.2f s, objective = %i' % (self.solution_count, time.time() - self.start_time, self.ObjectiveValue()))
+        for listener in self.listeners:
+            listener.on_solution(self)
+        return
+
+def GetGap(objective, bound):
+    # relative gap between the objective of a solution and the best bound
+    return abs(objective - bound) / max(1.0, abs(objective))
@@ -0,0 +1,160 @@
+import time
+
+from ortools.sat.python import cp_model
+
+from Constraint import Constraints
+from Instance import Instance
+from Model import RosterModel
+from Report import JsonReport
+from Solution import RosterSolutionCallback
+from Telemetry import GetTimeToQuality, SolverTelemetry
+
+class StagedSolve:
+    # solves the night (and optionally evening) shifts first and then the whole roster with those assignments fixed
+    # or hinted. The first stage only has the families that are exact on a subset of shift types (not the weekend
+    # limit, the whole weekend pairs and the rest after n shifts requests, they index all shift types), the weekly
+    # contract hours are replaced by a budget: the hours of the first stage shifts should stay within the contract
+    FIRST_STAGE_FAMILIES = ["add_fill_every_shift_constraint",
+                            "add_one_shift_per_day_constraint",
+                            "add_rest_after_night_shift_constraint",
+                            "add_skill_requirement_resuscitate",
+                            "add_penalized_day_evening_transition_constraint",
+                            "add_sequence_constraint",
+                            "add_max_5_shifts_per_week",
+                            "add_penalty_to_zzp_allocation",
+                            "add_hard_requests_do_not_work_day",
+                            "add_hard_requests_do_not_work_shift",
+                            "add_hard_requests_work_specific_day_shift",
+                            "add_hard_requests_percentage_shift",
+                            "add_soft_requests_do_assign_shift"]
+
+    def __init__(self, nurses, shifts, constraints, stage_types=("n",), fix=True, budget_cost=None):
+        self.nurses = nurses
+        self.shifts = shifts
+        self.constraints = constraints
+        self.stage_types = stage_types
+        self.fix = fix # fix the first stage assignments, hint them otherwise
+        self.budget_cost = budget_cost # per hour over the contract, the CONTRACT_OVER_COST of constraints when None
+        self.assignments = [] # (n, s) of the first stage, s indexes the full shifts
+        self.first_stage_time = 0.0
+        self.first_stage_status = None
+
+    def solve_first_stage(self, profile):
+        start_time = time.perf_counter()
+        subset = self.shifts.GetSubset(self.stage_types)
+        # requests about shift types outside the stage are left to the second stage, and so are the requests to work
+        # on a day without a shift type: any shift of the full roster meets them, not only one of the stage
+        constraints = Constraints().set_weights(self.constraints.GetWeights())
+        constraints.requests = [request for request in self.constraints.requests
+                                if (not request.shift or request.shift in self.stage_types) and not (request.do_assign and not request.shift)]
+        roster_model = RosterModel(self.nurses, subset, constraints).build(self.FIRST_STAGE_FAMILIES)
+        self._AddHourBudget(roster_model, subset)
+        roster_model.minimize()
+
+        solver = profile.apply(cp_model.CpSolver())
+        status = solver.Solve(roster_model.model)
+        self.first_stage_status = solver.StatusName(status)
+        self.assignments = []
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            self.assignments = [(n, subset.indices[s]) for (n, s), var in roster_model.work.items() if solver.BooleanValue(var)]
+        self.first_stage_time = time.perf_counter() - start_time
+        print(f"first stage ({', '.join(self.stage_types)}): {self.first_stage_status}, {len(self.assignments)} shifts in {self.first_stage_time:.2f} s")
+        return status
+
+    def apply(self, roster_model, fix=None):
+        # fixes or hints the first stage assignments in a model of the full roster
+        fix = self.fix if fix is None else fix
+        for n, s in self.assignments:
+            if fix:
+                roster_model.model.Add(roster_model.work[n, s] == 1)
+            else:
+                roster_model.model.AddHint(roster_model.work[n, s], 1)
+        return
+
+    def solve(self, profile, stage_share=0.25, listeners=None, base_model=None, verbose=False):
+        # both stages within profile.max_time, the first stage gets stage_share of it. The second stage solves a copy
+        # of base_model (a built model of the full roster) or a new model. Returns the full roster model, the solver
+        # and the status of the second stage
+        self.solve_first_stage(profile.Copy(max_time=profile.max_time * stage_share))
+        if not self.assignments:
+            print("first stage found no roster, solving the whole roster without it")
+        for fix in ([self.fix, False] if self.fix and self.assignments else [False]):
+            roster_model = base_model.copy() if base_model else RosterModel(self.nurses, self.shifts, self.constraints).build()
+            self.apply(roster_model, fix)
+            solver = profile.Copy(max_time=max(1.0, profile.max_time - self.first_stage_time)).apply(cp_model.CpSolver())
+            status = solver.Solve(roster_model.model, RosterSolutionCallback(listeners, verbose=verbose))
+            if status != cp_model.INFEASIBLE:
+                break
+            print("second stage infeasible with the first stage fixed, hinting it instead")
+        return roster_model, solver, status
+
+    def _AddHourBudget(self, roster_model, subset):
+        # hours per week as counted by add_weekly_contract_hours_constraint (scaled to the days of the week in the
+        # horizon), penalized above the contract and at most 60
+        weeks = {}
+        for s, shift in enumerate(subset.shifts):
+            weeks.setdefault(shift.start_date.isocalendar().week, []).append(s)
+        variables, coefficients = [], []
+        for bundle in weeks.values():
+            week_faction = len(set(subset.shifts[s].start_date.date() for s in bundle)) / 7.0
+            for n, nurse in enumerate(self.nurses.nurses):
+                hours = sum(roster_model.work[n, s] * int(subset.shifts[s].work_hours * week_faction) for s in bundle)
+                roster_model.model.Add(hours <= Constraints.MAX_WEEK_HOURS)
+                over = roster_model.model.NewIntVar(0, Constraints.MAX_WEEK_HOURS, f"budget {nurse.name}")
+                roster_model.model.Add(over >= hours - int(nurse.contract))
+                variables.append(over)
+                coefficients.append(self.constraints.CONTRACT_OVER_COST if self.budget_cost is None else self.budget_cost)
+        roster_model.add_objective_terms("hour_budget", variables, coefficients)
+        return
+
+class StagedBenchmark(JsonReport):
+    # time to quality of the staged solve against the monolithic solve with the same total time, times include
+    # model building and, for the staged solve, the first stage
+    def __init__(self, data_dir, year, month, num_days, profile, stage_types=("n",), fix=True, stage_share=0.25, quality=0.01):
+        self.instance = Instance(data_dir, year, month, num_days)
+        self.profile = profile
+        self.stage_types = stage_types
+        self.fix = fix
+        self.stage_share = stage_share
+        self.quality = quality
+        self.result = {}
+
+    def run(self):
+        instance = self.instance
+        runs = {}
+
+        start_time = time.perf_counter()
+        roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints).build()
+        telemetry = SolverTelemetry("monolithic", self.profile.to_dict())
+        solver = self.profile.apply(cp_model.CpSolver())
+        offset = time.perf_counter() - start_time
+        telemetry.finish(solver, solver.Solve(roster_model.model, RosterSolutionCallback([telemetry], verbose=False)))
+        runs["monolithic"] = (telemetry, offset)
+
+        start_time = time.perf_counter()
+        staged = StagedSolve(instance.nurses, instance.shifts, instance.constraints, self.stage_types, self.fix)
+        telemetry = SolverTelemetry("staged", self.profile.to_dict())
+        _, solver, status = staged.solve(self.profile, self.stage_share, [telemetry])
+        telemetry.finish(solver, status)
+        runs["staged"] = (telemetry, time.perf_counter() - start_time - solver.WallTime())
+
+        objectives = [telemetry.response["objective"] for telemetry, _ in runs.values() if telemetry.response["objective"] is not None]
+        target = min(objectives) if objectives else None
+        self.result = {"profile": self.profile.to_dict(), "stage_types": list(self.stage_types), "fix": self.fix, "stage_share": self.stage_share,
+                       "quality": self.quality, "target_objective": target, "first_stage_status": staged.first_stage_status,
+                       "first_stage_time": staged.first_stage_time, "runs": {}}
+        for name, (telemetry, offset) in runs.items():
+            solutions = [[i, wall_time + offset, objective, bound, gap] for i, wall_time, objective, bound, gap in telemetry.solutions]
+            self.result["runs"][name] = {"status": telemetry.response["status"], "objective": telemetry.response["objective"],
+                                         "bound": telemetry.response["bound"], "first_solution": solutions[0][1] if solutions else None,
+                                         "time_to_quality": GetTimeToQuality(solutions, target, self.quality), "solutions": solutions}
+        return self.result
+
+    def print_summary(self):
+        print()
+        print('Staged (%s first, %s) against monolithic, quality %.3f of %s' % ("+".join(self.stage_types), "fixed" if self.fix else "hinted",
+                                                                               self.quality, self.result["target_objective"]))
+        for name, run in self.result["runs"].items():
+            print('  - %-11s: %-8s objective %s, bound %s, first solution %s s, time to quality %s s' % (name, run["status"], run["objective"], run["bound"],
+                  "-" if run["first_solution"] is None else "%.2f" % run["first_solution"], "-" if run["time_to_quality"] is None else "%.2f" % run["time_to_quality"]))
+        return
@@ -0,0 +1,85 @@
+import html
+import os
+from calendar import month_name as month_names
+
+import colorcet as cc
+
+class StaticRosterRenderer:
+    # plain html tables (nurse x day per month), no javascript needed to view them
+    def __init__(self):
+        self.color_weekend = "lightsteelblue"
+        self.nurse_colors = cc.glasbey_bw_minc_20_minl_30
+        self.day_names = ["ma", "di", "wo", "do", "vr", "za", "zo"]
+
+    def render(self, roster, filename="HoningsRooster.html", split_months=False):
+        month_tables = []
+        for (year, month), month_days in self._GetMonthDays(roster).items():
+            month_tables.append(((year, month), self._RenderMonthTable(year, month, month_days, roster)))
+
+        filenames = []
+        if split_months:
+            root, extension = os.path.splitext(filename)
+            for (year, month), table in month_tables:
+                filenames.append(f"{root}_{year}-{month:02d}{extension}")
+                self._WriteHtml(filenames[-1], [table], len(roster.nurse_names))
+        else:
+            filenames.append(filename)
+            self._WriteHtml(filename, [table for _, table in month_tables], len(roster.nurse_names))
+        return filenames
+
+    def render_fragment(self, roster):
+        # style and tables without the surrounding html document, for embedding
+        tables = [self._RenderMonthTable(year, month, month_days, roster) for (year, month), month_days in self._GetMonthDays(roster).items()]
+        return self._GetStyle(len(roster.nurse_names)) + "".join(tables)
+
+    def _WriteHtml(self, filename, tables, num_nurses):
+        with open(filename, "w") as f:
+            f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>HoningsRooster</title>")
+            f.write(self._GetStyle(num_nurses))
+            f.write("</head><body>\n")
+            f.writelines(tables)
+            f.write("</body></html>\n")
+        print("Wrote %s" % filename)
+        return
+
+    def _GetStyle(self, num_nurses):
+        # one css class per nurse color keeps the table cells small
+        lines = ["<style>",
+                 "table{border-collapse:collapse;font:11px sans-serif;margin-bottom:24px}",
+                 "th,td{border:1px solid #ccc;padding:1px 3px;text-align:center;white-space:nowrap}",
+                 "td.name{text-align:left}",
+                 f".we{{background:{self.color_weekend}}}"]
+        for n in range(num_nurses):
+            r, g, b = self.nurse_colors[n % len(self.nurse_colors)]
+            lines.append(".n%i{background:#%02x%02x%02x}" % (n, int(r*255), int(g*255), int(b*255)))
+        lines.append("</style>")
+        return "\n".join(lines)
+
+    def _GetMonthDays(self, roster):
+        # (year, month) -> sorted days of the month that have shifts
+        month_days = {}
+        for shift in roster.shifts:
+            days = month_days.setdefault((shift.start_date.year, shift.start_date.month), [])
+            if not days or days[-1] != shift.start_date.date():
+                days.append(shift.start_date.date())
+        return month_days
+
+    def _RenderMonthTable(self, year, month, month_days, roster):
+        day_index = {day: d for d, day in enumerate(month_days)}
+        weekend = [day.weekday() >= 5 for day in month_days]
+        lines = [f"<h2>{month_names[month]} {year}</h2>", "<table>", "<tr><th></th>"]
+        lines.extend(f"<th{' class=we' if weekend[d] else ''}>{self.day_names[day.weekday()]}<br>{day.day}</th>" for d, day in enumerate(month_days))
+        lines.append("</tr>")
+        for n, nurse_name in enumerate(roster.nurse_names):
+            cells = [""] * len(month_days)
+            for s in roster.nurse_shifts[n]:
+                shift = roster.shifts[s]
+                d = day_index.get(shift.start_date.date())
+                if d is None:
+                    continue
+                cells[d] = f"<td class=n{n}>{shift.abbreviation}</td>"
+            lines.append(f"<tr><td class=name>{html.escape(nurse_name)}</td>")
+            lines.extend(cell if cell else ("<td class=we></td>" if weekend[d] else "<td></td>") for d, cell in enumerate(cells))
+            lines.append("</tr>")
+        lines.append("</table>\n")
+        return "\n".join(lines)
@@ -0,0 +1,103 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+from Solution import GetGap
+
+class SolverTelemetry:
+    # records wall time, objective, best bound, gap and solution count for every solution of a solve (as a listener
+    # of RosterSolutionCallback) and the full response statistics at the end
+    COLUMNS = ["solution", "wall_time", "objective", "bound", "gap"]
+
+    def __init__(self, name="", parameters=None):
+        self.name = name if name else datetime.now().isoformat(timespec="seconds")
+        self.parameters = parameters if parameters else {}
+        self.solutions = []
+        self.response = {}
+        self.response_stats = ""
+
+    def on_solution(self, callback):
+        objective, bound = callback.ObjectiveValue(), callback.BestObjectiveBound()
+        self.solutions.append([len(self.solutions) + 1, callback.WallTime(), objective, bound, GetGap(objective, bound)])
+        return
+
+    def finish(self, solver, status):
+        self.response_stats = solver.ResponseStats()
+        self.response = {"status": solver.StatusName(status),
+                         "wall_time": solver.WallTime(),
+                         "user_time": solver.UserTime(),
+                         "conflicts": solver.NumConflicts(),
+                         "branches": solver.NumBranches(),
+                         "objective": solver.ObjectiveValue() if self.solutions else None,
+                         "bound": solver.BestObjectiveBound()}
+        # CpSolverResponse summary lines are "key: value"
+        for line in self.response_stats.splitlines():
+            key, _, value = line.partition(": ")
+            if value and key.strip() not in self.response:
+                self.response[key.strip()] = value.strip()
+        return
+
+    def save(self, prefix):
+        # <prefix>.csv with one row per solution, <prefix>.json with everything
+        with open(prefix + ".csv", "w", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(self.COLUMNS)
+            writer.writerows(self.solutions)
+        with open(prefix + ".json", "w") as f:
+            json.dump({"name": self.name, "parameters": self.parameters, "columns": self.COLUMNS, "solutions": self.solutions,
+                       "response": self.response, "response_stats": self.response_stats}, f, indent=1)
+        print(f"Wrote {prefix}.csv and {prefix}.json")
+        return
+
+def GetTimeToQuality(solutions, target, quality):
+    # wall time of the first solution within quality (relative) of the target objective, None when never reached
+    if target is None:
+        return None
+    threshold = target + quality * max(1.0, abs(target))
+    for _, wall_time, objective, _, _ in solutions:
+        if objective <= threshold:
+            return wall_time
+    return None
+
+class TelemetryComparison:
+    # overlays the objective and bound curves of several runs saved by SolverTelemetry
+    def __init__(self, fns):
+        self.runs = []
+        for fn in fns:
+            assert(os.path.isfile(fn))
+            with open(fn) as f:
+                self.runs.append(json.load(f))
+
+    def print_summary(self):
+        print()
+        print("%-32s %10s %12s %12s %8s %10s %10s" % ("run", "solutions", "objective", "bound", "gap", "first [s]", "last [s]"))
+        for run in self.runs:
+            solutions = run["solutions"]
+            if solutions:
+                first, last = solutions[0], solutions[-1]
+                print("%-32s %10i %12.0f %12.0f %8.4f %10.2f %10.2f" % (run["name"][:32], len(solutions), last[2], last[3], last[4], first[1], last[1]))
+            else:
+                print("%-32s %10i %12s %12s %8s %10s %10s" % (run["name"][:32], 0, "-", "-", "-", "-", "-"))
+        return
+
+    def visualize(self, filename="telemetry.html"):
+        from bokeh.embed import file_html
+        from bokeh.plotting import figure
+        from bokeh.resources import CDN
+        import colorcet as cc
+
+        plot = figure(width=1000, height=500, x_axis_label="wall time [s]", y_axis_label="objective / bound", title="solver convergence")
+        for i, run in enumerate(self.runs):
+            solutions = run["solutions"]
+            if not solutions:
+                continue
+            color = cc.glasbey_dark[i % len(cc.glasbey_dark)]
+            times = [solution[1] for solution in solutions]
+            plot.step(times, [solution[2] for solution in solutions], mode="after", color=color, line_width=2, legend_label=f"{run['name']} objective")
+            plot.step(times, [solution[3] for solution in solutions], mode="after", color=color, line_dash="dashed", legend_label=f"{run['name']} bound")
+        plot.legend.click_policy = "hide"
+        with open(filename, "w") as f:
+            f.write(file_html(plot, CDN, "solver convergence"))
+        print("Wrote %s" % filename)
+        return
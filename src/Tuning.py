@@ -0,0 +1,201 @@
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from Evaluate import RosterEvaluator
+from Instance import Instance
+from Model import RosterModel
+from Profile import SolveProfile
+from Report import JsonReport
+
+def GetHoursDeviation(evaluator, work):
+    # mean absolute difference between the hours worked (as counted by add_weekly_contract_hours_constraint) and the
+    # contract, per nurse and week
+    hours = work.astype(np.float32) @ evaluator.week_hours
+    return float(np.abs(hours - evaluator.contracts).mean())
+
+def GetFragmentation(evaluator, work):
+    # work blocks (runs of consecutive working days) per working day, 1 when every working day stands alone
+    worked = (work.astype(np.float32) @ evaluator.days) > 0
+    starts = worked & ~np.pad(worked, ((0, 0), (1, 0)))[:, :-1]
+    return float(starts.sum() / max(worked.sum(), 1))
+
+def GetRequestSatisfaction(evaluator, work):
+    # share of the shifts named in soft requests that are (not) assigned as requested
+    if not evaluator.soft_requests:
+        return 1.0
+    return sum(bool(work[n, s]) == do_assign for n, s, do_assign in evaluator.soft_requests) / len(evaluator.soft_requests)
+
+def GetZZPShifts(evaluator, work):
+    return float(work[evaluator.constraints._GetAllNursesWithZZPContract(evaluator.nurses)].sum())
+
+def GetTransitions(evaluator, work):
+    # penalized (not the hard) day to day transitions
+    work = work.astype(np.float32)
+    return float(((work @ (evaluator.transition_costs > 0)) * work).sum())
+
+def GetFairnessSpread(evaluator, work, category):
+    # spread of the contract normalized counts of a fairness category, in shifts of a full time contract
+    return evaluator.GetFairnessSpreads(work)[category] / evaluator.constraints.FAIRNESS_SCALE
+
+def GetNightSpread(evaluator, work):
+    return GetFairnessSpread(evaluator, work, "nights")
+
+def GetWeekendSpread(evaluator, work):
+    return GetFairnessSpread(evaluator, work, "weekends")
+
+def GetEveningSpread(evaluator, work):
+    return GetFairnessSpread(evaluator, work, "evenings")
+
+# planner KPIs: name -> (function of the evaluator and a roster matrix, "min" or "max")
+KPIS = {"hours_deviation": (GetHoursDeviation, "min"),
+        "fragmentation": (GetFragmentation, "min"),
+        "request_satisfaction": (GetRequestSatisfaction, "max"),
+        "zzp_shifts": (GetZZPShifts, "min"),
+        "transitions": (GetTransitions, "min"),
+        "night_spread": (GetNightSpread, "min"),
+        "weekend_spread": (GetWeekendSpread, "min"),
+        "evening_spread": (GetEveningSpread, "min")}
+
+def SolveWithWeights(task):
+    # solves one instance in a worker process with task["weights"] and scores the roster on task["kpis"], with the
+    # fairness objective when the weights give FAIRNESS_COST
+    instance = Instance(task["data_dir"], task["year"], task["month"], task["num_days"])
+    instance.constraints.set_weights(task["weights"])
+    roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints, fairness=task["weights"].get("FAIRNESS_COST", 0) > 0).build()
+    solver = SolveProfile(**task["profile"]).apply(cp_model.CpSolver())
+    status = solver.Solve(roster_model.model)
+    result = {"data_dir": task["data_dir"], "status": solver.StatusName(status), "wall_time": solver.WallTime(), "kpis": None}
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        evaluator = RosterEvaluator(instance.nurses, instance.shifts, instance.constraints)
+        work = evaluator.GetMatrixFromSolver(roster_model.work, solver)
+        result["kpis"] = {kpi: KPIS[kpi][0](evaluator, work) for kpi in task["kpis"]}
+    return result
+
+def GetParetoFront(points, senses):
+    # indices of the points no other point dominates, senses per coordinate "min" or "max"
+    signs = np.array([1.0 if sense == "min" else -1.0 for sense in senses])
+    values = np.array(points, dtype=float).reshape(len(points), len(senses)) * signs
+    front = []
+    for i, value in enumerate(values):
+        dominated = np.any(np.all(values <= value, axis=1) & np.any(values < value, axis=1))
+        if not dominated:
+            front.append(i)
+    return front
+
+class WeightTuning(JsonReport):
+    # searches the objective weights of Constraints (WEIGHTS) on a set of historical instances: every weight set is
+    # solved on every instance with a short solve in a process pool and the rosters are scored on planner KPIs,
+    # averaged over the instances. Weight sets come from the grid ("grid"), num_trials samples of it ("random") or
+    # multi-objective TPE over the grid values ("bayes", needs optuna). The result is the Pareto front of the KPIs
+    DEFAULT_GRID = {"CONTRACT_OVER_COST": [12, 25, 50],
+                    "CONTRACT_UNDER_COST": [10, 20, 40],
+                    "TRANSITION_COST": [15, 30, 60],
+                    "SEQUENCE_COST": [1, 2, 4],
+                    "SOFT_REQUEST_COST": [5, 10, 20],
+                    "ZZP_COST": [1, 5, 25]}
+
+    def __init__(self, instances, profile, grid=None, kpis=("hours_deviation", "fragmentation", "request_satisfaction"),
+                 search="grid", num_trials=100, seed=0, max_processes=None):
+        # instances: (data_dir, year, month, num_days) of the historical rosters
+        self.instances = instances
+        self.profile = profile
+        self.grid = grid if grid else self.DEFAULT_GRID
+        for kpi in kpis:
+            assert kpi in KPIS, f"unknown kpi {kpi}"
+        self.kpis = list(kpis)
+        assert search in ("grid", "random", "bayes"), f"unknown search {search}"
+        self.search = search
+        self.num_trials = num_trials
+        self.seed = seed
+        self.max_processes = max_processes
+        self.result = {}
+
+    def GetNumTrials(self):
+        if self.search == "grid":
+            return int(np.prod([len(values) for values in self.grid.values()]))
+        return self.num_trials
+
+    def estimate(self, num_processes):
+        # wall time in hours when every solve uses its whole time limit
+        return self.GetNumTrials() * len(self.instances) * self.profile.max_time / num_processes / 3600
+
+    def run(self):
+        start_time = time.perf_counter()
+        trials = []
+        with ProcessPoolExecutor(max_workers=self.max_processes) as executor:
+            if self.search == "bayes":
+                trials = self._RunBayes(executor)
+            else:
+                weight_sets = self._GetWeightSets()
+                for weights, results in zip(weight_sets, self._SolveAll(executor, weight_sets)):
+                    trials.append(self._GetTrial(weights, results))
+
+        scored = [t for t, trial in enumerate(trials) if trial["kpis"] is not None]
+        front = GetParetoFront([[trials[t]["kpis"][kpi] for kpi in self.kpis] for t in scored], [KPIS[kpi][1] for kpi in self.kpis])
+        self.result = {"instances": [list(instance) for instance in self.instances], "profile": self.profile.to_dict(), "grid": self.grid,
+                       "kpis": {kpi: KPIS[kpi][1] for kpi in self.kpis}, "search": self.search, "seed": self.seed,
+                       "time": time.perf_counter() - start_time, "pareto": [scored[i] for i in front], "trials": trials}
+        return self.result
+
+    def print_summary(self):
+        print()
+        trials = self.result["trials"]
+        print(f"Weight tuning ({self.search}): {len(trials)} weight sets on {len(self.instances)} instances in {self.result['time'] / 3600:.2f} h, "
+              f"{len(self.result['pareto'])} Pareto efficient")
+        names = list(self.grid)
+        print("  " + "".join("%-21s" % name for name in names) + "".join("%-22s" % kpi for kpi in self.kpis))
+        for t in sorted(self.result["pareto"], key=lambda t: [trials[t]["kpis"][kpi] for kpi in self.kpis]):
+            print("  " + "".join("%-21s" % trials[t]["weights"][name] for name in names) + "".join("%-22.4f" % trials[t]["kpis"][kpi] for kpi in self.kpis))
+        return
+
+    def _GetWeightSets(self):
+        names = list(self.grid)
+        weight_sets = [dict(zip(names, values)) for values in itertools.product(*self.grid.values())]
+        if self.search == "random":
+            weight_sets = random.Random(self.seed).sample(weight_sets, min(self.num_trials, len(weight_sets)))
+        return weight_sets
+
+    def _SolveAll(self, executor, weight_sets):
+        # results per weight set, one solve per weight set and instance
+        tasks = [{"data_dir": data_dir, "year": year, "month": month, "num_days": num_days, "weights": weights,
+                  "profile": self.profile.to_dict(), "kpis": self.kpis}
+                 for weights in weight_sets for data_dir, year, month, num_days in self.instances]
+        results = list(executor.map(SolveWithWeights, tasks))
+        return [results[i:i + len(self.instances)] for i in range(0, len(results), len(self.instances))]
+
+    def _GetTrial(self, weights, results):
+        # KPIs averaged over the instances, None when an instance has no roster
+        kpis = None
+        if all(result["kpis"] is not None for result in results):
+            kpis = {kpi: float(np.mean([result["kpis"][kpi] for result in results])) for kpi in self.kpis}
+        print(f"{weights}: {kpis}")
+        return {"weights": weights, "kpis": kpis, "results": results}
+
+    def _RunBayes(self, executor):
+        try:
+            import optuna
+        except ImportError as e:
+            raise RuntimeError("bayes search requires optuna to be installed") from e
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        study = optuna.create_study(directions=["minimize" if KPIS[kpi][1] == "min" else "maximize" for kpi in self.kpis],
+                                    sampler=optuna.samplers.TPESampler(seed=self.seed))
+        distributions = {name: optuna.distributions.CategoricalDistribution(values) for name, values in self.grid.items()}
+        batch_size = self.max_processes if self.max_processes else os.cpu_count()
+        trials = []
+        while len(trials) < self.num_trials:
+            # a batch of weight sets in parallel, then told to the sampler before the next batch
+            asked = [study.ask(distributions) for _ in range(min(batch_size, self.num_trials - len(trials)))]
+            weight_sets = [dict(trial.params) for trial in asked]
+            for trial, weights, results in zip(asked, weight_sets, self._SolveAll(executor, weight_sets)):
+                trials.append(self._GetTrial(weights, results))
+                if trials[-1]["kpis"] is None:
+                    study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                else:
+                    study.tell(trial, [trials[-1]["kpis"][kpi] for kpi in self.kpis])
+        return trials
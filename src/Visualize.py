@@ -1,4 +1,6 @@
 import math
+import os
+import shutil
 from calendar import Calendar, day_abbr as day_abbrs, month_name as month_names
 
 from bokeh.document import Document
@@ -7,40 +9,82 @@ from bokeh.layouts import gridplot
 from bokeh.models import (CategoricalAxis, ContinuousAxis, CategoricalScale, ColumnDataSource,
                           FactorRange, HoverTool, Plot, Rect, Text,  Range1d, Legend)
 from bokeh.plotting import Figure
-from bokeh.resources import INLINE
-from bokeh.sampledata.us_holidays import us_holidays
+from bokeh.resources import CDN, INLINE, Resources
 from bokeh.util.browser import view
+from bokeh.util.paths import bokehjsdir
 import colorcet as cc
+import numpy as np
+
+from Roster import Roster
 
 class RosterVisualizer:
     def __init__(self):
         self.color_workday = "linen"
         self.color_weekend = "lightsteelblue"
         self.nurse_colors = cc.glasbey_bw_minc_20_minl_30
-
-    def visualize(self, nurses, shifts, work, solver):
-        plots = []
-        months = self._GetAllMonths(shifts)
-        for year,month in months:
-            plots.append(self._VisualizeMonthReal(year, month, nurses, shifts, work, solver))
-        grid = gridplot(toolbar_location="below", children=[plots])
-
+        # vertical offset of every shift slot within a calendar cell, from dk0 at the top to n1 at the bottom
+        offset = 0.125
+        self.shift_y_offsets = {sa: (i-3)*offset - 0.5*offset for i, sa in enumerate(["dk0", "dm0", "dl0", "dl1", "a0", "a1", "n0", "n1"])}
+        self.shift_data_columns = ["days", "weeks", "colors", "nurse", "name_value", "name_x", "name_y", "shift_type_value", "shift_type_x", "shift_type_y"]
+
+    def visualize(self, nurses, shifts, work, solver, filename="HoningsRooster.html", **kwargs):
+        return self.visualize_roster(Roster().InitFromSolver(nurses, shifts, work, solver), filename, **kwargs)
+
+    def visualize_roster(self, roster, filename="HoningsRooster.html", resources="inline", split_months=False, light=False, open_browser=True):
+        # resources: inline (self contained), cdn (BokehJS from cdn.bokeh.org) or shared (BokehJS copied once next to the html)
+        # split_months writes one file per month, light draws one glyph set per month instead of one per nurse
+        html_resources = self._GetResources(resources, os.path.dirname(os.path.abspath(filename)))
+        month_shift_indices = self._GetMonthShiftIndices(roster.shifts)
+        month_plots = []
+        for (year,month), shift_indices in month_shift_indices.items():
+            month_plots.append(((year, month), self._VisualizeMonthReal(year, month, roster, shift_indices, light)))
+
+        filenames = []
+        if split_months:
+            root, extension = os.path.splitext(filename)
+            for (year, month), plot in month_plots:
+                filenames.append(f"{root}_{year}-{month:02d}{extension}")
+                self._WriteHtml(plot, filenames[-1], html_resources)
+        else:
+            grid = gridplot(toolbar_location="below", children=[[plot for _, plot in month_plots]])
+            filenames.append(filename)
+            self._WriteHtml(grid, filename, html_resources)
+
+        if open_browser:
+            view(filenames[0])
+        return filenames
+
+    def _WriteHtml(self, root, filename, html_resources):
         doc = Document()
-        doc.add_root(grid)
+        doc.add_root(root)
         doc.validate()
-        filename = "HoningsRooster.html"
         with open(filename, "w") as f:
-            f.write(file_html(doc, INLINE, "HoningsRooster"))
+            f.write(file_html(doc, html_resources, "HoningsRooster"))
         print("Wrote %s" % filename)
-        view(filename)
-
         return
 
-    def _VisualizeMonthReal(self, year:int, month:int, nurses, shifts, work, solver) -> Plot:
+    def _GetResources(self, resources, output_dir):
+        if resources == "inline":
+            return INLINE
+        elif resources == "cdn":
+            return CDN
+        elif resources == "shared":
+            # copy BokehJS once to <output_dir>/static/js and let every html file link to it
+            shared = Resources(mode="server", root_url="./", components=["bokeh"]) # the calendar only needs the core bundle
+            js_dir = os.path.join(output_dir, "static", "js")
+            os.makedirs(js_dir, exist_ok=True)
+            for js_file in shared.js_files:
+                js_name = os.path.basename(js_file)
+                if not os.path.isfile(os.path.join(js_dir, js_name)):
+                    shutil.copyfile(os.path.join(bokehjsdir(), "js", js_name), os.path.join(js_dir, js_name))
+            return shared
+        assert False, f"unknown html resources {resources}"
+
+    def _VisualizeMonthReal(self, year:int, month:int, roster, month_shift_indices, light=False) -> Plot:
         firstweekday = "Mon"
         firstweekday = list(day_abbrs).index(firstweekday)
         calendar = Calendar(firstweekday=firstweekday)
-        self.month_days = [ None if not day else str(day) for day in calendar.itermonthdays(year, month)]
+        self._InitMonthCalendar(calendar, year, month)
         month_weeks = len(self.month_days)//7
         def weekday(date):
             return (date.weekday() - firstweekday) % 7
@@ -53,11 +97,10 @@ class RosterVisualizer:
         week_days = pick_weekdays([self.color_workday]*5 + [self.color_weekend]*2)
 
         source = ColumnDataSource(data=dict(
-            days            = day_numbers * month_weeks, #list(day_names)*month_weeks,
-            weeks           = sum([ [week]*7 for week in range(month_weeks) ], []),
-            #weeks           = sum([ [week]*7 for week in range(month_weeks) ], []),
+            days            = np.tile(day_numbers, month_weeks), #list(day_names)*month_weeks,
+            weeks           = np.repeat(np.arange(month_weeks), 7),
             month_days      = self.month_days,
-            day_backgrounds = sum([week_days]*month_weeks, []),
+            day_backgrounds = week_days * month_weeks,
         ))
 
         """
@@ -75,8 +118,8 @@ class RosterVisualizer:
         #x_scale, y_scale = CategoricalScale(), CategoricalScale()
 
         #plot = Plot(x_range=xdr, y_range=ydr, x_scale=x_scale, y_scale=y_scale, width=600, height=600, outline_line_color=None)
-        ymin = min(source.data["weeks"])
-        ymax = max(source.data["weeks"])
+        ymin = 0
+        ymax = month_weeks - 1
         plot = Figure(width=800, height=800, y_range=Range1d(start=ymax+1, end=ymin-1), outline_line_color=None)
         plot.title.text = month_names[month]
         plot.title.text_font_size = "16px"
@@ -86,11 +129,19 @@ class RosterVisualizer:
         plot.min_border_bottom = 5
 
         nurse_glyphs = []
-        nurse_sources = self._GetNurseShiftSourcesForVisualization(nurses, shifts, work, solver, month)
-        for nurse_name in nurse_sources.keys():
-            nurse_glyphs.append(plot.rect(x="days", y="weeks", width=1.0, height=0.125, fill_color="colors", line_color="white", fill_alpha=0.7, line_alpha = 0.7, source=nurse_sources[nurse_name], legend_label=nurse_name))
-            plot.text(x="name_x", y="name_y", text="name_value", text_font_size = "8px", source=nurse_sources[nurse_name], legend_label=nurse_name)
-            plot.text(x="shift_type_x", y="shift_type_y", text="shift_type_value", text_font_size = "8px", source=nurse_sources[nurse_name], legend_label=nurse_name)
+        nurse_data = self._GetNurseShiftDataForVisualization(roster, month_shift_indices)
+        if light:
+            # all nurses in one source, the legend is grouped by nurse name
+            shift_source = ColumnDataSource(data={column: np.concatenate([data[column] for data in nurse_data.values()]) for column in self.shift_data_columns})
+            nurse_glyphs.append(plot.rect(x="days", y="weeks", width=1.0, height=0.125, fill_color="colors", line_color="white", fill_alpha=0.7, line_alpha = 0.7, source=shift_source, legend_group="nurse"))
+            plot.text(x="name_x", y="name_y", text="name_value", text_font_size = "8px", source=shift_source)
+            plot.text(x="shift_type_x", y="shift_type_y", text="shift_type_value", text_font_size = "8px", source=shift_source)
+        else:
+            for nurse_name in nurse_data.keys():
+                nurse_source = ColumnDataSource(data=nurse_data[nurse_name])
+                nurse_glyphs.append(plot.rect(x="days", y="weeks", width=1.0, height=0.125, fill_color="colors", line_color="white", fill_alpha=0.7, line_alpha = 0.7, source=nurse_source, legend_label=nurse_name))
+                plot.text(x="name_x", y="name_y", text="name_value", text_font_size = "8px", source=nurse_source, legend_label=nurse_name)
+                plot.text(x="shift_type_x", y="shift_type_y", text="shift_type_value", text_font_size = "8px", source=nurse_source, legend_label=nurse_name)
 
         rect = Rect(x="days", y="weeks", width=1.0, height=1.0, fill_color="day_backgrounds", line_color="black", fill_alpha=0.0)
         plot.rect()
@@ -149,81 +200,59 @@ class RosterVisualizer:
         return plot
 
     def _GetYOffsetFromShift(self, sa):
-        offset = 0.125
-        if sa == "dk0":
-            return -3*offset-0.5*offset
-        elif sa == "dm0":
-            return -2*offset-0.5*offset
-        elif sa == "dl0":
-            return -1*offset-0.5*offset
-        elif sa == "dl1":
-            return -0.5*offset
-        elif sa == "a0":
-            return  1*offset-0.5*offset
-        elif sa == "a1":
-            return  2*offset-0.5*offset
-        elif sa == "n0":
-            return  3*offset-0.5*offset
-        elif sa == "n1":
-            return  4*offset-0.5*offset
-        return None
+        return self.shift_y_offsets.get(sa)
 
     def _GetMonthWeekFromMonthDay(self, month_day):
-        month_weeks = len(self.month_days)//7
-        weeks = sum([ [week]*7 for week in range(month_weeks) ], [])
-        index = self.month_days.index(str(month_day))
-        week = weeks[index]
-        return week
-
-    def _GetNurseShiftSourcesForVisualization(self, nurses, shifts, work, solver, month):
-        sources = {}
-        for n, nurse in enumerate(nurses.nurses):
-            days  = []
-            weeks = []
-            colors = []
-            name_value = []
-            name_x = []
-            name_y = []
-            shift_type_value = []
-            shift_type_x = []
-            shift_type_y = []
-
-            for s, shift in enumerate(shifts.shifts):
-                if not shift.start_date.month == month:
-                    continue
-                
-                if solver.Value(work[n,s]):
-                    days.append(shift.start_date.weekday())
-                    weeks.append(self._GetMonthWeekFromMonthDay(shift.start_date.day) + self._GetYOffsetFromShift(shift.abbreviation))
-                    colors.append((self.nurse_colors[n][0]*255, self.nurse_colors[n][1]*255, self.nurse_colors[n][2]*255))
-                    name_value.append(nurse.name[0:3].capitalize())
-                    name_x.append(days[-1]+0.25)
-                    name_y.append(weeks[-1]+0.0625)
-                    shift_type_value.append(shift.abbreviation)
-                    shift_type_x.append(days[-1]-0.4)
-                    shift_type_y.append(weeks[-1]+0.0625)
-
-            sources[nurse.name] = ColumnDataSource(data=dict(
+        return self.month_day_positions[month_day][0]
+
+    def _InitMonthCalendar(self, calendar, year, month):
+        # month_days holds the calendar cells (None outside the month), month_day_positions maps day -> (week, weekday)
+        self.month_days = []
+        self.month_day_positions = {}
+        for i, day in enumerate(calendar.itermonthdays(year, month)):
+            self.month_days.append(str(day) if day else None)
+            if day:
+                self.month_day_positions[day] = (i // 7, i % 7)
+        return
+
+    def _GetNurseShiftDataForVisualization(self, roster, month_shift_indices):
+        nurse_data = {}
+        month_shift_indices = np.asarray(month_shift_indices)
+        month_shifts = [roster.shifts[s] for s in month_shift_indices]
+        shift_days = np.array([shift.start_date.weekday() for shift in month_shifts], dtype=float)
+        shift_weeks = np.array([self._GetMonthWeekFromMonthDay(shift.start_date.day) + self._GetYOffsetFromShift(shift.abbreviation) for shift in month_shifts], dtype=float)
+        shift_types = np.array([shift.abbreviation for shift in month_shifts], dtype=object)
+
+        for n, nurse_name in enumerate(roster.nurse_names):
+            assigned = np.isin(month_shift_indices, roster.nurse_shifts[n])
+            days = shift_days[assigned]
+            weeks = shift_weeks[assigned]
+            num_assigned = len(days)
+            color = "#%02x%02x%02x" % tuple(int(c*255) for c in self.nurse_colors[n % len(self.nurse_colors)])
+
+            nurse_data[nurse_name] = dict(
                 days  = days,
                 weeks = weeks,
-                colors = colors,
-                name_value = name_value,
-                name_x = name_x,
-                name_y = name_y,
-                shift_type_value = shift_type_value,
-                shift_type_x = shift_type_x,
-                shift_type_y = shift_type_y
-            ))
-        return sources
+                colors = np.full(num_assigned, color, dtype=object),
+                nurse = np.full(num_assigned, nurse_name, dtype=object),
+                name_value = np.full(num_assigned, nurse_name[0:3].capitalize(), dtype=object),
+                name_x = days + 0.25,
+                name_y = weeks + 0.0625,
+                shift_type_value = shift_types[assigned],
+                shift_type_x = days - 0.4,
+                shift_type_y = weeks + 0.0625
+            )
+        return nurse_data
 
     def _GetAllMonths(self, shifts):
-        months = []
-        for s in shifts.shifts:
-            year = s.start_date.year
-            month = s.start_date.month
-            if (year, month) not in months:
-                months.append((year, month))
-        return months
+        return list(self._GetMonthShiftIndices(shifts.shifts).keys())
+
+    def _GetMonthShiftIndices(self, shift_list):
+        # (year, month) -> shift indices, in order of appearance
+        month_shift_indices = {}
+        for s, shift in enumerate(shift_list):
+            month_shift_indices.setdefault((shift.start_date.year, shift.start_date.month), []).append(s)
+        return month_shift_indices
     
     def _GetAllMonthShifts(self, month, shifts):
         month_shifts = []
@@ -232,5 +261,3 @@ class RosterVisualizer:
                 month_shifts.append(s)
         return month_shifts
 
-
-
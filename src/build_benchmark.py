@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Benchmarks building the model family by family against building the families in a process pool."""
+
+import os
+import tempfile
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('data_dir', '', 'Instance directory, a synthetic instance is generated when empty.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 91, 'Horizon in days, the whole month when 0.')
+flags.DEFINE_integer('num_nurses', 80, 'Synthetic instance: number of nurses.')
+flags.DEFINE_float('request_density', 0.5, 'Synthetic instance: expected number of requests per nurse.')
+flags.DEFINE_integer('seed', 0, 'Synthetic instance: random seed.')
+flags.DEFINE_list('processes', ['1', '2', '4', '8'], 'Process counts to build with.')
+flags.DEFINE_integer('repeats', 3, 'Builds per setting, the fastest counts.')
+from Benchmark import ParallelBuildBenchmark
+from Instance import InstanceGenerator
+
+def benchmark(_=None):
+    data_dir = FLAGS.data_dir
+    if not data_dir:
+        data_dir = os.path.join(tempfile.mkdtemp(prefix="hrh_"), "data")
+        InstanceGenerator(FLAGS.num_nurses, request_density=FLAGS.request_density, seed=FLAGS.seed).write(data_dir)
+    build_benchmark = ParallelBuildBenchmark(data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None, [int(p) for p in FLAGS.processes], FLAGS.repeats)
+    build_benchmark.run()
+    build_benchmark.print_summary()
+    return
+
+if __name__ == '__main__':
+    app.run(benchmark)
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""Compares the convergence of solver runs recorded with --telemetry."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('output_html', 'telemetry.html', 'Output file for the overlaid objective/bound curves.')
+from Telemetry import TelemetryComparison
+
+def compare(argv):
+    # the remaining arguments are telemetry .json files
+    comparison = TelemetryComparison(argv[1:])
+    comparison.print_summary()
+    comparison.visualize(FLAGS.output_html)
+    return
+
+if __name__ == '__main__':
+    app.run(compare)
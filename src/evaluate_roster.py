@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Scores an exported (or hand-edited) long format roster against the constraints without solving, and ranks the shift swaps of a nurse."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('roster', 'HoningsRooster.csv', 'Long format roster (csv, jsonl or parquet) as written by main.py.')
+flags.DEFINE_string('data_dir', '../data', 'Directory with nurses.csv, shifts.csv and requests.csv.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 0, 'Roster horizon in days from the first of the month, the whole month when 0.')
+flags.DEFINE_string('swaps_for', None, 'Nurse name, ranks the feasible swaps and hand-overs of the shifts of this nurse by objective delta.')
+flags.DEFINE_integer('top', 10, 'Number of ranked swaps to print.')
+from Evaluate import RosterChanges, RosterEvaluator
+from Instance import Instance
+from Roster import Roster
+
+def evaluate(_=None):
+    instance = Instance(FLAGS.data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None)
+    evaluator = RosterEvaluator(instance.nurses, instance.shifts, instance.constraints)
+    work = evaluator.GetMatrix(Roster(FLAGS.roster))
+    evaluator.print_summary(evaluator.evaluate(work))
+
+    if FLAGS.swaps_for:
+        names = [nurse.name for nurse in instance.nurses.nurses]
+        assert FLAGS.swaps_for in names, f"unknown nurse {FLAGS.swaps_for}"
+        roster_changes = RosterChanges(evaluator, work)
+        changes = roster_changes.GetSwapCandidates(names.index(FLAGS.swaps_for))
+        ranked, result = roster_changes.rank(changes, FLAGS.top)
+        print()
+        print(f"{len(changes)} swaps for {FLAGS.swaps_for}, best of the feasible ones:")
+        for c in ranked:
+            print("  %+6d  %s" % (result["delta"][c], roster_changes.GetDescription(changes[c])))
+    return
+
+if __name__ == '__main__':
+    app.run(evaluate)
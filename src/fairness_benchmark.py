@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""Reports the trade-off of the night, weekend and evening fairness objective against the other objective terms."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('data_dir', '../data', 'Directory with nurses.csv, shifts.csv and requests.csv.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 0, 'Roster horizon in days from the first of the month, the whole month when 0.')
+flags.DEFINE_list('costs', ['0', '1', '5', '25'], 'Fairness costs per unit of spread to solve with, 0 solves without the fairness objective.')
+flags.DEFINE_float('max_time', 120.0, 'Time limit per solve in seconds.')
+flags.DEFINE_integer('num_workers', 8, 'Solver workers.')
+flags.DEFINE_integer('random_seed', 0, 'Solver random seed.')
+flags.DEFINE_string('output', 'fairness_benchmark.json', 'Output file for the results.')
+from Benchmark import FairnessBenchmark
+from Profile import SolveProfile
+
+def benchmark(_=None):
+    profile = SolveProfile(FLAGS.max_time, FLAGS.num_workers, FLAGS.random_seed)
+    fairness_benchmark = FairnessBenchmark(FLAGS.data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None, profile, [int(cost) for cost in FLAGS.costs])
+    fairness_benchmark.run()
+    fairness_benchmark.print_summary()
+    fairness_benchmark.save(FLAGS.output)
+    return
+
+if __name__ == '__main__':
+    app.run(benchmark)
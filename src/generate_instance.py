@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""Writes a synthetic rostering instance (nurses, shifts and requests)."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('data_dir', '../data/synthetic', 'Directory to write nurses.csv, shifts.csv and requests.csv to.')
+flags.DEFINE_integer('num_nurses', 20, 'Number of nurses.')
+flags.DEFINE_float('zzp_share', 0.1, 'Share of ZZP nurses.')
+flags.DEFINE_float('resuscitate_share', 0.6, 'Share of nurses that can resuscitate.')
+flags.DEFINE_float('request_density', 0.2, 'Expected number of requests per nurse.')
+flags.DEFINE_integer('seed', 0, 'Random seed.')
+flags.DEFINE_string('name_prefix', 'nurse', 'Prefix of the nurse names, different per ward for multi-ward instances.')
+from Instance import InstanceGenerator
+
+def generate(_=None):
+    generator = InstanceGenerator(FLAGS.num_nurses, FLAGS.zzp_share, FLAGS.resuscitate_share, FLAGS.request_density, FLAGS.seed, FLAGS.name_prefix)
+    print(f"Wrote {generator.write(FLAGS.data_dir)}")
+    return
+
+if __name__ == '__main__':
+    app.run(generate)
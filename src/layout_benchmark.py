@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""Compares building the model on the dense work variable layout with the tuple keyed dict it replaces."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_list('nurses', ['20', '60', '120'], 'Nurse counts of the synthetic instances.')
+flags.DEFINE_list('days', ['28', '91'], 'Horizons in days of the synthetic instances.')
+flags.DEFINE_integer('repeats', 3, 'Builds per layout and instance, the best one counts.')
+flags.DEFINE_string('output', 'layout_benchmark.json', 'Output file for the results.')
+from Benchmark import LayoutBenchmark
+
+def benchmark(_=None):
+    layout_benchmark = LayoutBenchmark([int(n) for n in FLAGS.nurses], [int(d) for d in FLAGS.days], repeats=FLAGS.repeats)
+    layout_benchmark.run()
+    layout_benchmark.print_summary()
+    layout_benchmark.save(FLAGS.output)
+    return
+
+if __name__ == '__main__':
+    app.run(benchmark)
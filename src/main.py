@@ -16,18 +16,48 @@
 from absl import app
 from absl import flags
 
-from google.protobuf import text_format
-from ortools.sat.python import cp_model
-
 FLAGS = flags.FLAGS
 flags.DEFINE_string('output_proto', '',
                     'Output file to write the cp_model proto to.')
 flags.DEFINE_string('params', 'max_time_in_seconds:10.0',
                     'Sat solver parameters.')
+flags.DEFINE_string('data_dir', '../data', 'Directory with nurses.csv, shifts.csv and requests.csv.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 0, 'Roster horizon in days from the first of the month, the whole month when 0.')
+flags.DEFINE_float('max_time', 3600*5, 'Solver time limit in seconds.')
+flags.DEFINE_integer('num_workers', 0, 'Solver workers, the solver default when 0.')
+flags.DEFINE_integer('random_seed', -1, 'Solver random seed, the solver default when negative.')
+flags.DEFINE_bool('interleave_search', False, 'Interleave the solver workers (deterministic parallel search).')
+flags.DEFINE_float('max_deterministic_time', 0, 'Deterministic solver time limit, none when 0.')
+flags.DEFINE_bool('reproducible', False, 'Pin seed (17 unless --random_seed), workers (1 unless --num_workers) and a deterministic time limit (3600 unless --max_deterministic_time). More than one worker is only reproducible with --interleave_search, which is not turned on here: it aborts in postsolve on this model with OR-Tools 9.5.')
+flags.DEFINE_bool('implied_constraints', False, 'Add redundant implied constraints that can tighten the solver bound.')
+flags.DEFINE_integer('fairness_cost', 0, 'Minimize the spread of the contract normalized night, weekend and evening counts with this cost per unit, not when 0.')
+flags.DEFINE_list('staged_types', [], 'Solve these shift types (e.g. n or n,a) first and then the whole roster, monolithic when empty.')
+flags.DEFINE_bool('staged_fix', True, 'Fix the first stage assignments in the whole roster, hint them otherwise.')
+flags.DEFINE_bool('check_requests', True, 'Stop before solving when hard requests contradict each other or the hard constraints.')
+flags.DEFINE_bool('check_only', False, 'Only load the inputs and check the requests, without building or solving the model.')
+flags.DEFINE_integer('portfolio', 0, 'Solve with a portfolio of this many diversified solves in separate processes, one solve when 0.')
+flags.DEFINE_float('portfolio_round_time', 60.0, 'Seconds per portfolio round, every round starts from the best roster so far.')
+flags.DEFINE_float('portfolio_gap', 0.0, 'Stop the portfolio at this relative gap, only at --max_time when 0.')
+flags.DEFINE_integer('build_processes', 0, 'Build the constraint families in this many processes, in this process when 0.')
+flags.DEFINE_list('roster_export', ['HoningsRooster.csv'],
+                  'Files to export the solved roster to (.csv, .jsonl or .parquet).')
+flags.DEFINE_enum('roster_export_layout', 'long', ['long', 'wide'],
+                  'Roster export layout: one row per assigned shift (long) or one row per nurse (wide).')
+flags.DEFINE_enum('html_resources', 'inline', ['inline', 'cdn', 'shared'],
+                  'Where the roster html loads BokehJS from.')
+flags.DEFINE_bool('open_browser', True, 'Open the roster html in a browser.')
+flags.DEFINE_bool('dashboard', False, 'Follow the solve on a local live dashboard.')
+flags.DEFINE_integer('dashboard_port', 8050, 'Port of the live dashboard.')
+flags.DEFINE_string('telemetry', '', 'Write solver convergence telemetry to <telemetry>.csv and <telemetry>.json.')
+# the solver (OR-Tools) and the visualization (Bokeh, colorcet) are imported where run() gets to them, loading and
+# checking the inputs does not need them
 from Nurse import Nurses
 from Shift import Shifts
 from Constraint import Constraints
-from Visualize import RosterVisualizer
+from Instance import Instance
+from Profile import HashFiles, SolveProfile
 from datetime import datetime
 import math
 
@@ -188,7 +218,17 @@ def printSolverStatistics(solver, status):
     print('  - wall time       : %f s' % solver.WallTime())
     return
 
+def printPenalties(penalties):
+    print()
+    print('Objective')
+    for family, penalty in penalties.items():
+        print('  - %-16s: %i' % (family, penalty))
+    return
+
 def solve_example_shift_scheduling(params, output_proto):
+    from google.protobuf import text_format
+    from ortools.sat.python import cp_model
+
     nurses = Nurses("../data/nurses.csv")
     shifts = Shifts("../data/shifts.csv", 2022, 11)
 
@@ -425,76 +465,104 @@ def run(_=None):
     params = FLAGS.params
     output_proto = FLAGS.output_proto
 
-    nurses = Nurses("../data/nurses.csv")
-    shifts = Shifts("../data/shifts.csv", 2022, 10)
-    #shifts = Shifts("../data/shifts.csv", start_date=datetime(year=2022, month=10, day=1), end_date=datetime(year=2022, month=12, day=1))
-    constraints = Constraints(general_request_fn="../data/requests.csv", specific_request_fn=None)
-    model = cp_model.CpModel()
-    roster_visualizer = RosterVisualizer() 
-
-    work = {}
-    for n,_ in enumerate(nurses.nurses):
-        for s,_ in enumerate(shifts.shifts):
-            work[n, s] = model.NewBoolVar(f"{n}_{s}")
+    instance = Instance(FLAGS.data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None)
+    nurses = instance.nurses
+    shifts = instance.shifts
+    constraints = instance.constraints
 
     print(f"nurses #:\t{len(nurses.nurses)}")
     print(f"shifts #:\t{len(shifts.shifts)}")
     print(f"constraints #:\t{len(constraints.requests)}")
-
-    # add constraints
-    obj_bool_vars, obj_bool_coeffs = [],[]
-    obj_contract_hours_weekly_vars, obj_contract_hours_weekly_coeffs = [],[]
-    obj_seq_vars, obj_seq_coeffs = [],[]
-    obj_req_vars, obj_req_coeffs = [],[]
-    obj_favor_weekend_vars, obj_favor_weekend_coeffs = [],[]
-    obj_zzp_vars, obj_zzp_coeffs = [],[]
-
-    constraints.add_fill_every_shift_constraint(model, nurses, shifts, work)
-    constraints.add_one_shift_per_day_constraint(model, nurses, shifts, work)
-    constraints.add_rest_after_night_shift_constraint(model, nurses, shifts, work)
-    constraints.add_skill_requirement_resuscitate(model, nurses, shifts, work)
-    obj_contract_hours_weekly_vars, obj_contract_hours_weekly_coeffs = constraints.add_weekly_contract_hours_constraint(model, nurses, shifts, work)
-    obj_bool_vars, obj_bool_coeffs = constraints.add_penalized_day_evening_transition_constraint(model, nurses, shifts, work)
-    obj_seq_vars, obj_seq_coeffs = constraints.add_sequence_constraint(model, nurses, shifts, work)
-    constraints.add_favor_whole_weekend(model, nurses, shifts, work)
-    constraints.add_limit_weekend_shifts(model, nurses, shifts, work)
-    constraints.add_max_5_shifts_per_week(model, nurses, shifts, work)
-    obj_zzp_vars, obj_zzp_coeffs = constraints.add_penalty_to_zzp_allocation(model, nurses, shifts, work)
-
-    # add requests
-    constraints.add_hard_requests_do_not_work_day(model, nurses, shifts, work)
-    constraints.add_hard_requests_do_not_work_shift(model, nurses, shifts, work)
-    constraints.add_hard_requests_rest_after_n_shifts(model, nurses, shifts, work)
-    constraints.add_hard_requests_work_specific_day_shift(model, nurses, shifts, work)
-    constraints.add_hard_requests_percentage_shift(model, nurses, shifts, work)
-    tmp_vars, tmp_coeffs = constraints.add_soft_requests_do_assign_shift(model, nurses, shifts, work)
-    obj_req_vars.extend(tmp_vars)
-    obj_req_coeffs.extend(tmp_coeffs)
-
-    model.Minimize(
-        sum(obj_contract_hours_weekly_vars[i]*obj_contract_hours_weekly_coeffs[i] for i in range(len(obj_contract_hours_weekly_vars))) + 
-        sum(obj_bool_vars[i] * obj_bool_coeffs[i] for i in range(len(obj_bool_vars))) +
-        sum(obj_seq_vars[i] * obj_seq_coeffs[i]  for i in range(len(obj_seq_vars))) +
-        sum(obj_req_vars[i] * obj_req_coeffs[i]  for i in range(len(obj_req_vars))) +
-        sum(obj_favor_weekend_vars[i] * obj_favor_weekend_coeffs[i]  for i in range(len(obj_favor_weekend_vars))) +
-        sum(obj_zzp_vars[i] * obj_zzp_coeffs[i]  for i in range(len(obj_zzp_vars)))
-    )
+    for conflict in instance.conflicts:
+        print(f"{'conflict' if conflict.blocking else 'warning'}:\t{conflict}")
+    if FLAGS.check_only or (any(conflict.blocking for conflict in instance.conflicts) and FLAGS.check_requests):
+        return
+
+    from ortools.sat.python import cp_model
+    from Dashboard import RosterDashboard
+    from Model import RosterModel
+    from Portfolio import SolverPortfolio
+    from Solution import RosterSolutionCallback
+    from Staged import StagedSolve
+    from Telemetry import SolverTelemetry
+
+    # add constraints and requests
+    if FLAGS.fairness_cost:
+        constraints.set_weights({"FAIRNESS_COST": FLAGS.fairness_cost})
+    roster_model = RosterModel(nurses, shifts, constraints, implied_constraints=FLAGS.implied_constraints, fairness=FLAGS.fairness_cost > 0)
+    if FLAGS.build_processes:
+        roster_model.build_parallel(FLAGS.build_processes)
+    else:
+        roster_model.build()
+    model = roster_model.model
+    work = roster_model.work
 
     # solve
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 3600*5 #120 #3600.0 * 0.5
-    #solver.parameters.random_seed = 17 #TODO: remove once testing
-
-    solution_printer = cp_model.ObjectiveSolutionPrinter()
-    status = solver.Solve(model, solution_printer)
+    profile = SolveProfile(FLAGS.max_time, FLAGS.num_workers or None, FLAGS.random_seed if FLAGS.random_seed >= 0 else None, FLAGS.interleave_search, FLAGS.max_deterministic_time or None)
+    if FLAGS.reproducible:
+        profile = profile.Copy(random_seed=17 if profile.random_seed is None else profile.random_seed,
+                               num_workers=1 if profile.num_workers is None else profile.num_workers,
+                               max_deterministic_time=3600.0 if profile.max_deterministic_time is None else profile.max_deterministic_time)
+        if not profile.is_reproducible():
+            print(f"warning:\t{profile.num_workers} workers without --interleave_search, the solve is not reproducible")
+    print(f"profile:\t{profile}")
+    if FLAGS.portfolio:
+        assert not FLAGS.staged_types, "--portfolio solves the whole roster, it cannot be combined with --staged_types"
+        portfolio = SolverPortfolio(nurses, shifts, constraints, profile, FLAGS.portfolio, FLAGS.portfolio_round_time, FLAGS.portfolio_gap,
+                                    fairness=FLAGS.fairness_cost > 0).run()
+        portfolio.print_summary()
+        if not portfolio.best:
+            return
+        # the solve below only recovers the best roster of the portfolio for the listeners, export and visualization
+        portfolio.apply(roster_model)
+        profile = profile.Copy(max_time=60.0)
+    solver = profile.apply(cp_model.CpSolver())
+
+    solution_listeners = []
+    dashboard = None
+    if FLAGS.dashboard:
+        dashboard = RosterDashboard(roster_model, port=FLAGS.dashboard_port)
+        dashboard.start()
+        solution_listeners.append(dashboard)
+    telemetry = None
+    if FLAGS.telemetry:
+        telemetry = SolverTelemetry(FLAGS.telemetry, {"profile": profile.to_dict(), "reproducible": profile.is_reproducible(), "inputs": HashFiles(instance.GetFilenames()), "sat_parameters": str(solver.parameters)})
+        solution_listeners.append(telemetry)
+    if FLAGS.staged_types:
+        # the first stage, then the whole roster with it fixed (hinted when that is infeasible) on a copy of this model
+        staged = StagedSolve(nurses, shifts, constraints, FLAGS.staged_types, FLAGS.staged_fix)
+        roster_model, solver, status = staged.solve(profile, 0.25, solution_listeners, base_model=roster_model, verbose=True)
+        model = roster_model.model
+        work = roster_model.work
+    else:
+        solution_printer = RosterSolutionCallback(solution_listeners)
+        status = solver.Solve(model, solution_printer)
     printSolverStatistics(solver, status)
-
-    #for s,sval in enumerate(shifts.shifts):
-    #    for n,nval in enumerate(nurses.nurses):
-    #         print(f"{nval.name} {sval.abbreviation} {solver.Value(work[n,s])}")
+    if telemetry:
+        telemetry.finish(solver, status)
+        telemetry.save(FLAGS.telemetry)
+    if dashboard:
+        dashboard.finish()
+
+    if not (status == cp_model.OPTIMAL or status == cp_model.FEASIBLE):
+        if dashboard:
+            dashboard.stop()
+        return
+    printPenalties(roster_model.GetPenalties(solver))
+
+    # export
+    from Export import RosterExporter
+    roster_exporter = RosterExporter()
+    for fn in FLAGS.roster_export:
+        roster_exporter.export(nurses, shifts, work, solver, fn, layout=FLAGS.roster_export_layout)
 
     # visualize
-    roster_visualizer.visualize(nurses, shifts, work, solver)
+    from Visualize import RosterVisualizer
+    roster_visualizer = RosterVisualizer()
+    roster_visualizer.visualize(nurses, shifts, work, solver, resources=FLAGS.html_resources, open_browser=FLAGS.open_browser)
+    if dashboard:
+        # stopped only after the export and visualization, the final roster stays on the dashboard until Ctrl-C
+        dashboard.serve_until_interrupted()
 
     pass
 
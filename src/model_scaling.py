@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Reports how the size of every constraint family grows with nurses and days, and fails on regressions."""
+
+import json
+import os
+import sys
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_list('nurses', ['10', '20', '40'], 'Nurse counts of the grid.')
+flags.DEFINE_list('days', ['28', '56', '112'], 'Horizons in days of the grid.')
+flags.DEFINE_float('request_density', 0.2, 'Expected number of requests per synthetic nurse.')
+flags.DEFINE_float('max_exponent', 1.1, 'Fail when a family grows faster than size ~ x^max_exponent.')
+flags.DEFINE_string('baseline', 'model_scaling_baseline.json', 'Stored sizes to compare against.')
+flags.DEFINE_float('max_growth', 0.1, 'Fail when a family is this fraction bigger than the baseline.')
+flags.DEFINE_bool('update_baseline', False, 'Store this run as the new baseline.')
+from Scaling import ModelScalingReport
+
+def model_scaling(_=None):
+    report = ModelScalingReport([int(n) for n in FLAGS.nurses], [int(d) for d in FLAGS.days], request_density=FLAGS.request_density).run()
+    report.print_summary()
+
+    baseline = None
+    if FLAGS.baseline and os.path.isfile(FLAGS.baseline) and not FLAGS.update_baseline:
+        with open(FLAGS.baseline) as f:
+            baseline = json.load(f)["sizes"]
+    failures = report.check(FLAGS.max_exponent, baseline, FLAGS.max_growth)
+    if FLAGS.update_baseline:
+        report.save(FLAGS.baseline)
+
+    print()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+    return
+
+if __name__ == '__main__':
+    app.run(model_scaling)
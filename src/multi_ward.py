@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""Rosters several wards that share float nurses, one solver process per ward."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_list('ward_dirs', [], 'Ward directories with nurses.csv, shifts.csv and requests.csv, float nurses are listed in every ward they work in.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 0, 'Roster horizon in days from the first of the month, the whole month when 0.')
+flags.DEFINE_float('max_time', 60.0, 'Solver time limit per ward solve in seconds.')
+flags.DEFINE_integer('num_workers', 2, 'Solver workers per ward.')
+flags.DEFINE_integer('max_rounds', 5, 'Price exchange rounds before the remaining conflicts are repaired ward by ward.')
+flags.DEFINE_integer('price_step', 50, 'Penalty added per round to a float nurse on a double booked date.')
+flags.DEFINE_integer('max_processes', 0, 'Ward processes, one per ward when 0.')
+flags.DEFINE_string('output_dir', 'wards', 'Directory to write one roster csv per ward to.')
+from MultiWard import MultiWardRoster
+from Profile import SolveProfile
+
+def roster_wards(_=None):
+    assert FLAGS.ward_dirs, "--ward_dirs is required"
+    roster = MultiWardRoster(FLAGS.ward_dirs, FLAGS.year, FLAGS.month, FLAGS.num_days or None,
+                             SolveProfile(FLAGS.max_time, FLAGS.num_workers), FLAGS.max_rounds, FLAGS.price_step, FLAGS.max_processes or None)
+    roster.run()
+    roster.print_summary()
+    roster.write(FLAGS.output_dir)
+    return
+
+if __name__ == '__main__':
+    app.run(roster_wards)
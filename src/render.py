@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Renders a saved roster to HTML without solving."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('roster', 'HoningsRooster.csv',
+                    'Saved long format roster (.csv, .jsonl or .parquet) as written by main.py.')
+flags.DEFINE_string('output_html', 'HoningsRooster.html',
+                    'Output file to write the html roster to.')
+flags.DEFINE_enum('renderer', 'bokeh', ['bokeh', 'static'],
+                  'Interactive bokeh calendar or static html tables without javascript.')
+flags.DEFINE_enum('html_resources', 'inline', ['inline', 'cdn', 'shared'],
+                  'Where the bokeh html loads BokehJS from.')
+flags.DEFINE_bool('split_months', False, 'Write one html file per month.')
+flags.DEFINE_bool('light', False, 'Draw one glyph set per month instead of one per nurse.')
+flags.DEFINE_bool('open_browser', True, 'Open the rendered html in a browser.')
+from Roster import Roster
+
+def render(_=None):
+    roster = Roster(FLAGS.roster)
+    print(f"nurses #:\t{len(roster.nurse_names)}")
+    print(f"shifts #:\t{len(roster.shifts)}")
+    if FLAGS.renderer == 'static':
+        from StaticVisualize import StaticRosterRenderer
+        StaticRosterRenderer().render(roster, FLAGS.output_html, split_months=FLAGS.split_months)
+    else:
+        from Visualize import RosterVisualizer
+        RosterVisualizer().visualize_roster(roster, FLAGS.output_html, resources=FLAGS.html_resources, split_months=FLAGS.split_months, light=FLAGS.light, open_browser=FLAGS.open_browser)
+    return
+
+if __name__ == '__main__':
+    app.run(render)
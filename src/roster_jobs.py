@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Queues roster solves, runs them and returns cached results: roster_jobs.py submit|work|get|list|evict [key]."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('queue', 'roster_jobs.sqlite', 'SQLite file of the job queue and result cache.')
+flags.DEFINE_string('data_dir', '../data', 'submit: directory with nurses.csv, shifts.csv and requests.csv.')
+flags.DEFINE_integer('year', 2022, 'submit: year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'submit: first roster month.')
+flags.DEFINE_integer('num_days', 0, 'submit: roster horizon in days, the whole month when 0.')
+flags.DEFINE_float('max_time', 3600*5, 'submit: solver time limit in seconds.')
+flags.DEFINE_integer('num_workers', 0, 'submit: solver workers, the solver default when 0.')
+flags.DEFINE_integer('random_seed', -1, 'submit: solver random seed, the solver default when negative.')
+flags.DEFINE_bool('work', False, 'submit: also run the queue until it is empty.')
+flags.DEFINE_integer('max_processes', 2, 'work: solves that run at the same time.')
+flags.DEFINE_float('max_cache_mb', 256, 'Size limit of the stored results in MB.')
+flags.DEFINE_float('max_cache_days', 7, 'Age limit of the stored results in days.')
+flags.DEFINE_string('output', '', 'get: write the roster to this file (.csv, .jsonl or .parquet).')
+from Export import RosterWriter
+from JobQueue import RosterJobQueue
+from Profile import SolveProfile
+
+def roster_jobs(argv):
+    assert len(argv) >= 2 and argv[1] in ("submit", "work", "get", "list", "evict"), __doc__
+    queue = RosterJobQueue(FLAGS.queue, FLAGS.max_processes, int(FLAGS.max_cache_mb * 1024 * 1024), FLAGS.max_cache_days * 24 * 3600)
+    command = argv[1]
+    if command == "submit":
+        profile = SolveProfile(FLAGS.max_time, FLAGS.num_workers or None, FLAGS.random_seed if FLAGS.random_seed >= 0 else None)
+        key = queue.submit(FLAGS.data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None, profile)
+        print(f"{key} {queue.get(key)['status']}")
+        if FLAGS.work:
+            queue.work()
+            print(f"{key} {queue.get(key)['status']}")
+    elif command == "work":
+        for key in queue.work():
+            print(f"{key} {queue.get(key)['status']}")
+    elif command == "get":
+        assert len(argv) == 3, "get needs a job key"
+        job = queue.get(argv[2])
+        assert job is not None, f"no job {argv[2]}"
+        print(" ".join(f"{name}={job.get(name)}" for name in ("key", "status", "solver_status", "objective", "bound", "wall_time", "error")))
+        if FLAGS.output and job.get("rows"):
+            with RosterWriter(FLAGS.output, job["columns"]) as writer:
+                writer.write(job["rows"])
+            print(f"Wrote {FLAGS.output} ({writer.num_rows} rows)")
+    elif command == "list":
+        for key, status, job, size, submitted, started, finished in queue.list():
+            print(f"{key} {status:8s} {size:10d} B {job}")
+    elif command == "evict":
+        print(f"Evicted {queue.evict()} jobs")
+    return
+
+if __name__ == '__main__':
+    app.run(roster_jobs)
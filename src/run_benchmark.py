@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Benchmarks loading, building and solving a rostering instance."""
+
+import os
+import tempfile
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('data_dir', '', 'Instance directory, a synthetic instance is generated when empty.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 0, 'Horizon in days, the whole month when 0.')
+flags.DEFINE_integer('num_nurses', 20, 'Synthetic instance: number of nurses.')
+flags.DEFINE_float('zzp_share', 0.1, 'Synthetic instance: share of ZZP nurses.')
+flags.DEFINE_float('resuscitate_share', 0.6, 'Synthetic instance: share of nurses that can resuscitate.')
+flags.DEFINE_float('request_density', 0.2, 'Synthetic instance: expected number of requests per nurse.')
+flags.DEFINE_integer('seed', 0, 'Synthetic instance: random seed.')
+flags.DEFINE_float('max_time', 60.0, 'Solver time limit in seconds.')
+flags.DEFINE_float('target_gap', 0.05, 'Stop when the relative gap between objective and bound is this small.')
+flags.DEFINE_integer('num_workers', 8, 'Solver workers.')
+flags.DEFINE_bool('implied_constraints', False, 'Add the redundant implied constraints family to the model.')
+flags.DEFINE_string('history', 'benchmark_history.json', 'JSON file the results are appended to.')
+from Benchmark import RosterBenchmark
+from Instance import InstanceGenerator
+
+def benchmark(_=None):
+    data_dir = FLAGS.data_dir
+    if not data_dir:
+        data_dir = os.path.join(tempfile.mkdtemp(prefix="hrh_"), "data")
+        InstanceGenerator(FLAGS.num_nurses, FLAGS.zzp_share, FLAGS.resuscitate_share, FLAGS.request_density, FLAGS.seed).write(data_dir)
+    roster_benchmark = RosterBenchmark(data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None, FLAGS.max_time, FLAGS.target_gap, FLAGS.num_workers, FLAGS.implied_constraints)
+    roster_benchmark.run()
+    roster_benchmark.print_summary()
+    if FLAGS.history:
+        roster_benchmark.append_to_history(FLAGS.history)
+    return
+
+if __name__ == '__main__':
+    app.run(benchmark)
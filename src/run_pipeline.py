@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Runs the roster pipeline up to a stage (parse, build, solve, export or render), skipping the stages whose inputs did not change."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('work_dir', 'pipeline', 'Directory for the artifacts and manifests of the stages.')
+flags.DEFINE_string('data_dir', '../data', 'Directory with nurses.csv, shifts.csv and requests.csv.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 0, 'Roster horizon in days from the first of the month, the whole month when 0.')
+flags.DEFINE_bool('check_requests', True, 'Stop before building when hard requests contradict each other or the hard constraints.')
+flags.DEFINE_bool('implied_constraints', False, 'Add redundant implied constraints that can tighten the solver bound.')
+flags.DEFINE_integer('fairness_cost', 0, 'Minimize the spread of the contract normalized night, weekend and evening counts with this cost per unit, not when 0.')
+flags.DEFINE_float('max_time', 3600*5, 'Solver time limit in seconds.')
+flags.DEFINE_integer('num_workers', 0, 'Solver workers, the solver default when 0.')
+flags.DEFINE_integer('random_seed', -1, 'Solver random seed, the solver default when negative.')
+flags.DEFINE_list('roster_export', ['HoningsRooster.csv'], 'Files to export the solved roster to (.csv, .jsonl or .parquet), relative to --work_dir.')
+flags.DEFINE_enum('roster_export_layout', 'long', ['long', 'wide'], 'Roster export layout: one row per assigned shift (long) or one row per nurse (wide).')
+flags.DEFINE_string('output_html', 'HoningsRooster.html', 'Output file to write the html roster to, relative to --work_dir.')
+flags.DEFINE_enum('html_resources', 'inline', ['inline', 'cdn', 'shared'], 'Where the roster html loads BokehJS from.')
+flags.DEFINE_bool('open_browser', False, 'Open the roster html in a browser when the render stage runs.')
+flags.DEFINE_bool('force', False, 'Run every stage up to the target, also when it is up to date.')
+from Pipeline import RosterPipeline
+from Profile import SolveProfile
+
+def pipeline(argv):
+    assert len(argv) <= 2, "usage: run_pipeline.py [parse|build|solve|export|render] [flags]"
+    target = argv[1] if len(argv) > 1 else "render"
+    profile = SolveProfile(FLAGS.max_time, FLAGS.num_workers or None, FLAGS.random_seed if FLAGS.random_seed >= 0 else None)
+    roster_pipeline = RosterPipeline(FLAGS.work_dir, FLAGS.data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None, FLAGS.check_requests,
+                                     FLAGS.implied_constraints, FLAGS.fairness_cost, profile, FLAGS.roster_export, FLAGS.roster_export_layout,
+                                     FLAGS.output_html, FLAGS.html_resources, FLAGS.open_browser, FLAGS.force)
+    done = roster_pipeline.run(target)
+    roster_pipeline.print_summary()
+    return 0 if done else 1
+
+if __name__ == '__main__':
+    app.run(pipeline)
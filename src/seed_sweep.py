@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Solves one instance for several seeds with pinned parameters and reports the spread of time-to-quality."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('data_dir', '../data', 'Directory with nurses.csv, shifts.csv and requests.csv.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 0, 'Roster horizon in days from the first of the month, the whole month when 0.')
+flags.DEFINE_integer('num_seeds', 5, 'Number of seeds, 0 .. num_seeds-1.')
+flags.DEFINE_integer('num_workers', 1, 'Solver workers, more than one is only deterministic with --interleave_search.')
+flags.DEFINE_bool('interleave_search', False, 'Interleave the workers so parallel search is deterministic.')
+flags.DEFINE_float('max_time', 300.0, 'Wall time limit per seed in seconds.')
+flags.DEFINE_float('max_deterministic_time', 100.0, 'Deterministic time limit per seed, 0 for none.')
+flags.DEFINE_string('params', '', 'Extra sat parameters in text format.')
+flags.DEFINE_float('quality', 0.01, 'Time to quality is the time to get within this fraction of the target objective.')
+flags.DEFINE_float('target_objective', -1, 'Target objective, the best over all seeds when negative.')
+flags.DEFINE_string('output', 'seed_sweep.json', 'Output file for the parameters, input hashes and results.')
+from Profile import SolveProfile
+from Reproduce import SeedSweep
+
+def reproduce(_=None):
+    profile = SolveProfile(FLAGS.max_time, FLAGS.num_workers, 0, FLAGS.interleave_search, FLAGS.max_deterministic_time or None, FLAGS.params)
+    sweep = SeedSweep(FLAGS.data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None, profile, list(range(FLAGS.num_seeds)),
+                      FLAGS.quality, FLAGS.target_objective if FLAGS.target_objective >= 0 else None)
+    sweep.run()
+    sweep.print_summary()
+    sweep.save(FLAGS.output)
+    return
+
+if __name__ == '__main__':
+    app.run(reproduce)
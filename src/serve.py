@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Runs the local roster service that keeps instances and models warm between planner actions."""
+
+import asyncio
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('host', '127.0.0.1', 'Host to listen on.')
+flags.DEFINE_integer('port', 8060, 'Port to listen on.')
+flags.DEFINE_integer('max_solves', 2, 'Solves that run at the same time, further solves are queued.')
+flags.DEFINE_float('max_time', 10.0, 'Default solver time limit in seconds.')
+flags.DEFINE_integer('num_workers', 0, 'Default solver workers, the solver default when 0.')
+flags.DEFINE_list('preload', [], 'Data directories to load at startup (for --year and --month).')
+flags.DEFINE_integer('year', 2022, 'Year of the preloaded roster month.')
+flags.DEFINE_integer('month', 10, 'Preloaded roster month.')
+from Profile import SolveProfile
+from Service import RosterService
+
+async def serve_forever():
+    service = RosterService(FLAGS.host, FLAGS.port, FLAGS.max_solves, SolveProfile(FLAGS.max_time, FLAGS.num_workers or None))
+    for data_dir in FLAGS.preload:
+        warm_instance = await service.load(data_dir, FLAGS.year, FLAGS.month)
+        print(f"Loaded {data_dir} as instance {warm_instance.instance_id} in {warm_instance.instance.load_time + warm_instance.build_time:.2f} s")
+    await service.serve()
+
+def serve(_=None):
+    asyncio.run(serve_forever())
+    return
+
+if __name__ == '__main__':
+    app.run(serve)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Compares exported rosters on their robustness to sampled absences (sick days and outbreaks)."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_list('rosters', ['HoningsRooster.csv'], 'Long format rosters (csv, jsonl or parquet) as written by main.py.')
+flags.DEFINE_string('data_dir', '../data', 'Directory with nurses.csv, shifts.csv and requests.csv.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 0, 'Roster horizon in days from the first of the month, the whole month when 0.')
+flags.DEFINE_float('sick_rate', 0.03, 'Fraction of days a nurse is sick.')
+flags.DEFINE_float('sick_days', 3.0, 'Mean length of a sick period in days.')
+flags.DEFINE_list('sick_rates', [], 'Sick rates per nurse as name:rate, overriding --sick_rate.')
+flags.DEFINE_float('outbreak_rate', 0.05, 'Outbreaks per week.')
+flags.DEFINE_float('outbreak_share', 0.3, 'Probability a nurse falls ill in an outbreak.')
+flags.DEFINE_integer('outbreak_days', 5, 'Days a nurse is absent in an outbreak.')
+flags.DEFINE_integer('num_scenarios', 1000, 'Absence scenarios, the same for every roster.')
+flags.DEFINE_integer('seed', 0, 'Seed of the scenarios.')
+flags.DEFINE_bool('repair', True, 'Greedily repair every scenario and score what stays uncovered.')
+flags.DEFINE_integer('processes', 0, 'Worker processes, one per CPU when 0.')
+flags.DEFINE_string('output', 'robustness.json', 'Output file for the results.')
+from Evaluate import RosterEvaluator
+from Instance import Instance
+from Robustness import AbsenceSampler, RobustnessSimulation
+from Roster import Roster
+
+def simulate(_=None):
+    instance = Instance(FLAGS.data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None)
+    evaluator = RosterEvaluator(instance.nurses, instance.shifts, instance.constraints)
+    works = [evaluator.GetMatrix(Roster(fn)) for fn in FLAGS.rosters]
+    sick_rates = {name: float(rate) for name, rate in (item.split(":") for item in FLAGS.sick_rates)}
+    sampler = AbsenceSampler(instance.nurses, instance.shifts, FLAGS.sick_rate, FLAGS.sick_days, FLAGS.outbreak_rate,
+                             FLAGS.outbreak_share, FLAGS.outbreak_days, sick_rates)
+    simulation = RobustnessSimulation(instance.nurses, instance.shifts, instance.constraints, works, sampler, FLAGS.num_scenarios,
+                                      FLAGS.seed, FLAGS.repair, FLAGS.processes or None)
+    simulation.run(FLAGS.rosters)
+    simulation.print_summary()
+    simulation.save(FLAGS.output)
+    return
+
+if __name__ == '__main__':
+    app.run(simulate)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Compares the staged (nights first) solve with the monolithic solve on time to quality."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('data_dir', '../data', 'Directory with nurses.csv, shifts.csv and requests.csv.')
+flags.DEFINE_integer('year', 2022, 'Year of the first roster month.')
+flags.DEFINE_integer('month', 10, 'First roster month.')
+flags.DEFINE_integer('num_days', 0, 'Roster horizon in days from the first of the month, the whole month when 0.')
+flags.DEFINE_list('stage_types', ['n'], 'Shift types of the first stage, e.g. n or n,a.')
+flags.DEFINE_bool('fix', True, 'Fix the first stage in the second stage, hint it otherwise.')
+flags.DEFINE_float('stage_share', 0.25, 'Share of the time limit for the first stage.')
+flags.DEFINE_float('max_time', 120.0, 'Time limit per solve (both stages together) in seconds.')
+flags.DEFINE_integer('num_workers', 8, 'Solver workers.')
+flags.DEFINE_integer('random_seed', 0, 'Solver random seed.')
+flags.DEFINE_float('quality', 0.01, 'Time to quality is the time to get within this fraction of the best objective.')
+flags.DEFINE_string('output', 'staged_benchmark.json', 'Output file for the results.')
+from Profile import SolveProfile
+from Staged import StagedBenchmark
+
+def benchmark(_=None):
+    profile = SolveProfile(FLAGS.max_time, FLAGS.num_workers, FLAGS.random_seed)
+    staged_benchmark = StagedBenchmark(FLAGS.data_dir, FLAGS.year, FLAGS.month, FLAGS.num_days or None, profile,
+                                       FLAGS.stage_types, FLAGS.fix, FLAGS.stage_share, FLAGS.quality)
+    staged_benchmark.run()
+    staged_benchmark.print_summary()
+    staged_benchmark.save(FLAGS.output)
+    return
+
+if __name__ == '__main__':
+    app.run(benchmark)
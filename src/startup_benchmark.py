@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""Checks that the commands that only load and check inputs start within a time budget, fails when one does not."""
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_multi_string('command', ['main.py --check_only'], 'Script with arguments to time, from the src directory.')
+flags.DEFINE_float('budget', 0.15, 'Startup budget per command in seconds.')
+flags.DEFINE_integer('repeats', 5, 'Runs per command, the best one counts.')
+flags.DEFINE_string('output', '', 'Output file for the results, none when empty.')
+from Benchmark import StartupBenchmark
+
+def benchmark(_=None):
+    startup_benchmark = StartupBenchmark(FLAGS.command, FLAGS.budget, FLAGS.repeats)
+    startup_benchmark.run()
+    startup_benchmark.print_summary()
+    if FLAGS.output:
+        startup_benchmark.save(FLAGS.output)
+    return 0 if startup_benchmark.passed() else 1
+
+if __name__ == '__main__':
+    app.run(benchmark)
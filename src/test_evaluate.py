@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from Evaluate import RosterChanges, RosterEvaluator
+from Instance import Instance, InstanceGenerator
+from Model import RosterModel
+from Profile import SolveProfile
+
+def test_evaluator_matches_solver_and_deltas(tmp_path):
+    # a solved roster of a synthetic instance scores the CP-SAT objective and penalties of the model with that roster
+    # fixed, and the deltas of changes to it are those of evaluating the changed rosters in full
+    data_dir = InstanceGenerator(20, cover_request_kinds=True, start_date=datetime(2022, 10, 1)).write(str(tmp_path / "data"))
+    instance = Instance(data_dir, 2022, 10)
+    roster_model = RosterModel(instance.nurses, instance.shifts, instance.constraints).build()
+    solver = SolveProfile(max_time=120.0, num_workers=8, random_seed=0, params="stop_after_first_solution:true").apply(cp_model.CpSolver())
+    status = solver.Solve(roster_model.model)
+    assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE), solver.StatusName(status)
+
+    evaluator = RosterEvaluator(instance.nurses, instance.shifts, instance.constraints)
+    work = evaluator.GetMatrixFromSolver(roster_model.work, solver)
+    result = evaluator.evaluate(work)
+    assert result["feasible"], {family: count for family, count in result["violations"].items() if count}
+    # the solver may leave penalty literals true that the roster does not need, before it proves optimality
+    assert result["objective"] <= round(solver.ObjectiveValue())
+
+    for n in range(work.shape[0]):
+        for s in range(work.shape[1]):
+            roster_model.model.Add(roster_model.work[n, s] == int(work[n, s]))
+    solver = SolveProfile(max_time=120.0, num_workers=8, random_seed=0).apply(cp_model.CpSolver())
+    assert solver.Solve(roster_model.model) == cp_model.OPTIMAL
+    assert result["objective"] == round(solver.ObjectiveValue())
+    penalties = roster_model.GetPenalties(solver)
+    for family in evaluator.OBJECTIVE_FAMILIES:
+        assert result["penalties"][family].sum() == penalties.get(family, 0), family
+
+    roster_changes = RosterChanges(evaluator, work)
+    rng = np.random.default_rng(0)
+    changes = [change for n in range(3) for change in roster_changes.GetSwapCandidates(n)]
+    changes += [[(int(n), int(s), 1 - int(work[n, s]))] for n, s in zip(rng.integers(work.shape[0], size=50), rng.integers(work.shape[1], size=50))]
+    changed = np.repeat(work[None], len(changes), axis=0)
+    for c, change in enumerate(changes):
+        for n, s, value in change:
+            changed[c, n, s] = value
+    full = evaluator.evaluate(changed)
+    deltas = roster_changes.evaluate(changes)
+    np.testing.assert_array_equal(deltas["delta"], full["objective"] - result["objective"])
+    for family in evaluator.HARD_FAMILIES:
+        np.testing.assert_array_equal(deltas["violations"][family], full["violations"][family], err_msg=family)
@@ -0,0 +1,14 @@
+import shlex
+
+from Benchmark import StartupBenchmark
+from Instance import InstanceGenerator
+
+def test_check_only_startup_within_budget(tmp_path):
+    # main.py --check_only loads and checks a synthetic instance without importing the solver or the visualization
+    data_dir = InstanceGenerator(20).write(str(tmp_path / "data"))
+    startup_benchmark = StartupBenchmark([f"main.py --check_only --data_dir {shlex.quote(data_dir)}"], repeats=3)
+    startup_benchmark.run()
+    startup_benchmark.print_summary()
+    for command, result in startup_benchmark.result["commands"].items():
+        assert result["time"] is not None, f"{command} failed: {result['error']}"
+        assert result["within_budget"], f"{command} took {result['time'] * 1000:.0f} ms, budget {startup_benchmark.budget * 1000:.0f} ms"
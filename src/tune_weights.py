@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Searches the objective weights on historical instances and writes the Pareto efficient weight sets."""
+
+import os
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+flags.DEFINE_list('instances', ['../data:2022:10'], 'Historical instances as data_dir:year:month or data_dir:year:month:num_days.')
+flags.DEFINE_enum('search', 'grid', ['grid', 'random', 'bayes'], 'Whole grid, num_trials random grid points or multi-objective TPE (needs optuna).')
+flags.DEFINE_multi_string('grid', [], 'Values of one weight as NAME=v1,v2,.. (e.g. ZZP_COST=1,5), the default grid for the other weights.')
+flags.DEFINE_integer('num_trials', 100, 'Weight sets for the random and bayes searches.')
+flags.DEFINE_list('kpis', ['hours_deviation', 'fragmentation', 'request_satisfaction'], 'KPIs the Pareto front is over.')
+flags.DEFINE_float('max_time', 30.0, 'Time limit per solve in seconds.')
+flags.DEFINE_integer('num_workers', 1, 'Solver workers per solve.')
+flags.DEFINE_integer('random_seed', 0, 'Solver random seed, and the seed of the search.')
+flags.DEFINE_integer('processes', 0, 'Solves in parallel, one per CPU when 0.')
+flags.DEFINE_string('output', 'weight_tuning.json', 'Output file for all weight sets and the Pareto front.')
+from Profile import SolveProfile
+from Tuning import WeightTuning
+
+def tune(_=None):
+    instances = []
+    for item in FLAGS.instances:
+        parts = item.split(":")
+        instances.append((parts[0], int(parts[1]), int(parts[2]), int(parts[3]) if len(parts) > 3 else None))
+    grid = dict(WeightTuning.DEFAULT_GRID)
+    for item in FLAGS.grid:
+        name, values = item.split("=")
+        grid[name] = [int(value) for value in values.split(",")]
+    profile = SolveProfile(FLAGS.max_time, FLAGS.num_workers, FLAGS.random_seed)
+    processes = FLAGS.processes or os.cpu_count()
+    tuning = WeightTuning(instances, profile, grid, FLAGS.kpis, FLAGS.search, FLAGS.num_trials, FLAGS.random_seed, processes)
+    print(f"{tuning.GetNumTrials()} weight sets on {len(instances)} instances, at most {tuning.estimate(processes):.1f} h with {processes} processes")
+    tuning.run()
+    tuning.print_summary()
+    tuning.save(FLAGS.output)
+    return
+
+if __name__ == '__main__':
+    app.run(tune)